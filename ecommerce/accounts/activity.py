@@ -0,0 +1,125 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection, connections, router
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityBuffer:
+    """
+    Per-process buffer of users' last-seen times, written to `User.last_activity` in batches.
+
+    `touch()` only records the time in memory; many requests from the same user between
+    two flushes collapse into one value. A background thread, started by the first
+    `touch()` in each process, writes the buffer every `settings.ACTIVITY_FLUSH_SECONDS`
+    with one `UPDATE ... SET last_activity = CASE id WHEN ... END` per `BATCH_SIZE`
+    users, so no request waits for the write. The buffer is also flushed when the
+    process exits. A failed flush is put back and retried with the next one.
+
+    The buffer remembers which database its users came from (alias and name) and is
+    dropped if that changes before the flush, e.g. when the test runner swaps in the
+    test database, so ids are never written onto another database's users. The test
+    runner (`ecommerce.test_runner`) turns `background` off: tests flush by hand.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self):
+        self.pending = {}
+        self.background = True
+        self._database = None
+        self._flusher_pid = None
+        self._exit_registered = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _current_database():
+        alias = router.db_for_write(User)
+        return alias, connections[alias].settings_dict["NAME"]
+
+    def touch(self, user_id, when=None):
+        """
+        Record that a user was active now (or at `when`).
+        """
+        when = when or timezone.now()
+        database = self._current_database()
+        with self._lock:
+            if database != self._database:
+                self.pending, self._database = {}, database
+            if self.pending.get(user_id, when) <= when:
+                self.pending[user_id] = when
+            if not self.background:
+                return
+            # per process: a worker forked after the first touch needs its own thread
+            if self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._run, name="activity-flush", daemon=True).start()
+            if not self._exit_registered:
+                self._exit_registered = True
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.ACTIVITY_FLUSH_SECONDS)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("User activity flush failed")
+            finally:
+                # the thread's own connection; don't hold it open between flushes
+                connection.close()
+
+    def discard(self):
+        """
+        Drop the buffered timestamps without writing them.
+        """
+        with self._lock:
+            self.pending, self._database = {}, None
+
+    def flush(self):
+        """
+        Write the buffered timestamps to the database they were recorded against.
+
+        Returns:
+            int: The number of users updated.
+        """
+        database = self._current_database()
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            if pending and database != self._database:
+                logger.warning(
+                    "Dropping activity of %d users recorded against database %s", len(pending), self._database
+                )
+                return 0
+        if not pending:
+            return 0
+
+        items = sorted(pending.items())
+        try:
+            for start in range(0, len(items), self.BATCH_SIZE):
+                batch = items[start:start + self.BATCH_SIZE]
+                User.objects.filter(pk__in=[user_id for user_id, _ in batch]).update(
+                    last_activity=Case(
+                        *(When(pk=user_id, then=Value(when)) for user_id, when in batch),
+                        output_field=DateTimeField(),
+                    )
+                )
+        except DatabaseError:
+            logger.exception("Could not flush user activity; retrying with the next flush")
+            with self._lock:
+                for user_id, when in pending.items():
+                    if self.pending.get(user_id, when) <= when:
+                        self.pending[user_id] = when
+            return 0
+        return len(items)
+
+
+activity = ActivityBuffer()
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .activity import activity
+from .models import User
+from .revocation import revocations
+
+USER_STATE_FIELDS = ("username", "is_active", "is_blocked", "is_staff", "is_superuser")
+
+BLOCKED_MESSAGE = "Your account has been blocked. Please contact support."
+
+
+def _state_key(user_id):
+    return f"accounts:user-state:{user_id}"
+
+
+def get_user_state(user_id):
+    """
+    The account flags of a user, cached for `settings.AUTH_USER_STATE_CACHE_SECONDS`.
+
+    Args:
+        user_id (int): The user's id.
+
+    Returns:
+        dict: The values of `USER_STATE_FIELDS`, or None if the user does not exist.
+    """
+    key = _state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = User.objects.filter(pk=user_id).values(*USER_STATE_FIELDS).first()
+        # cache misses too, as an empty dict, so unknown ids don't hit the DB every time
+        state = row or {}
+        cache.set(key, state, settings.AUTH_USER_STATE_CACHE_SECONDS)
+    return state or None
+
+
+def forget_user_state(user_id):
+    cache.delete(_state_key(user_id))
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight `request.user` built from the access token claims.
+
+    Carries the user id and username from the token. The staff flags always come from
+    the cached account state, never from claims (older tokens may still carry them), so
+    a demotion takes effect within `settings.AUTH_USER_STATE_CACHE_SECONDS` instead of
+    lasting as long as the refresh token. Use `get_user()` when a view really needs the
+    `User` row.
+    """
+
+    state = None
+
+    def _flag(self, name):
+        return bool(self.state and self.state.get(name))
+
+    @cached_property
+    def username(self):
+        if "username" in self.token:
+            return self.token["username"]
+        return (self.state or {}).get("username", "")
+
+    @cached_property
+    def is_staff(self):
+        return self._flag("is_staff")
+
+    @cached_property
+    def is_superuser(self):
+        return self._flag("is_superuser")
+
+    @cached_property
+    def is_blocked(self):
+        return bool(self.state and self.state.get("is_blocked"))
+
+    def get_user(self):
+        """
+        Load the full `User` row for this request.
+        """
+        return User.objects.get(pk=self.pk)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that doesn't load the user row on every request.
+
+    `request.user` is a `ClaimsUser`. Blocked users and revoked tokens are rejected by
+    the in-memory revocation list, so blocking takes effect at once. Whether the account
+    still exists and is active is checked against the cached user state, so the
+    database is only hit once per user per cache period. Each request is recorded in
+    the activity buffer, which writes last-seen times in periodic batches.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        if revocations.is_user_blocked(user.pk):
+            raise AuthenticationFailed(BLOCKED_MESSAGE, code="user_blocked")
+        if revocations.is_token_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        state = get_user_state(user.pk)
+
+        if state is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not state["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if state["is_blocked"]:
+            raise AuthenticationFailed(BLOCKED_MESSAGE, code="user_blocked")
+
+        user.state = state
+        activity.touch(user.pk)
+        return user
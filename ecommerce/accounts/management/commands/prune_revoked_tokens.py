@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.revocation import prune
+
+
+class Command(BaseCommand):
+    """
+    Sweep revoked tokens that have expired.
+
+    Expired tokens are rejected by their own expiry and aren't loaded into the revocation
+    list, so this only keeps the table small. Run it from cron, or with `--interval` as a
+    long-lived worker.
+    """
+
+    help = "Delete revoked tokens that have expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running and sweep every N seconds.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            deleted = prune()
+            self.stdout.write(f"Pruned {deleted} expired revoked tokens.")
+            if not interval:
+                return
+            time.sleep(interval)
@@ -1,9 +1,31 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
-from django.db import models
+from django.db import models, transaction
 from .validators import name_validator, phone_number_validator, username_validator
 
 
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        Bulk UPDATE that still reaches authentication when account flags change.
+
+        Saving a user goes through the `accounts.signals` receivers; an UPDATE sends no
+        signals, so the affected users' cached account state is dropped and their block
+        status recorded in the revocation list here.
+        """
+        # imported here: accounts.authentication and accounts.signals import this module
+        from .authentication import USER_STATE_FIELDS
+        from .signals import sync_account_state
+
+        if not kwargs.keys() & set(USER_STATE_FIELDS):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            user_ids = list(self.values_list("pk", flat=True))
+            updated = super().update(**kwargs)
+            sync_account_state(user_ids)
+        return updated
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """Custom user manager for handling user creation."""
 
     def create_user(
@@ -97,7 +119,10 @@ class User(AbstractBaseUser):
     profile_picture = models.URLField(blank=True, null=True)
 
     date_joined = models.DateTimeField(auto_now_add=True)
-    last_login = models.DateTimeField(auto_now=True)
+    # stamped explicitly on login; request activity is buffered into last_activity
+    # (see accounts.activity) so neither rewrites the row on every save
+    last_login = models.DateTimeField(blank=True, null=True)
+    last_activity = models.DateTimeField(blank=True, null=True)
 
     is_superuser = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
@@ -121,3 +146,15 @@ class User(AbstractBaseUser):
 
     def has_module_perms(self, app_label):
         return True
+
+
+class RevokedToken(models.Model):
+    """A JWT revoked before its expiry (e.g. on logout), identified by its `jti` claim."""
+
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="revoked_tokens")
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
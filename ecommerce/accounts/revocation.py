@@ -0,0 +1,172 @@
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from .models import RevokedToken, User
+
+
+class RevocationList:
+    """
+    In-memory set of blocked user ids and revoked token JTIs, checked on every request.
+
+    The database stays the source of truth (`User.is_blocked` and `RevokedToken`); each
+    process loads both once, on first use, and then applies changes as they happen.
+    Changes made by other processes reach it through an append-only log in the
+    `settings.REVOCATION_CACHE_ALIAS` cache: every change gets a number from an atomic
+    counter, and a process checks the counter at most once per
+    `settings.REVOCATION_SYNC_SECONDS` and replays the entries it missed. If an entry
+    has been evicted, or the counter went backwards, it reloads from the database.
+    Lookups are plain set/dict membership tests and never touch the database.
+    """
+
+    VERSION_KEY = "accounts:revocation:version"
+    ENTRY_KEY = "accounts:revocation:entry:{}"
+
+    def __init__(self):
+        self.users = frozenset()
+        self.tokens = {}
+        self.version = 0
+        self.loaded = False
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[settings.REVOCATION_CACHE_ALIAS]
+
+    def _shared_version(self):
+        return self.backend.get(self.VERSION_KEY) or 0
+
+    def load(self):
+        """
+        (Re)load the blocked users and unexpired revoked tokens from the database.
+        """
+        with self._lock:
+            # read the counter first: entries published while we load are replayed
+            version = self._shared_version()
+            users = frozenset(User.objects.filter(is_blocked=True).values_list("id", flat=True))
+            tokens = {
+                jti: expires_at.timestamp()
+                for jti, expires_at in RevokedToken.objects.filter(
+                    expires_at__gt=timezone.now()
+                ).values_list("jti", "expires_at")
+            }
+            self.users, self.tokens, self.version = users, tokens, version
+            self.loaded = True
+            self._synced_at = time.monotonic()
+
+    def _apply(self, entry):
+        kind, key, value = entry
+        if kind == "user":
+            self.users = self.users | {key} if value else self.users - {key}
+        else:
+            now = time.time()
+            tokens = {jti: exp for jti, exp in self.tokens.items() if exp > now}
+            tokens[key] = value
+            self.tokens = tokens
+
+    def sync(self, force=False):
+        """
+        Catch up with changes published by other processes.
+        """
+        if not self.loaded:
+            self.load()
+            return
+        if not force and time.monotonic() - self._synced_at < settings.REVOCATION_SYNC_SECONDS:
+            return
+
+        shared = self._shared_version()
+        if shared == self.version:
+            self._synced_at = time.monotonic()
+            return
+        if shared < self.version:
+            self.load()
+            return
+
+        numbers = range(self.version + 1, shared + 1)
+        entries = self.backend.get_many([self.ENTRY_KEY.format(n) for n in numbers])
+        if len(entries) < len(numbers):
+            self.load()
+            return
+        with self._lock:
+            for n in numbers:
+                self._apply(entries[self.ENTRY_KEY.format(n)])
+            self.version = max(self.version, shared)
+            self._synced_at = time.monotonic()
+
+    def _publish(self, entry):
+        try:
+            number = self.backend.incr(self.VERSION_KEY)
+        except ValueError:
+            self.backend.add(self.VERSION_KEY, 0, timeout=None)
+            number = self.backend.incr(self.VERSION_KEY)
+        self.backend.set(self.ENTRY_KEY.format(number), entry, timeout=settings.REVOCATION_LOG_SECONDS)
+
+    def _record(self, entry):
+        def commit():
+            with self._lock:
+                self._apply(entry)
+            self._publish(entry)
+
+        # only apply and announce committed changes, so a reload triggered by the
+        # entry sees them in the database
+        transaction.on_commit(commit)
+
+    def set_user_blocked(self, user_id, blocked):
+        """
+        Add a user to, or remove them from, the blocked set.
+        """
+        self.sync()
+        if (user_id in self.users) == bool(blocked):
+            return
+        self._record(("user", user_id, bool(blocked)))
+
+    def revoke_token(self, token):
+        """
+        Revoke a validated token until it expires.
+
+        Args:
+            token (Token): A simplejwt access or refresh token.
+        """
+        jti = token[api_settings.JTI_CLAIM]
+        exp = token["exp"]
+        RevokedToken.objects.bulk_create(
+            [
+                RevokedToken(
+                    jti=jti,
+                    user_id=token[api_settings.USER_ID_CLAIM],
+                    expires_at=datetime.fromtimestamp(exp, tz=dt_timezone.utc),
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        self._record(("token", jti, exp))
+
+    def is_user_blocked(self, user_id):
+        self.sync()
+        return user_id in self.users
+
+    def is_token_revoked(self, jti):
+        self.sync()
+        exp = self.tokens.get(jti)
+        return exp is not None and exp > time.time()
+
+
+revocations = RevocationList()
+
+
+def prune(now=None):
+    """
+    Delete revoked tokens that have expired; they are rejected by their `exp` anyway.
+
+    Returns:
+        int: Number of rows removed.
+    """
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
+
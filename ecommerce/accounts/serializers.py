@@ -1,8 +1,14 @@
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
+from django.utils import timezone
 from .models import User
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from .activity import activity
+from .authentication import BLOCKED_MESSAGE, get_user_state
+from .revocation import revocations
 import re
 
 
@@ -11,7 +17,8 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     Custom serializer for obtaining JWT tokens.
 
     This serializer extends the default `TokenObtainPairSerializer` to add custom claims
-    to the token and prevent blocked users from obtaining tokens.
+    to the token and prevent blocked users from obtaining tokens. The username claim
+    lets `StatelessJWTAuthentication` build `request.user` without loading the user.
 
     Methods:
         get_token(cls, user): Adds custom claims to the token.
@@ -30,12 +37,13 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             token (RefreshToken): The token with added custom claims.
         """
         token = super().get_token(user)
+        # no privilege flags: tokens outlive a demotion, so those come from the account
         token["username"] = user.username
         return token
 
     def validate(self, attrs):
         """
-        Validate the user and check if the account is blocked.
+        Validate the user, check if the account is blocked and stamp the login time.
 
         Args:
             attrs (dict): The attributes passed for validation.
@@ -50,9 +58,13 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         user = self.user
 
         if user.is_blocked:
-            raise PermissionDenied(
-                "Your account has been blocked. Please contact support."
-            )
+            raise PermissionDenied(BLOCKED_MESSAGE)
+
+        # a single-column UPDATE rather than user.save(), which would rewrite the row
+        now = timezone.now()
+        User.objects.filter(pk=user.pk).update(last_login=now)
+        user.last_login = now
+        activity.touch(user.pk, now)
 
         return data
 
@@ -62,7 +74,9 @@ class CustomTokenRefreshSerializer(TokenRefreshSerializer):
     Custom serializer for refreshing JWT tokens.
 
     This serializer extends the default `TokenRefreshSerializer` to prevent blocked users
-    from refreshing their tokens.
+    from refreshing their tokens. Blocked users and revoked refresh tokens are checked
+    against the in-memory revocation list, and the rest of the account against the
+    cached user state, instead of loading the user row.
 
     Methods:
         validate(attrs): Validates the refresh token and checks if the user is blocked.
@@ -77,25 +91,72 @@ class CustomTokenRefreshSerializer(TokenRefreshSerializer):
 
         Raises:
             PermissionDenied: If the user's account is blocked.
+            AuthenticationFailed: If the refresh token has been revoked.
             serializers.ValidationError: If the user does not exist.
 
         Returns:
             dict: The validated data.
         """
-        refresh_token = attrs["refresh"]
-        refresh = RefreshToken(refresh_token)
-        user_id = refresh.payload.get("user_id")
+        refresh = self.token_class(attrs["refresh"])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
 
-        try:
-            user = User.objects.get(id=user_id)
-            if user.is_blocked:
-                raise PermissionDenied(
-                    "Your account has been blocked. Please contact support."
-                )
-        except User.DoesNotExist:
+        if revocations.is_user_blocked(user_id):
+            raise PermissionDenied(BLOCKED_MESSAGE)
+        if revocations.is_token_revoked(refresh.get(api_settings.JTI_CLAIM)):
+            raise AuthenticationFailed("Token has been revoked", "token_revoked")
+
+        state = get_user_state(user_id)
+        if state is None:
             raise serializers.ValidationError({"error": "User does not exist"})
+        if not state["is_active"]:
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+
+        data = {"access": str(refresh.access_token)}
+
+        # same rotation handling as TokenRefreshSerializer.validate
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION and hasattr(refresh, "blacklist"):
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            if hasattr(refresh, "outstand"):
+                refresh.outstand()
+            data["refresh"] = str(refresh)
+
+        return data
+
+
+class LogoutSerializer(serializers.Serializer):
+    """
+    Serializer for logging out.
 
-        return super().validate(attrs)
+    Accepts the refresh token to revoke alongside the access token used for the request.
+    The refresh token must belong to the authenticated user.
+    """
+
+    refresh = serializers.CharField(required=False)
+
+    def validate_refresh(self, value):
+        """
+        Decode the refresh token and make sure it belongs to the requesting user.
+
+        Raises:
+            serializers.ValidationError: If the token is invalid or belongs to someone else.
+
+        Returns:
+            RefreshToken: The decoded token.
+        """
+        try:
+            token = RefreshToken(value)
+        except TokenError as e:
+            raise serializers.ValidationError(str(e))
+
+        if token.get(api_settings.USER_ID_CLAIM) != self.context["request"].user.pk:
+            raise serializers.ValidationError("Token does not belong to this user.")
+        return token
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import USER_STATE_FIELDS, forget_user_state
+from .models import User
+from .revocation import revocations
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_user_state(sender, instance, **kwargs):
+    """
+    Make authentication re-read the account flags after a user changes.
+    """
+    forget_user_state(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def track_blocked_user(sender, instance, **kwargs):
+    """
+    Keep the revocation list in step with `User.is_blocked`.
+    """
+    revocations.set_user_blocked(instance.pk, instance.is_blocked)
+
+
+def sync_account_state(user_ids):
+    """
+    What the receivers above do, for users changed by `UserQuerySet.update()`.
+    """
+    for user_id in user_ids:
+        forget_user_state(user_id)
+    for user_id, blocked in User.objects.filter(pk__in=user_ids).values_list("pk", "is_blocked"):
+        revocations.set_user_blocked(user_id, blocked)
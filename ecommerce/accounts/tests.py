@@ -1,3 +1,156 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .activity import ActivityBuffer, activity
+from .models import RevokedToken, User
+from .revocation import revocations
+from .serializers import CustomTokenObtainPairSerializer
+
+PASSWORD = "Test@12345"
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password=PASSWORD,
+        first_name="Test", last_name="User", **extra,
+    )
+
+
+class StatelessAuthenticationTests(TestCase):
+    admin_path = "/api/v1/products/cache-stats/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("admin", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, user):
+        response = self.client.post(
+            "/api/v1/accounts/login/", {"email": user.email, "password": PASSWORD}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get(self, path, access):
+        return self.client.get(path, HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_tokens_carry_no_privilege_flags(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.admin)
+        self.assertNotIn("is_staff", token.access_token)
+        self.assertNotIn("is_superuser", token)
+        self.assertEqual(self.get(self.admin_path, str(token.access_token)).status_code, 200)
+
+    def test_demoted_admin_loses_access_with_existing_and_refreshed_tokens(self):
+        tokens = self.login(self.admin)
+        self.admin.is_staff = False
+        self.admin.save()
+
+        self.assertEqual(self.get(self.admin_path, tokens["access"]).status_code, 403)
+        response = self.client.post("/api/v1/accounts/token/refresh/", {"refresh": tokens["refresh"]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(self.admin_path, response.json()["access"]).status_code, 403)
+
+    def test_staff_claim_of_older_tokens_is_ignored(self):
+        user = make_user("customer")
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        token["is_staff"] = True
+        self.assertEqual(self.get(self.admin_path, str(token)).status_code, 403)
+
+    def test_deactivated_user_is_rejected(self):
+        tokens = self.login(self.admin)
+        self.admin.is_active = False
+        self.admin.save()
+        self.assertEqual(self.get("/api/v1/accounts/profile/", tokens["access"]).status_code, 401)
+
+
+class RevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("customer")
+
+    def setUp(self):
+        cache.clear()
+        revocations.loaded = False
+        self.client = APIClient()
+        self.access = str(CustomTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def profile(self):
+        return self.client.get("/api/v1/accounts/profile/", HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def test_logout_revokes_the_access_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/accounts/logout/", HTTP_AUTHORIZATION=f"Bearer {self.access}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profile().status_code, 401)
+
+    def test_bulk_block_and_deactivation_reach_authentication(self):
+        self.assertEqual(self.profile().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_blocked=True)
+        self.assertTrue(revocations.is_user_blocked(self.user.pk))
+        self.assertEqual(self.profile().status_code, 401)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_blocked=False, is_active=False)
+        self.assertFalse(revocations.is_user_blocked(self.user.pk))
+        self.assertEqual(self.profile().status_code, 401)
+
+    def test_expired_tokens_are_pruned_by_the_command_not_on_load(self):
+        expired = RevokedToken.objects.create(
+            jti="expired", user=self.user, expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        revocations.load()
+        self.assertNotIn(expired.jti, revocations.tokens)
+        self.assertTrue(RevokedToken.objects.filter(pk=expired.pk).exists())
+
+        call_command("prune_revoked_tokens", stdout=StringIO())
+        self.assertFalse(RevokedToken.objects.filter(pk=expired.pk).exists())
+
+
+class ActivityBufferTests(TestCase):
+    def test_touch_only_buffers_and_flush_writes_the_latest_time(self):
+        user = make_user("active")
+        buffer = ActivityBuffer()
+        earlier, later = timezone.now() - timedelta(minutes=5), timezone.now()
+
+        with mock.patch("accounts.activity.threading.Thread") as thread, \
+                mock.patch("accounts.activity.atexit.register") as register, self.assertNumQueries(0):
+            buffer.touch(user.pk, later)
+            buffer.touch(user.pk, earlier)
+        thread.return_value.start.assert_called_once()
+        register.assert_called_once_with(buffer.flush)
+
+        self.assertEqual(buffer.flush(), 1)
+        user.refresh_from_db()
+        self.assertEqual(user.last_activity, later)
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_tests_neither_start_the_thread_nor_flush_at_exit(self):
+        self.assertFalse(activity.background)
+        with mock.patch("accounts.activity.threading.Thread") as thread, \
+                mock.patch("accounts.activity.atexit.register") as register:
+            activity.touch(make_user("tested").pk)
+        thread.assert_not_called()
+        register.assert_not_called()
+        activity.discard()
 
-# Create your tests here.
+    def test_buffer_recorded_against_another_database_is_dropped(self):
+        user = make_user("moved")
+        buffer = ActivityBuffer()
+        buffer.background = False
+        with mock.patch.object(ActivityBuffer, "_current_database", return_value=("default", "real.sqlite3")):
+            buffer.touch(user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending, {})
+        user.refresh_from_db()
+        self.assertIsNone(user.last_activity)
@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import CustomTokenObtainPairView, CustomTokenRefreshView, RegisterUserView, UserProfileView
+from .views import CustomTokenObtainPairView, CustomTokenRefreshView, LogoutView, RegisterUserView, UserProfileView
 
 
 urlpatterns = [
     path("login/", CustomTokenObtainPairView.as_view(), name="login"),
     path("token/refresh/", CustomTokenRefreshView.as_view(), name="token_refresh"),
+    path("logout/", LogoutView.as_view(), name="logout"),
     path("register/", RegisterUserView.as_view(), name="register"),
     path("profile/", UserProfileView.as_view(), name="user_profile"),
 ]
@@ -6,7 +6,8 @@ from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from .serializers import UserSerializer, UserProfileListSerializer
+from .revocation import revocations
+from .serializers import LogoutSerializer, UserSerializer, UserProfileListSerializer
 
 # Create your views here.
 
@@ -36,6 +37,32 @@ class CustomTokenRefreshView(TokenRefreshView):
     serializer_class = CustomTokenRefreshSerializer
 
 
+class LogoutView(generics.GenericAPIView):
+    """
+    API endpoint for logging out.
+
+    Revokes the access token used for the request, and the refresh token if one is
+    sent, so neither can be used again even though they have not expired yet.
+
+    Attributes:
+        permission_classes (list): The user must be authenticated.
+        serializer_class (LogoutSerializer): Validates the optional refresh token.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = LogoutSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        revocations.revoke_token(request.auth)
+        refresh = serializer.validated_data.get("refresh")
+        if refresh is not None:
+            revocations.revoke_token(refresh)
+
+        return Response({"message": "Logged out successfully."}, status=status.HTTP_200_OK)
+
+
 class RegisterUserView(generics.CreateAPIView):
     """
     API endpoint for user registration.
@@ -104,9 +131,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         """
         Retrieve the authenticated user's profile.
 
-        This method returns the user instance associated with the current request.
+        `request.user` only carries the token claims, so the user row is loaded here.
 
         Returns:
             User: The authenticated user instance.
         """
-        return self.request.user
+        return self.request.user.get_user()
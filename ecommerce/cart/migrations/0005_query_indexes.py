@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_alter_addresses_phone_number'),
+        ('products', '0006_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['user', '-created_at'], name='cart_user_created_idx'),
+        ),
+    ]
@@ -2,6 +2,11 @@ from django.db import models
 from accounts.validators import phone_number_validator
 
 # Create your models here.
+
+# most units of one product a cart line may hold
+MAX_QUANTITY_PER_PRODUCT = 5
+
+
 class Cart(models.Model):
     """
     Represents a shopping cart in the e-commerce application.
@@ -33,6 +38,10 @@ class Cart(models.Model):
                 fields=["user", "product"], name="unique_user_product_cart"
             )
         ]
+        indexes = [
+            # a user's cart, newest first
+            models.Index(fields=["user", "-created_at"], name="cart_user_created_idx"),
+        ]
         verbose_name_plural = "Cart"
         ordering = ["-created_at"]
 
@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from .models import Cart, Addresses
+from ecommerce.fieldsets import SparseFieldsetSerializerMixin
+from .models import MAX_QUANTITY_PER_PRODUCT, Cart, Addresses
 from products.models import Products
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Cart model.
     Provides product details within the cart
@@ -45,7 +46,7 @@ class CartSerializer(serializers.ModelSerializer):
         user = self.context["request"].user
 
         # check if the product is already in the cart
-        if Cart.objects.filter(user=user, product=value).exists():
+        if Cart.objects.filter(user_id=user.pk, product=value).exists():
             raise serializers.ValidationError("This product is already in your cart.")
 
         return value
@@ -57,8 +58,8 @@ class CartSerializer(serializers.ModelSerializer):
         if value <= 0:
             raise serializers.ValidationError("Quantity must be a positive integer.")
         
-        if value > 5:
-            raise serializers.ValidationError("You cannot add more than 5 items of the same product to the cart.")
+        if value > MAX_QUANTITY_PER_PRODUCT:
+            raise serializers.ValidationError(f"You cannot add more than {MAX_QUANTITY_PER_PRODUCT} items of the same product to the cart.")
 
         product = self.initial_data.get("product")
         if product and product.stock < value:
@@ -70,6 +71,95 @@ class CartSerializer(serializers.ModelSerializer):
 
 
 
+class CartBulkItemSerializer(serializers.Serializer):
+    """
+    Serializer for one line of a bulk cart update.
+    """
+
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(default=1)
+
+    def validate_quantity(self, value):
+        """
+        Ensure the quantity is a positive integer within the per-product limit
+        """
+        if value <= 0:
+            raise serializers.ValidationError("Quantity must be a positive integer.")
+
+        if value > MAX_QUANTITY_PER_PRODUCT:
+            raise serializers.ValidationError(f"You cannot add more than {MAX_QUANTITY_PER_PRODUCT} items of the same product to the cart.")
+
+        return value
+
+
+class CartBulkSerializer(serializers.Serializer):
+    """
+    Serializer for bulk cart updates.
+
+    `items` are upserted (a product already in the cart gets the new quantity) and
+    `remove` lists product ids to take out. All products in `items` are checked for
+    availability and stock with a single query.
+    """
+
+    items = CartBulkItemSerializer(many=True, required=False, max_length=100)
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, max_length=100
+    )
+
+    def validate(self, attrs):
+        """
+        Ensure the products exist, are available and have enough stock
+        """
+        items = attrs.setdefault("items", [])
+        remove = attrs.setdefault("remove", [])
+        if not items and not remove:
+            raise serializers.ValidationError("Provide items to add or products to remove.")
+
+        product_ids = [item["product"] for item in items]
+        if len(set(product_ids)) != len(product_ids):
+            raise serializers.ValidationError({"items": "Each product can only be listed once."})
+        if set(product_ids) & set(remove):
+            raise serializers.ValidationError("A product cannot be both added and removed.")
+
+        stock = dict(
+            Products.objects.filter(
+                id__in=product_ids, is_available=True, stock__gt=0
+            ).values_list("id", "stock")
+        )
+        errors = []
+        for item in items:
+            if item["product"] not in stock:
+                errors.append(f"Product {item['product']} is not available for purchase.")
+            elif stock[item["product"]] < item["quantity"]:
+                errors.append(f"Requested quantity of product {item['product']} exceeds available stock.")
+        if errors:
+            raise serializers.ValidationError({"items": errors})
+
+        return attrs
+
+
+class CartSummaryItemSerializer(serializers.Serializer):
+    """
+    Serializer for a cart line in the cart summary.
+    """
+
+    id = serializers.IntegerField()
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartSummarySerializer(serializers.Serializer):
+    """
+    Serializer for the cart summary: item count, subtotal and line totals.
+    """
+
+    item_count = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    items = CartSummaryItemSerializer(many=True)
+
+
 class AddressSerializer(serializers.ModelSerializer):
     """
     Serializer for Addresses model.
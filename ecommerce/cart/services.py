@@ -0,0 +1,32 @@
+from django.db import transaction
+from .models import Cart
+from .summary import invalidate as invalidate_summary
+
+
+def update_cart(user_id, lines=(), remove=()):
+    """
+    Upsert and remove several cart lines in one go.
+
+    All lines are written with one `INSERT ... ON CONFLICT (user_id, product_id) DO
+    UPDATE` on the `unique_user_product_cart` constraint, so products already in the
+    cart get the new quantity and the rest are added; removals are one DELETE.
+
+    Args:
+        user_id (int): The cart owner's id.
+        lines (list): (product_id, quantity) pairs, already validated.
+        remove (list): Ids of products to take out of the cart.
+    """
+    with transaction.atomic():
+        if lines:
+            Cart.objects.bulk_create(
+                [
+                    Cart(user_id=user_id, product_id=product_id, quantity=quantity)
+                    for product_id, quantity in lines
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "product"],
+                update_fields=["quantity", "updated_at"],
+            )
+        if remove:
+            Cart.objects.filter(user_id=user_id, product_id__in=remove).delete()
+        invalidate_summary(user_id)
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Window
+from .models import Cart
+from .serializers import CartSummarySerializer
+
+
+def _cache():
+    return caches[settings.CART_CACHE_ALIAS]
+
+
+def _cache_key(user_id):
+    return f"cart:summary:{user_id}"
+
+
+def cart_summary(user_id):
+    """
+    Item count, subtotal and line totals of a user's cart.
+
+    Computed by one query: line totals are annotated per row and the subtotal and item
+    count are window sums over the whole cart, so no rows are summed in Python. The
+    result is cached per user in the `settings.CART_CACHE_ALIAS` cache and dropped by
+    `invalidate()` when the cart changes; price, stock and availability changes are
+    picked up when it expires after `settings.CART_SUMMARY_CACHE_SECONDS`.
+
+    Args:
+        user_id (int): The cart owner's id.
+
+    Returns:
+        dict: The serialized `CartSummarySerializer` data.
+    """
+    key = _cache_key(user_id)
+    summary = _cache().get(key)
+    if summary is not None:
+        return summary
+
+    line_total = ExpressionWrapper(
+        F("product__price") * F("quantity"), output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+    rows = list(
+        # same lines as the cart list
+        Cart.objects.filter(user_id=user_id, product__is_available=True, product__stock__gt=0)
+        .annotate(
+            price=F("product__price"),
+            line_total=line_total,
+            subtotal=Window(Sum(line_total)),
+            item_count=Window(Sum("quantity")),
+        )
+        .values("id", "product", "quantity", "price", "line_total", "subtotal", "item_count")
+    )
+
+    summary = CartSummarySerializer(
+        {
+            "item_count": rows[0]["item_count"] if rows else 0,
+            "subtotal": rows[0]["subtotal"] if rows else 0,
+            "items": rows,
+        }
+    ).data
+    _cache().set(key, summary, settings.CART_SUMMARY_CACHE_SECONDS)
+    return summary
+
+
+def invalidate(user_id):
+    """
+    Drop a user's cached cart summary once the current transaction commits.
+    """
+    transaction.on_commit(lambda: _cache().delete(_cache_key(user_id)))
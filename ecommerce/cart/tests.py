@@ -1,3 +1,180 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
 from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.models import User
+from products.models import Products
+from .models import Cart
+from .services import update_cart
+
+
+class CartTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="shopper", email="shopper@example.com", password="Test@12345",
+            first_name="Test", last_name="User",
+        )
+        cls.mug = Products.objects.create(product_title="Mug", description="-", price=Decimal("4.50"), stock=5)
+        cls.tea = Products.objects.create(product_title="Tea", description="-", price=Decimal("2.00"), stock=5)
+
+    def setUp(self):
+        caches[settings.CART_CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class CartSummaryTests(CartTestCase):
+
+    def summary(self, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get("/api/v1/cart/summary/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def totals(self, queries):
+        summary = self.summary(queries)
+        return summary["item_count"], summary["subtotal"]
+
+    def test_summary_is_cached_until_the_cart_changes(self):
+        self.assertEqual(self.totals(1), (0, "0.00"))
+        self.assertEqual(self.totals(0), (0, "0.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/cart/", {"product": self.mug.pk}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.totals(1), (1, "4.50"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/v1/cart/{response.json()['id']}/", {"quantity": 2}, format="json")
+        self.assertEqual(self.totals(1), (2, "9.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/v1/cart/bulk/", {"items": [{"product": self.tea.pk, "quantity": 3}]}, format="json")
+        self.assertEqual(self.totals(1), (5, "15.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/cart/{response.json()['id']}/")
+        self.assertEqual(self.totals(1), (3, "6.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete("/api/v1/cart/clear/")
+        self.assertEqual(self.totals(1), (0, "0.00"))
+
+    def test_summaries_are_per_user(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="Test@12345", first_name="Test", last_name="User",
+        )
+        Cart.objects.create(user=other, product=self.tea, quantity=1)
+        self.assertEqual(self.totals(1), (0, "0.00"))
+
+        self.client.force_authenticate(other)
+        self.assertEqual(self.totals(1), (1, "2.00"))
+
+    def test_cart_changes_that_roll_back_keep_the_summary(self):
+        self.assertEqual(self.totals(1), (0, "0.00"))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                update_cart(self.user.pk, lines=[(self.mug.pk, 1)])
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.totals(0), (0, "0.00"))
+
+    def test_price_changes_show_once_the_summary_expires(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=2)
+        Cart.objects.create(user=self.user, product=self.tea, quantity=1)
+        self.assertEqual(self.totals(1), (3, "11.00"))
+
+        # bulk UPDATEs (inventory updates, imports) don't drop cached summaries
+        Products.objects.filter(pk=self.tea.pk).update(price=Decimal("3.00"))
+        self.assertEqual(self.totals(0), (3, "11.00"))
+
+        caches[settings.CART_CACHE_ALIAS].clear()
+        summary = self.summary(1)
+        self.assertEqual((summary["item_count"], summary["subtotal"]), (3, "12.00"))
+        self.assertEqual(
+            {item["product"]: item["line_total"] for item in summary["items"]},
+            {self.mug.pk: "9.00", self.tea.pk: "3.00"},
+        )
+
+
+class CartBulkTests(CartTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.lid = Products.objects.create(
+            product_title="Lid", description="-", price=Decimal("1.00"), stock=5, is_available=False
+        )
+        cls.cup = Products.objects.create(product_title="Cup", description="-", price=Decimal("3.00"), stock=0)
+
+    def bulk(self, payload):
+        return self.client.post("/api/v1/cart/bulk/", payload, format="json")
+
+    def cart(self):
+        return dict(Cart.objects.filter(user=self.user).values_list("product", "quantity"))
+
+    def test_items_are_upserted_and_removed(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=1)
+        response = self.bulk({"items": [{"product": self.mug.pk, "quantity": 3}, {"product": self.tea.pk}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart(), {self.mug.pk: 3, self.tea.pk: 1})
+        self.assertEqual({line["product"]: line["quantity"] for line in response.json()}, self.cart())
+
+        response = self.bulk({"items": [{"product": self.tea.pk, "quantity": 2}], "remove": [self.mug.pk, self.lid.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart(), {self.tea.pk: 2})
+        self.assertEqual([line["product"] for line in response.json()], [self.tea.pk])
+
+        self.assertEqual(self.bulk({"remove": [self.tea.pk]}).status_code, 200)
+        self.assertEqual(self.cart(), {})
+
+    def test_conflicting_requests_are_rejected(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=1)
+        cases = [
+            ({}, {"non_field_errors": ["Provide items to add or products to remove."]}),
+            (
+                {"items": [{"product": self.tea.pk}, {"product": self.tea.pk, "quantity": 2}]},
+                {"items": ["Each product can only be listed once."]},
+            ),
+            (
+                {"items": [{"product": self.tea.pk}], "remove": [self.tea.pk]},
+                {"non_field_errors": ["A product cannot be both added and removed."]},
+            ),
+        ]
+        for payload, errors in cases:
+            with self.subTest(payload=payload):
+                response = self.bulk(payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), errors)
+        self.assertEqual(self.cart(), {self.mug.pk: 1})
+
+    def test_quantities_are_checked_against_stock_and_the_cart_limit(self):
+        Products.objects.filter(pk=self.tea.pk).update(stock=3)
+        response = self.bulk({"items": [
+            {"product": self.mug.pk, "quantity": 5}, {"product": self.tea.pk, "quantity": 4},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {"items": [f"Requested quantity of product {self.tea.pk} exceeds available stock."]}
+        )
+
+        response = self.bulk({"items": [
+            {"product": self.mug.pk, "quantity": 6}, {"product": self.tea.pk, "quantity": 0},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"items": [
+            {"quantity": ["You cannot add more than 5 items of the same product to the cart."]},
+            {"quantity": ["Quantity must be a positive integer."]},
+        ]})
+        self.assertEqual(self.cart(), {})
 
-# Create your tests here.
+    def test_unavailable_products_are_rejected(self):
+        response = self.bulk({"items": [{"product": self.lid.pk}, {"product": self.cup.pk}, {"product": 999999}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"items": [
+            f"Product {pk} is not available for purchase." for pk in (self.lid.pk, self.cup.pk, 999999)
+        ]})
+        self.assertEqual(self.cart(), {})
@@ -1,11 +1,15 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from ecommerce.fastserializers import FastListMixin
+from ecommerce.fieldsets import SparseFieldsetViewMixin
+from .summary import cart_summary, invalidate as invalidate_summary
 from .models import Cart, Addresses
-from .serializers import CartSerializer, AddressSerializer
+from .serializers import CartBulkSerializer, CartSerializer, AddressSerializer
+from .services import update_cart
 
 # Create your views here.
-class CartViewSet(viewsets.ModelViewSet):
+class CartViewSet(SparseFieldsetViewMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API for managing user carts
     """
@@ -18,14 +22,19 @@ class CartViewSet(viewsets.ModelViewSet):
         Get the authenticated user's cart items
         """
         return Cart.objects.select_related("product").filter(
-            user=self.request.user, product__is_available=True, product__stock__gt=0
+            user_id=self.request.user.pk, product__is_available=True, product__stock__gt=0
         )
 
     def perform_create(self, serializer):
         """
         Add a product to the user's cart
         """
-        serializer.save(user=self.request.user)
+        serializer.save(user_id=self.request.user.pk)
+        invalidate_summary(self.request.user.pk)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        invalidate_summary(self.request.user.pk)
 
     def destroy(self, request, *args, **kwargs):
         """
@@ -34,6 +43,7 @@ class CartViewSet(viewsets.ModelViewSet):
         try:
             cart_item = self.get_object()
             cart_item.delete()
+            invalidate_summary(request.user.pk)
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Cart.DoesNotExist:
             return Response(
@@ -47,24 +57,49 @@ class CartViewSet(viewsets.ModelViewSet):
         Clear all products from the users cart
         """
 
-        if not Cart.objects.filter(user=request.user).exists():
+        if not Cart.objects.filter(user_id=request.user.pk).exists():
             return Response(
                 {"message": "Your cart is already empty."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        Cart.objects.filter(user=request.user).delete()
+        Cart.objects.filter(user_id=request.user.pk).delete()
+        invalidate_summary(request.user.pk)
         return Response(
             {"message": "Cart cleared successfully."}, status=status.HTTP_204_NO_CONTENT
         )
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Add, update and remove several products at once and return the resulting cart
+        """
+        serializer = CartBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        update_cart(
+            request.user.pk,
+            lines=[(item["product"], item["quantity"]) for item in serializer.validated_data["items"]],
+            remove=serializer.validated_data["remove"],
+        )
+
+        cart = CartSerializer(self.get_queryset(), many=True, context=self.get_serializer_context())
+        return Response(cart.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summary(self, request):
+        """
+        Item count, subtotal and line totals of the user's cart
+        """
+        return Response(cart_summary(request.user.pk))
+
 
 class AddressesViewSet(viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Addresses.objects.filter(user=self.request.user)
+        return Addresses.objects.filter(user_id=self.request.user.pk)
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user_id=self.request.user.pk)
\ No newline at end of file
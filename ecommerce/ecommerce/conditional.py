@@ -0,0 +1,123 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def set_validators(response, etag, last_modified=None):
+    """
+    Add the ETag (and Last-Modified, if given) headers to `response`.
+    """
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def precondition_response(request, etag, last_modified=None):
+    """
+    Answer a conditional request from the current validators.
+
+    Args:
+        request (HttpRequest): The request, with any If-None-Match / If-Modified-Since
+            (or If-Match / If-Unmodified-Since) headers.
+        etag (str): The current, quoted ETag.
+        last_modified (datetime): The current Last-Modified, if the resource has one.
+
+    Returns:
+        HttpResponse: A 304 carrying the validators when the client's copy is current,
+            a 412 when an If-Match precondition fails, else None.
+    """
+    current = set_validators(HttpResponse(), etag, last_modified)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+        response=current,
+    )
+    return None if response is current else response
+
+
+class ConditionalGetMixin:
+    """
+    View mixin: ETag and Last-Modified validators on `list` and `retrieve`, so a client
+    whose copy is current gets a 304 before anything is loaded or serialized.
+
+    The validators come from one aggregate over what the response shows (the filtered
+    list, or the requested object): its row count and newest `updated_at`, and the same
+    for each relation in `conditional_related` whose rows are part of the response.
+    Every write that changes a response must therefore move `updated_at`. Lists only get
+    an ETag: deleting a row changes the count but makes nothing newer, which
+    Last-Modified can't express. Objects are looked up in `get_queryset()`, which must
+    already limit them to what the user may see.
+
+    The aggregate runs on every request of the `conditional_actions`, so leave out lists
+    whose aggregate would cost more than serializing a page.
+    """
+
+    conditional_actions = ("list", "retrieve")
+    conditional_related = ()
+    conditional_etag = None
+
+    def list(self, request, *args, **kwargs):
+        if "list" not in self.conditional_actions:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, False, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if "retrieve" not in self.conditional_actions:
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            # not a valid lookup value; get_object() answers with the 404
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(queryset, True, super().retrieve, request, *args, **kwargs)
+
+    def conditional_aggregates(self):
+        aggregates = {"count": Count("pk", distinct=True), "modified": Max("updated_at")}
+        for name in self.conditional_related:
+            aggregates[f"{name}_count"] = Count(name, distinct=True)
+            aggregates[f"{name}_modified"] = Max(f"{name}__updated_at")
+        return aggregates
+
+    def get_validators(self, state, detail):
+        """
+        (ETag, Last-Modified or None) for the aggregated `state` of a list or an object.
+
+        The ETag also covers what changes the body without changing the rows: the query
+        string (page, fields, ordering), the serializer's fields and the negotiated
+        renderer.
+        """
+        query = sorted(self.request.query_params.lists())
+        fields = getattr(getattr(self.get_serializer_class(), "Meta", None), "fields", ())
+        renderer = getattr(self.request, "accepted_renderer", None)
+        key = (sorted(state.items()), query, list(fields), renderer and renderer.format)
+        etag = quote_etag(hashlib.md5(repr(key).encode()).hexdigest())
+        if not detail:
+            return etag, None
+        modified = [value for name, value in state.items() if name.endswith("modified") and value]
+        return etag, max(modified, default=None)
+
+    def conditional_response(self, queryset, detail, handler, request, *args, **kwargs):
+        state = queryset.aggregate(**self.conditional_aggregates())
+        if detail and not state["count"]:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = self.get_validators(state, detail)
+        response = precondition_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        self.conditional_etag = etag
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,252 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+try:
+    import orjson
+except ImportError:
+    # optional; without it FastJSONRenderer renders with the json module like JSONRenderer
+    orjson = None
+
+# serializer fields rendered by their own to_representation (never floats)
+PLAIN_FIELDS = (
+    serializers.ChoiceField, serializers.DateField, serializers.TimeField, serializers.UUIDField,
+)
+
+
+def _model_field(model, source):
+    """
+    The `values_list()` lookup and model field of the column behind a serializer field
+    source, or None if the source isn't a column (a property, a reverse relation or the
+    whole object) or goes through a nullable foreign key, where DRF leaves the field out
+    instead of rendering null.
+    """
+    parts = source.split(".")
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete:
+            return None
+        if index == len(parts) - 1:
+            return "__".join(parts), field
+        if not (field.many_to_one or field.one_to_one) or field.null:
+            return None
+        model = field.related_model
+    return None
+
+
+def _decimal(field):
+    if not getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+        return None
+    if field.decimal_places is None or field.localize or field.normalize_output:
+        return field.to_representation
+    exponent = -field.decimal_places
+
+    def convert(value):
+        # a value loaded from a column of the field's scale is already quantized
+        if value.as_tuple().exponent == exponent:
+            return f"{value:f}"
+        return field.to_representation(value)
+
+    return convert
+
+
+def _datetime(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or tz is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+def _converter(field, model_field):
+    """
+    A function rendering a non-null column value exactly like `field.to_representation`,
+    None for values rendered as they are, or False if the fast path can't render the
+    field (nested serializers, floats, anything else not checked here).
+    """
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if not model_field.is_relation:
+            return False
+        return None if field.pk_field is None else field.pk_field.to_representation
+    if model_field.is_relation:
+        return False
+    if isinstance(field, serializers.CharField) and isinstance(model_field, (models.CharField, models.TextField)):
+        return None
+    if isinstance(field, serializers.IntegerField) and isinstance(model_field, models.IntegerField):
+        return None
+    if isinstance(field, serializers.BooleanField) and isinstance(model_field, models.BooleanField):
+        return bool
+    if isinstance(field, serializers.DecimalField):
+        return _decimal(field) or False
+    if isinstance(field, serializers.DateTimeField):
+        return _datetime(field)
+    if isinstance(field, PLAIN_FIELDS):
+        return field.to_representation
+    return False
+
+
+class FastSerializer:
+    """
+    A read-only `ModelSerializer` compiled for lists: rows come from `values_list()`
+    instead of model instances and each field is rendered by a precompiled converter.
+
+    The output is the same as `serializer.data` for the same rows. Serializers that
+    override `to_representation` only compile if they also implement
+    `fast_complete(rows, data, context)`, which patches the converted rows.
+    """
+
+    def __init__(self, serializer, columns, fields):
+        self.serializer = serializer
+        self.columns = columns
+        self.fields = fields
+        self.complete = getattr(serializer, "fast_complete", None)
+
+    @classmethod
+    def compile(cls, serializer, extra_columns=()):
+        """
+        Compile a serializer instance (with its request context, so sparse fieldsets apply).
+
+        Args:
+            serializer (ModelSerializer): The serializer the list would use.
+            extra_columns (iterable): Lookups the caller reads from the rows (e.g. "pk",
+                "created_at" for keyset pagination); they aren't rendered.
+
+        Returns:
+            FastSerializer: Or None if any field can't be rendered from a column.
+        """
+        overridden = type(serializer).to_representation is not serializers.Serializer.to_representation
+        if overridden and not hasattr(serializer, "fast_complete"):
+            return None
+
+        model = serializer.Meta.model
+        columns, fields = [], []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            column = _model_field(model, field.source)
+            if column is None:
+                return None
+            lookup, model_field = column
+            convert = _converter(field, model_field)
+            if convert is False:
+                return None
+            if lookup not in columns:
+                columns.append(lookup)
+            fields.append((field.field_name, columns.index(lookup), convert, model_field.null))
+
+        extra = [*extra_columns, *getattr(serializer, "fast_columns", ())]
+        columns += [lookup for lookup in dict.fromkeys(extra) if lookup not in columns]
+        return cls(serializer, columns, fields)
+
+    def rows(self, queryset):
+        """
+        `queryset` loading only the compiled columns, as named tuples.
+        """
+        return queryset.values_list(*self.columns, named=True)
+
+    def data(self, rows, context=None):
+        """
+        Render rows from `rows()`.
+
+        Args:
+            rows (iterable): Rows from `rows()`, e.g. one page.
+            context (dict): Serializer context for `fast_complete`, which runs after the
+                page is loaded (default: the compiled serializer's context).
+
+        Returns:
+            list: One dict per row, as the serializer would render it.
+        """
+        rows = list(rows)
+        data = []
+        for row in rows:
+            item = {}
+            for name, index, convert, null in self.fields:
+                value = row[index]
+                if convert is None or (null and value is None):
+                    item[name] = value
+                else:
+                    item[name] = convert(value)
+            data.append(item)
+        if self.complete is not None:
+            self.complete(rows, data, self.serializer.context if context is None else context)
+        return data
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` that encodes with orjson when it is installed.
+
+    Produces the same bytes as `JSONRenderer` for data without floats (orjson writes
+    exponents differently), which is what `FastSerializer` produces; other values go
+    through the renderer's encoder as usual. Indented output, ASCII-only output and
+    data orjson rejects are rendered by `JSONRenderer` itself.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or not settings.FAST_SERIALIZATION or data is None
+            or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these so the output is also valid JavaScript
+        if b"\xe2\x80" in ret:
+            ret = ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+        return ret
+
+
+class FastListMixin:
+    """
+    View mixin: serve `list` through a `FastSerializer` when the serializer compiles,
+    and render it with `FastJSONRenderer`.
+
+    Filtering, pagination and the response body are unchanged; only how rows are loaded
+    and rendered differs. Views list the columns they (or their pagination) read from
+    the page in `fast_list_columns`. Serializers that don't compile, and
+    `settings.FAST_SERIALIZATION = False`, fall back to the regular list.
+    """
+
+    fast_list_columns = ()
+
+    def fast_serializer(self):
+        if not settings.FAST_SERIALIZATION:
+            return None
+        return FastSerializer.compile(self.get_serializer(), self.fast_list_columns)
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if getattr(self, "action", "list") != "list":
+            return renderers
+        return [FastJSONRenderer() if type(renderer) is JSONRenderer else renderer for renderer in renderers]
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.fast_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = compiled.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        data = compiled.data(queryset if page is None else page, self.get_serializer_context())
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,118 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+OMIT_PARAM = "omit"
+
+
+def _names(params, param):
+    return {name.strip() for value in params.getlist(param) for name in value.split(",") if name.strip()}
+
+
+def selected_fields(request, available):
+    """
+    The serializer fields a read request asks for with `?fields=a,b` and/or `?omit=c`.
+
+    Args:
+        request (Request): The current request.
+        available (iterable): Names of all the serializer's fields.
+
+    Returns:
+        set: The selected field names, or None when the request doesn't select fields
+            (or isn't a read).
+
+    Raises:
+        ValidationError: If a requested field doesn't exist.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = request.query_params
+    if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+        return None
+
+    available = set(available)
+    wanted, omitted = _names(params, FIELDS_PARAM), _names(params, OMIT_PARAM)
+    errors = {}
+    for param, names in ((FIELDS_PARAM, wanted), (OMIT_PARAM, omitted)):
+        unknown = sorted(names - available)
+        if unknown:
+            errors[param] = [f"Unknown field: {name}." for name in unknown]
+    if errors:
+        raise ValidationError(errors)
+    return (wanted or available) - omitted
+
+
+def _column(model, source):
+    """
+    The lookup ("description", "product__price") of the plain column behind a
+    serializer field source, or None if the source isn't one (a relation, a property,
+    a reverse relation or the whole object).
+    """
+    parts = source.split(".")
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if index == len(parts) - 1:
+            return "__".join(parts) if field.concrete and not field.is_relation else None
+        if not field.concrete or not (field.many_to_one or field.one_to_one):
+            return None
+        model = field.related_model
+    return None
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer mixin: on read requests, serialize only the fields selected with
+    `?fields=` / `?omit=` (comma-separated, top-level field names).
+
+    Only serializers given the request in their own context are trimmed, so nested
+    serializers always render in full.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = selected_fields(self._context.get("request"), fields)
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin: load only the columns a `?fields=` / `?omit=` read request needs.
+
+    Columns that back only dropped serializer fields are deferred on the filtered
+    queryset. Foreign keys are always loaded, as are the `sparse_required_fields` the
+    view itself reads (e.g. the keyset pagination column). Views can skip other work
+    for dropped fields (prefetches, lookups) with `includes_field()`.
+    """
+
+    sparse_required_fields = ()
+
+    def sparse_fieldset(self):
+        """
+        (selected field names or None, all serializer fields) for this request.
+        """
+        if not hasattr(self, "_sparse_fieldset"):
+            fields = self.get_serializer_class()().fields
+            self._sparse_fieldset = (selected_fields(self.request, fields), fields)
+        return self._sparse_fieldset
+
+    def includes_field(self, name):
+        selected, _ = self.sparse_fieldset()
+        return selected is None or name in selected
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        selected, fields = self.sparse_fieldset()
+        if selected is None or any(fields[name].source == "*" for name in selected):
+            return queryset
+
+        model = queryset.model
+        needed = {_column(model, fields[name].source) for name in selected}
+        dropped = {_column(model, field.source) for name, field in fields.items() if name not in selected}
+        deferred = dropped - needed - set(self.sparse_required_fields) - {None}
+        return queryset.defer(*sorted(deferred)) if deferred else queryset
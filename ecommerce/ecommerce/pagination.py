@@ -0,0 +1,147 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    By default this behaves exactly like `PageNumberPagination`. Clients opt in to keyset
+    paging per request with `?pagination=keyset`, then follow the `next` link, which
+    carries a `cursor` encoding the `(created_at, id)` of the last row served. Keyset pages
+    skip the `COUNT(*)` and the `OFFSET` scan, so page 500 costs the same as page 1, and
+    rows inserted while paging never shift rows between pages.
+
+    Keyset pages are ordered by `(created_at, id)`, ascending or descending following the
+    queryset's ordering; other orderings are rejected.
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    keyset_mode = "keyset"
+    invalid_cursor_message = "Invalid cursor"
+
+    def wants_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.keyset_mode
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.wants_keyset(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        queryset = self.keyset_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.keyset_page(list(queryset[: self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        `paginate_queryset` for async views: the same pages, fetched with the async ORM.
+        """
+        self.keyset = self.wants_keyset(request)
+        if self.keyset:
+            queryset = self.keyset_queryset(queryset, request)
+            if queryset is None:
+                return None
+            return self.keyset_page([row async for row in queryset[: self.page_size + 1]])
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator counts lazily (and synchronously) on first use; count up front instead
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        return self.page.object_list
+
+    def keyset_queryset(self, queryset, request):
+        """
+        Order `queryset` by `(created_at, id)` and start it after the request's cursor.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.descending = self.get_descending(queryset)
+        sign = "-" if self.descending else ""
+        queryset = queryset.order_by(f"{sign}created_at", f"{sign}id")
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            if self.descending:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                    created_at__lte=created_at,
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk),
+                    created_at__gte=created_at,
+                )
+        return queryset
+
+    def keyset_page(self, rows):
+        """
+        Trim the one-row lookahead off `rows`, noting whether there is a next page.
+        """
+        self.has_next = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        self.last_position = (rows[-1].created_at, rows[-1].pk) if rows else None
+        return rows
+
+    def get_descending(self, queryset):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or ["created_at"]
+        field = ordering[0]
+        if field.lstrip("-") != "created_at":
+            raise ValidationError(
+                {"ordering": "Keyset pagination only supports ordering by created_at."}
+            )
+        return field.startswith("-")
+
+    def encode_cursor(self, position):
+        created_at, pk = position
+        payload = json.dumps([created_at.isoformat(), pk]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        url = replace_query_param(url, self.mode_query_param, self.keyset_mode)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'corsheaders',
@@ -51,10 +52,15 @@ INSTALLED_APPS = [
     'orders',
     'products',
     'ratings',
+    'perf',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    # timing of sampled requests; removes itself when PERF_SAMPLE_RATE is 0
+    'perf.middleware.PerfMiddleware',
+    # per-request JSON query reports; only active when PERF_QUERY_REPORT_DIR is set
+    'perf.middleware.QueryReportMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -100,6 +106,60 @@ DATABASES = {
 
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_URL = config('CATALOG_CACHE_URL', default='')
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=300, cast=int)
+# How often each worker compares the catalog version with the one its in-process
+# search and typeahead indexes were loaded at, and reloads them if it moved
+CATALOG_INDEX_SYNC_SECONDS = config('CATALOG_INDEX_SYNC_SECONDS', default=5, cast=float)
+
+REVOCATION_CACHE_ALIAS = 'revocation'
+REVOCATION_CACHE_URL = config('REVOCATION_CACHE_URL', default='')
+
+CART_CACHE_ALIAS = 'cart'
+CART_CACHE_URL = config('CART_CACHE_URL', default='')
+# How long a user's cart summary (cart/summary/) is cached. Cart changes drop it at
+# once; bulk price, stock and availability updates are only seen when it expires
+CART_SUMMARY_CACHE_SECONDS = config('CART_SUMMARY_CACHE_SECONDS', default=30, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Serialized product pages. Local-memory (LRU) per process by default; point
+    # CATALOG_CACHE_URL at Redis to share it (and its invalidations) between workers.
+    CATALOG_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CATALOG_CACHE_URL,
+    } if CATALOG_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    # Change log of the token revocation list (see accounts.revocation). Point
+    # REVOCATION_CACHE_URL at Redis so blocks and logouts reach every worker.
+    REVOCATION_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REVOCATION_CACHE_URL,
+    } if REVOCATION_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'revocation',
+    },
+    # Per-user cart summaries. Point CART_CACHE_URL at Redis so a cart change made on
+    # one worker drops the summary every worker serves.
+    CART_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CART_CACHE_URL,
+    } if CART_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cart',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -144,7 +204,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -165,8 +225,55 @@ SIMPLE_JWT = {
 
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': False,
+
+    # request.user is built from the token claims, see accounts.authentication
+    'TOKEN_USER_CLASS': 'accounts.authentication.ClaimsUser',
 }
 
+# How long authentication trusts a cached copy of a user's account flags
+AUTH_USER_STATE_CACHE_SECONDS = 60
+
+# How often each worker checks for blocks/logouts made by other workers, and how long
+# the change log keeps an entry (workers further behind reload from the database)
+REVOCATION_SYNC_SECONDS = config('REVOCATION_SYNC_SECONDS', default=1, cast=float)
+REVOCATION_LOG_SECONDS = 3600
+
+# How often each worker writes buffered last-seen times to User.last_activity
+ACTIVITY_FLUSH_SECONDS = config('ACTIVITY_FLUSH_SECONDS', default=30, cast=int)
+
+# Keeps the activity buffer from writing test-run activity to the real database
+TEST_RUNNER = 'ecommerce.test_runner.TestRunner'
+
+# Feed rows validated and upserted per transaction by the product import
+PRODUCT_IMPORT_BATCH_SIZE = 1000
+
+# Render the product, order item and cart lists with the compiled values_list() serializers
+# and orjson (if installed); the bodies are the same either way
+FAST_SERIALIZATION = config('FAST_SERIALIZATION', default=True, cast=bool)
+
+# Bulk inventory updates (products/inventory/): products per request, and per locked chunk
+INVENTORY_MAX_ITEMS = 10000
+INVENTORY_CHUNK_SIZE = 500
+
+# Rows the admin order export fetches from the database (and writes to the client) at a time
+ORDER_EXPORT_CHUNK_SIZE = 2000
+
+# Share of requests PerfMiddleware instruments (0 disables it, 1 times every request)
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', default=0.0, cast=float)
+
+# Development/staging: write a query report per request into this directory (off when empty),
+# flagging SQL shapes repeated this many times and queries slower than PERF_SLOW_QUERY_MS
+PERF_QUERY_REPORT_DIR = config('PERF_QUERY_REPORT_DIR', default='')
+PERF_REPEATED_QUERY_THRESHOLD = config('PERF_REPEATED_QUERY_THRESHOLD', default=3, cast=int)
+PERF_SLOW_QUERY_MS = config('PERF_SLOW_QUERY_MS', default=100, cast=float)
+
+
+# How long stock stays held for a cart that entered checkout
+STOCK_RESERVATION_TTL = timedelta(minutes=config('STOCK_RESERVATION_TTL_MINUTES', default=10, cast=int))
+
+# How long the summed stock of a sharded product is cached for reads
+STOCK_SHARD_CACHE_SECONDS = 5
+
 
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWS_CREDENTIALS = True
\ No newline at end of file
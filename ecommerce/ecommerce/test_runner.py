@@ -0,0 +1,31 @@
+from django.test.runner import DiscoverRunner
+
+from accounts.activity import activity
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner that keeps the user activity buffer away from the real database.
+
+    The buffer is only flushed by hand in tests (no background thread or exit flush),
+    and is emptied when the test databases are created and destroyed, so activity
+    recorded against one database is never written to the other.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        activity.background = False
+
+    def setup_databases(self, **kwargs):
+        activity.discard()
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            activity.discard()
+
+    def teardown_databases(self, old_config, **kwargs):
+        activity.discard()
+        try:
+            super().teardown_databases(old_config, **kwargs)
+        finally:
+            activity.discard()
@@ -0,0 +1,206 @@
+import json
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qsl, urlsplit
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from cart.models import Cart
+from orders.models import Order, OrderItem
+from products import sharding
+from products.cache import catalog_cache
+from products.models import Products
+from .fastserializers import FastSerializer
+from .pagination import KeysetPageNumberPagination
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password="Test@12345",
+        first_name="Test", last_name="User", **extra,
+    )
+
+
+class CatalogTestCase(TestCase):
+    """
+    Products (one sharded, some with null columns), a cart and an order whose items
+    include one for a deleted product and one without a price.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("shopper")
+        cls.admin = make_user("admin", is_staff=True)
+        cls.products = [
+            Products.objects.create(
+                sku="MUG-1", product_title="Mug", product_subtitle="Stoneware", description="Big mug",
+                price=Decimal("4.50"), stock=5, image="https://example.com/mug.png",
+            ),
+            Products.objects.create(product_title="Tea   leaves", description="-", price=Decimal("2.00"), stock=8),
+            Products.objects.create(product_title="Lid", description="-", price=Decimal("1.25"), is_available=False),
+        ]
+        sharding.shard_product(cls.products[1], 2)
+        sharding.decrement(cls.products[1].pk, 3, 2)
+        for product in cls.products[:2]:
+            Cart.objects.create(user=cls.user, product=product, quantity=2)
+
+        order = Order.objects.create(user=cls.user, total=Decimal("9.00"))
+        gone = Products.objects.create(product_title="Gone", description="-", price=Decimal("3.00"))
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=cls.products[0], product_title="Mug", quantity=2, price=Decimal("4.50")),
+            OrderItem(order=order, product=gone, product_title="Gone", quantity=1, price=None),
+            OrderItem(order=order, product=cls.products[1], product_title="Tea", product_subtitle="Loose", quantity=1,
+                      price=Decimal("2.00")),
+        ])
+        gone.delete()
+        Order.objects.create(user=cls.user, total=Decimal("2.00"))
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.invalidate()
+
+    def client_for(self, user):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+
+class FastSerializationTests(CatalogTestCase):
+    """
+    Lists rendered by the compiled values_list() serializers are byte-identical to the
+    regular serializers' output.
+    """
+
+    requests = [
+        (None, "/api/v1/products/", {}),
+        (None, "/api/v1/products/", {"fields": "id,stock,image,sku"}),
+        (None, "/api/v1/products/", {"omit": "stock"}),
+        (None, "/api/v1/products/", {"pagination": "keyset"}),
+        (None, "/api/v1/products/", {"is_available": "true", "ordering": "price"}),
+        ("admin", "/api/v1/order/order-items/", {}),
+        ("admin", "/api/v1/order/order-items/", {"fields": "product,price"}),
+        ("admin", "/api/v1/order/order-items/", {"pagination": "keyset"}),
+        ("user", "/api/v1/cart/", {}),
+        ("user", "/api/v1/cart/", {"fields": "product_subtitle,product_image,product_price"}),
+    ]
+
+    def get(self, who, path, params, fast):
+        cache.clear()
+        catalog_cache.invalidate()
+        render = mock.patch.object(FastSerializer, "data", autospec=True, side_effect=FastSerializer.data)
+        with override_settings(FAST_SERIALIZATION=fast), render as data:
+            response = self.client_for(getattr(self, who) if who else None).get(path, params)
+        self.assertEqual(response.status_code, 200)
+        # the fast path really served the list
+        self.assertEqual(data.called, fast)
+        return response.content
+
+    def test_fast_and_regular_bodies_are_identical(self):
+        for who, path, params in self.requests:
+            with self.subTest(path=path, params=params):
+                self.assertEqual(self.get(who, path, params, True), self.get(who, path, params, False))
+
+    def test_keyset_pages_are_identical(self):
+        with mock.patch.object(KeysetPageNumberPagination, "page_size", 1):
+            for who, path in ((None, "/api/v1/products/"), ("admin", "/api/v1/order/order-items/")):
+                params = {"pagination": "keyset"}
+                pages = 0
+                while params is not None:
+                    body = self.get(who, path, params, True)
+                    with self.subTest(path=path, params=params):
+                        self.assertEqual(body, self.get(who, path, params, False))
+                    pages += 1
+                    next_url = json.loads(body)["next"]
+                    params = dict(parse_qsl(urlsplit(next_url).query)) if next_url else None
+                self.assertGreater(pages, 1)
+
+
+class SparseFieldsetTests(CatalogTestCase):
+    """
+    `?fields=` / `?omit=` trim list items, reject unknown names and load only the
+    columns the selected fields need.
+    """
+
+    def keys(self, who, path, params):
+        response = self.client_for(getattr(self, who) if who else None).get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return [set(item) for item in response.json()["results"]]
+
+    def test_fields_and_omit_trim_every_item(self):
+        cases = [
+            (None, "/api/v1/products/", {"fields": "id,price"}, {"id", "price"}),
+            (None, "/api/v1/products/", {"fields": "id, price", "omit": "price"}, {"id"}),
+            ("user", "/api/v1/order/orders/", {"fields": "id,total"}, {"id", "total"}),
+            ("user", "/api/v1/order/orders/", {"omit": "items,user"},
+             {"id", "order_number", "total", "status", "created_at", "updated_at"}),
+            ("admin", "/api/v1/order/order-items/", {"fields": "product_title,price"}, {"product_title", "price"}),
+            ("user", "/api/v1/cart/", {"fields": "product,product_price"}, {"product", "product_price"}),
+        ]
+        for who, path, params, expected in cases:
+            with self.subTest(path=path, params=params):
+                keys = self.keys(who, path, params)
+                self.assertTrue(keys)
+                self.assertEqual(keys, [expected] * len(keys))
+
+        keys = self.keys(None, "/api/v1/products/", {"omit": "description"})
+        self.assertNotIn("description", keys[0])
+        self.assertIn("product_title", keys[0])
+
+    def test_nested_items_are_not_trimmed(self):
+        response = self.client_for(self.user).get("/api/v1/order/orders/", {"fields": "items"})
+        items = [item for order in response.json()["results"] for item in order["items"]]
+        self.assertEqual(len(items), 3)
+        self.assertEqual(set(items[0]), {"id", "product", "product_title", "product_subtitle", "quantity", "price", "status"})
+
+    def test_unknown_fields_are_rejected(self):
+        cases = [
+            (None, "/api/v1/products/", {"fields": "id,nope"}, {"fields": ["Unknown field: nope."]}),
+            ("user", "/api/v1/order/orders/", {"omit": "secret"}, {"omit": ["Unknown field: secret."]}),
+            ("admin", "/api/v1/order/order-items/", {"fields": "order"}, {"fields": ["Unknown field: order."]}),
+            ("user", "/api/v1/cart/", {"fields": "user", "omit": "b,a"},
+             {"fields": ["Unknown field: user."], "omit": ["Unknown field: a.", "Unknown field: b."]}),
+        ]
+        for who, path, params, errors in cases:
+            with self.subTest(path=path, params=params):
+                response = self.client_for(getattr(self, who) if who else None).get(path, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), errors)
+
+    def test_dropped_columns_are_not_selected(self):
+        client = self.client_for(None)
+        for params, selected in (({}, True), ({"fields": "id,product_title"}, False), ({"omit": "description"}, False)):
+            catalog_cache.invalidate()
+            with self.subTest(params=params), CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(client.get("/api/v1/products/", params).status_code, 200)
+                self.assertEqual(any('"description"' in query["sql"] for query in ctx.captured_queries), selected)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client_for(self.admin).get("/api/v1/order/order-items/", {"fields": "id,quantity"})
+        self.assertFalse(any('"product_title"' in query["sql"] for query in ctx.captured_queries))
+
+    def test_keyset_pages_with_sparse_fields(self):
+        cases = [
+            (None, "/api/v1/products/", "id,price"),
+            ("user", "/api/v1/order/orders/", "id"),
+            ("admin", "/api/v1/order/order-items/", "id,quantity"),
+        ]
+        for who, path, fields in cases:
+            client = self.client_for(getattr(self, who) if who else None)
+            expected = [item["id"] for item in client.get(path, {"pagination": "keyset"}).json()["results"]]
+            with self.subTest(path=path), mock.patch.object(KeysetPageNumberPagination, "page_size", 1):
+                seen, params = [], {"pagination": "keyset", "fields": fields}
+                while params is not None:
+                    catalog_cache.invalidate()
+                    response = client.get(path, params).json()
+                    for item in response["results"]:
+                        self.assertEqual(set(item), set(fields.split(",")))
+                        seen.append(item["id"])
+                    next_url = response["next"]
+                    params = dict(parse_qsl(urlsplit(next_url).query)) if next_url else None
+                self.assertGreater(len(expected), 1)
+                self.assertEqual(seen, expected)
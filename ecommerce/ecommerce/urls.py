@@ -23,4 +23,5 @@ urlpatterns = [
     path('api/v1/', include('products.urls')),
     path('api/v1/', include('cart.urls')),
     path('api/v1/order/', include('orders.urls')),
+    path('api/v1/perf/', include('perf.urls')),
 ]
@@ -0,0 +1,110 @@
+import csv
+from datetime import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import serializers
+
+# (column, lookup from Order) in output order; one row per order item, orders without
+# items get a single row with empty item columns
+COLUMNS = (
+    ("order_id", "id"),
+    ("order_number", "order_number"),
+    ("user_id", "user_id"),
+    ("order_status", "status"),
+    ("order_total", "total"),
+    ("created_at", "created_at"),
+    ("city", "city"),
+    ("state", "state"),
+    ("postal_code", "postal_code"),
+    ("item_id", "items__id"),
+    ("product_id", "items__product_id"),
+    ("product_title", "items__product_title"),
+    ("quantity", "items__quantity"),
+    ("price", "items__price"),
+    ("item_status", "items__status"),
+)
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+# renders created_at exactly as the orders API does (DATETIME_FORMAT, current time zone)
+_datetime_field = serializers.DateTimeField()
+
+
+def _convert(row):
+    """
+    The row with its datetimes in the API's format, for either output.
+    """
+    return [_datetime_field.to_representation(value) if isinstance(value, datetime) else value for value in row]
+
+
+class _Line:
+    """
+    File-like object for `csv.writer` that hands back each written line.
+    """
+
+    def write(self, value):
+        return value
+
+
+def rows(orders, chunk_size=None):
+    """
+    Stream the order/item rows of `orders` in creation order.
+
+    Rows are fetched with `iterator()`, so memory use doesn't grow with the export
+    (on PostgreSQL the rows are read through a server-side cursor).
+
+    Args:
+        orders (QuerySet): The `Order` rows to export.
+        chunk_size (int): Rows fetched from the database at a time.
+
+    Returns:
+        iterator: Tuples in `COLUMNS` order.
+    """
+    return (
+        orders.order_by("created_at", "id", "items__id")
+        .values_list(*(lookup for _, lookup in COLUMNS))
+        .iterator(chunk_size=chunk_size or settings.ORDER_EXPORT_CHUNK_SIZE)
+    )
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow([column for column, _ in COLUMNS])
+    for row in rows:
+        yield writer.writerow(_convert(row))
+
+
+def _ndjson_lines(rows):
+    columns = [column for column, _ in COLUMNS]
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, _convert(row)))) + "\n"
+
+
+def stream(rows, output, batch_size=None):
+    """
+    Encode rows as CSV (with a header line) or NDJSON, a batch of lines per chunk.
+
+    Args:
+        rows (iterable): Tuples in `COLUMNS` order, e.g. from `rows()`.
+        output (str): One of `FORMATS`.
+        batch_size (int): Lines joined into each chunk sent to the client.
+
+    Returns:
+        iterator: str chunks.
+    """
+    lines = _csv_lines(rows) if output == "csv" else _ndjson_lines(rows)
+    batch_size = batch_size or settings.ORDER_EXPORT_CHUNK_SIZE
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
@@ -0,0 +1,18 @@
+import django_filters
+from .models import Order
+
+
+class OrderExportFilter(django_filters.FilterSet):
+    """
+    Filters for the order export: creation date range and order status.
+
+    Dates may be given as `YYYY-MM-DD` or full ISO datetimes; `created_before` is exclusive.
+    """
+
+    created_after = django_filters.DateTimeFilter(field_name="created_at", lookup_expr="gte")
+    created_before = django_filters.DateTimeFilter(field_name="created_at", lookup_expr="lt")
+    status = django_filters.MultipleChoiceFilter(choices=Order.OrderStatus.choices)
+
+    class Meta:
+        model = Order
+        fields = ["created_after", "created_before", "status"]
@@ -0,0 +1,73 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from cart.models import Addresses, Cart
+from products.models import Products
+from orders.services import create_order_from_cart
+
+
+class Command(BaseCommand):
+    """
+    Measure how many queries a checkout issues for growing cart sizes.
+
+    All data is created inside a transaction that is rolled back at the end,
+    so the command is safe to run against a development database.
+    """
+
+    help = "Benchmark checkout query count and latency for growing cart sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[1, 5, 25, 100],
+            help="Cart sizes to benchmark.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'cart size':>10} {'queries':>8} {'ms':>10}")
+        with transaction.atomic():
+            for size in options["sizes"]:
+                queries, elapsed = self.run_checkout(size)
+                self.stdout.write(f"{size:>10} {queries:>8} {elapsed * 1000:>10.2f}")
+            transaction.set_rollback(True)
+
+    def run_checkout(self, size):
+        user = User.objects.create_user(
+            first_name="Bench",
+            last_name="User",
+            username=f"bench_checkout_{size}",
+            email=f"bench_checkout_{size}@example.com",
+            password="Bench@1234",
+        )
+        address = Addresses.objects.create(
+            user=user,
+            address_line_1="1 Bench Street",
+            phone_number="9999999999",
+            city="Bench City",
+            state="Bench State",
+            postal_code="000000",
+            country="Benchland",
+        )
+        products = Products.objects.bulk_create(
+            Products(
+                product_title=f"Bench product {i}",
+                description="Benchmark product",
+                price=Decimal("10.00"),
+                stock=100,
+            )
+            for i in range(size)
+        )
+        Cart.objects.bulk_create(
+            Cart(user=user, product=product, quantity=2) for product in products
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            create_order_from_cart(user, address)
+            elapsed = time.perf_counter() - start
+
+        return len(ctx.captured_queries), elapsed
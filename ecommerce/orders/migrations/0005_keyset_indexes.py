@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_alter_orderitem_order_alter_orderitem_product'),
+        ('products', '0004_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['created_at', 'id'], name='orderitem_created_id_idx'),
+        ),
+    ]
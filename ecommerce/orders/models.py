@@ -1,5 +1,5 @@
 from django.db import models
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 import uuid
 
@@ -50,7 +50,9 @@ class Order(models.Model):
             for _ in range(5): # retry upto 5 times in case of collision
                 self.order_number = self.generate_transaction_no()
                 try:
-                    super().save(*args, **kwargs)
+                    # savepoint so a collision doesn't break an enclosing transaction
+                    with transaction.atomic():
+                        super().save(*args, **kwargs)
                     return 
                 except IntegrityError:
                     continue
@@ -65,6 +67,12 @@ class Order(models.Model):
     class Meta:
         verbose_name_plural = "Orders"
         ordering = ["-created_at"]
+        indexes = [
+            # keyset pagination
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            # a user's order history, newest first
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+        ]
 
 
 
@@ -129,3 +137,7 @@ class OrderItem(models.Model):
     class Meta:
         verbose_name_plural = "Order Items"
         ordering = ["-created_at"]
+        indexes = [
+            # keyset pagination
+            models.Index(fields=["created_at", "id"], name="orderitem_created_id_idx"),
+        ]
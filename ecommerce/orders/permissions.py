@@ -9,6 +9,6 @@ class IsAdminOrReadOnlyForOwner(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user.is_staff:
             return True
-        return request.method in SAFE_METHODS and obj.user == request.user
+        return request.method in SAFE_METHODS and obj.user_id == request.user.pk
     
 
@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from ecommerce.fieldsets import SparseFieldsetSerializerMixin
 from .models import Order, OrderItem
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = [
@@ -15,7 +16,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
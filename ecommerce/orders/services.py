@@ -0,0 +1,261 @@
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+from django.db.models.functions import Now
+from cart.models import MAX_QUANTITY_PER_PRODUCT, Cart
+from cart.services import update_cart
+from cart.summary import invalidate as invalidate_cart_summary
+from products.models import Products
+from products import sharding
+from products.cache import catalog_cache
+from products.reservations import available_stock, held_by_others, held_quantities, release
+from .models import Order, OrderItem
+
+
+class CheckoutError(Exception):
+    """
+    Raised when a cart cannot be turned into an order.
+    The message is safe to return to the client.
+    """
+
+
+def _stock_error(product_title, stock):
+    return CheckoutError(f"{product_title} has only {stock} items in stock.")
+
+
+def reserve_stock(lines, user):
+    """
+    Decrement stock for every (product, quantity) pair with a single conditional UPDATE.
+
+    Each product row is only touched when it still has enough stock once the live
+    reservations of other users are set aside, so a concurrent checkout can never drive
+    stock below zero or eat into someone else's hold. Must be called inside a transaction.
+
+    Args:
+        lines (list): (product_id, quantity) pairs, one per distinct product.
+        user (User): The user checking out; their own holds count as theirs.
+
+    Raises:
+        CheckoutError: If any product no longer has enough stock.
+    """
+    if not lines:
+        return
+
+    condition = Q()
+    whens = []
+    for product_id, quantity in lines:
+        condition |= Q(id=product_id, stock__gte=held_by_others(user) + quantity)
+        whens.append(When(id=product_id, then=F("stock") - quantity))
+
+    updated = Products.objects.filter(condition).update(
+        stock=Case(*whens, default=F("stock"), output_field=PositiveIntegerField()),
+        updated_at=Now(),
+    )
+    if updated == len(lines):
+        return
+
+    # Someone else bought the stock between our read and the update; report the
+    # first line that can no longer be fulfilled. The caller's transaction rolls
+    # back the rows that were decremented.
+    wanted = dict(lines)
+    available = available_stock(wanted, exclude_user=user)
+    for product in Products.objects.filter(id__in=wanted).only("id", "product_title"):
+        if available[product.id] < wanted[product.id]:
+            raise _stock_error(product.product_title, available[product.id])
+    raise CheckoutError("Some products in your cart are no longer available.")
+
+
+class _Undo(Exception):
+    """
+    Rolls back the savepoint of a fast-path shard decrement.
+    """
+
+
+def _decrement_unheld(product, quantity, user):
+    """
+    Fast path of `reserve_sharded_stock` for a product nobody else holds: decrement one
+    shard, then look at the holds again. A hold written meanwhile is visible by then,
+    because `reserve()` locks every shard of the product before counting its stock.
+
+    Returns:
+        bool: True if the stock was taken; False if the decrement was undone (holds
+            appeared, or not enough stock) and the caller must take the locked path.
+    """
+    try:
+        with transaction.atomic():
+            if not sharding.decrement(product.id, quantity, product.stock_shard_count):
+                raise _Undo
+            if held_quantities([product.id], exclude_user=user):
+                raise _Undo
+    except _Undo:
+        return False
+    return True
+
+
+def reserve_sharded_stock(lines, user):
+    """
+    Decrement stock for products whose stock is split across counter shards.
+
+    A product nobody else holds is decremented on a random shard; shard rows only ever go
+    down through conditional UPDATEs, so stock can't go negative. A product with live
+    holds of other users has all its shards locked while the holds are counted and the
+    stock is taken, so concurrent checkouts can't together eat into those holds.
+    Must be called inside a transaction.
+
+    Args:
+        lines (list): (product, quantity) pairs for sharded products.
+        user (User): The user checking out.
+
+    Raises:
+        CheckoutError: If any product no longer has enough stock.
+    """
+    if not lines:
+        return
+
+    lines = sorted(lines, key=lambda line: line[0].id)
+    held = held_quantities([product.id for product, _ in lines], exclude_user=user)
+
+    for product, quantity in lines:
+        if not held.get(product.id) and _decrement_unheld(product, quantity, user):
+            continue
+
+        rows = sharding.lock_shards(product.id)
+        total = sum(row.stock for row in rows)
+        available = max(total - held_quantities([product.id], exclude_user=user).get(product.id, 0), 0)
+        if quantity > available or not sharding.drain(product.id, rows, quantity):
+            raise _stock_error(product.product_title, available)
+
+
+def create_order_from_cart(user, address):
+    """
+    Turn the user's cart into an order in one transaction.
+
+    The cart is read once; stock is reserved with one conditional UPDATE, order items
+    are written with one bulk INSERT, and the cart and the user's stock holds are cleared
+    with one DELETE each, so the number of queries does not grow with the number of cart lines.
+    Products with sharded stock are the exception: each costs a few shard UPDATEs.
+
+    Args:
+        user (User): The user checking out.
+        address (Addresses): The delivery address, already validated to belong to the user.
+
+    Raises:
+        CheckoutError: If the cart is empty or a product does not have enough stock.
+
+    Returns:
+        Order: The created order.
+    """
+    with transaction.atomic():
+        cart_items = list(Cart.objects.select_related("product").filter(user_id=user.pk))
+        if not cart_items:
+            raise CheckoutError("Your cart is empty.")
+
+        plain = [item for item in cart_items if not item.product.stock_shard_count]
+        sharded = [item for item in cart_items if item.product.stock_shard_count]
+
+        for item in plain:
+            if item.quantity > item.product.stock:
+                raise _stock_error(item.product.product_title, item.product.stock)
+
+        reserve_stock([(item.product_id, item.quantity) for item in plain], user)
+        reserve_sharded_stock([(item.product, item.quantity) for item in sharded], user)
+
+        total_price = sum(item.product.price * item.quantity for item in cart_items)
+
+        order = Order.objects.create(
+            user_id=user.pk,
+            total=total_price,
+            address=address.full_address,
+            phone_number=address.phone_number,
+            city=address.city,
+            state=address.state,
+            postal_code=address.postal_code,
+        )
+
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    product_title=item.product.product_title,
+                    product_subtitle=item.product.product_subtitle,
+                    quantity=item.quantity,
+                    price=item.product.price,
+                )
+                for item in cart_items
+            ]
+        )
+
+        # only remove the lines that were ordered, not items added meanwhile
+        Cart.objects.filter(id__in=[item.id for item in cart_items]).delete()
+        release(user, [item.product_id for item in cart_items])
+        invalidate_cart_summary(user.pk)
+
+        # stock shown in the catalog changed without going through Products.save()
+        catalog_cache.invalidate_on_commit()
+
+    return order
+
+
+def add_order_to_cart(user, order_id):
+    """
+    Put the products of a previous order back into the user's cart.
+
+    The order lines are read with one query and the products they reference are checked
+    with another; every line that can still be bought is then upserted into the cart
+    with one bulk statement (a product already in the cart gets the ordered quantity).
+    Quantities are capped at the cart limit and the stock on hand.
+
+    Args:
+        user (User): The user re-ordering; only their own orders can be re-ordered.
+        order_id (int): The order to copy.
+
+    Raises:
+        Order.DoesNotExist: If the order does not exist or belongs to someone else.
+
+    Returns:
+        tuple: (added, skipped) lists of {"product", "quantity"} and
+               {"product", "product_title", "reason"} dicts; `product` is None for
+               lines whose product was deleted.
+    """
+    items = list(
+        OrderItem.objects.filter(order_id=order_id, order__user_id=user.pk)
+        .values_list("product_id", "product_title", "quantity")
+    )
+    if not items and not Order.objects.filter(pk=order_id, user_id=user.pk).exists():
+        raise Order.DoesNotExist
+
+    # the same product may appear on several lines; lines whose product was deleted
+    # have none and are reported one by one
+    wanted, titles, skipped = {}, {}, []
+    for product_id, title, quantity in items:
+        if product_id is None:
+            skipped.append({"product": None, "product_title": title, "reason": "This product is no longer sold."})
+            continue
+        wanted[product_id] = wanted.get(product_id, 0) + quantity
+        titles[product_id] = title
+
+    products = {
+        pk: (is_available, stock)
+        for pk, is_available, stock in Products.objects.filter(
+            id__in=list(wanted)
+        ).values_list("id", "is_available", "stock")
+    }
+
+    added = []
+    for product_id, quantity in wanted.items():
+        is_available, stock = products.get(product_id, (False, 0))
+        if product_id not in products:
+            reason = "This product is no longer sold."
+        elif not is_available:
+            reason = "This product is not available for purchase."
+        elif stock <= 0:
+            reason = "This product is out of stock."
+        else:
+            quantity = min(quantity, stock, MAX_QUANTITY_PER_PRODUCT)
+            added.append({"product": product_id, "quantity": quantity})
+            continue
+        skipped.append({"product": product_id, "product_title": titles[product_id], "reason": reason})
+
+    if added:
+        update_cart(user.pk, lines=[(line["product"], line["quantity"]) for line in added])
+    return added, skipped
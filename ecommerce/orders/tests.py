@@ -1,3 +1,259 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache, caches
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from cart.models import Addresses, Cart
+from products.models import Products, StockReservation
+from products.reservations import ReservationError, available_stock, expire, reserve
+from .models import Order, OrderItem
+from .services import CheckoutError, create_order_from_cart
+
+
+def make_user(username):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password="Test@12345",
+        first_name="Test", last_name="User",
+    )
+
+
+class CheckoutTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("buyer")
+        cls.other = make_user("holder")
+        cls.address = Addresses.objects.create(
+            user=cls.user, address_line_1="1 Test Street", phone_number="9999999999",
+            city="City", state="State", postal_code="000000", country="Country",
+        )
+        cls.mug = Products.objects.create(product_title="Mug", description="-", price=Decimal("4.50"), stock=5)
+        cls.tea = Products.objects.create(product_title="Tea", description="-", price=Decimal("2.00"), stock=3)
+
+    def setUp(self):
+        cache.clear()
+        caches[settings.CART_CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stock(self, product):
+        return Products.objects.values_list("stock", flat=True).get(pk=product.pk)
+
+
+class CheckoutTests(CheckoutTestCase):
+    def test_checkout_turns_the_cart_into_an_order(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=2)
+        Cart.objects.create(user=self.user, product=self.tea, quantity=3)
+
+        response = self.client.post("/api/v1/order/checkout/", {"address_id": self.address.pk}, format="json")
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.json()["order_id"])
+        self.assertEqual(order.total, Decimal("15.00"))
+        self.assertEqual(
+            set(OrderItem.objects.filter(order=order).values_list("product_title", "quantity", "price")),
+            {("Mug", 2, Decimal("4.50")), ("Tea", 3, Decimal("2.00"))},
+        )
+        self.assertEqual((self.stock(self.mug), self.stock(self.tea)), (3, 0))
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_checkout_is_all_or_nothing(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=2)
+        Cart.objects.create(user=self.user, product=self.tea, quantity=3)
+        Products.objects.filter(pk=self.tea.pk).update(stock=1)
+
+        with self.assertRaisesMessage(CheckoutError, "Tea has only 1 items in stock."):
+            create_order_from_cart(self.user, self.address)
+        self.assertEqual((self.stock(self.mug), self.stock(self.tea)), (5, 1))
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_empty_cart_and_foreign_address_are_rejected(self):
+        with self.assertRaisesMessage(CheckoutError, "Your cart is empty."):
+            create_order_from_cart(self.user, self.address)
+
+        self.client.force_authenticate(self.other)
+        response = self.client.post("/api/v1/order/checkout/", {"address_id": self.address.pk}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_reorder_adds_what_can_still_be_bought(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=4)
+        Cart.objects.create(user=self.user, product=self.tea, quantity=1)
+        order = create_order_from_cart(self.user, self.address)
+        Products.objects.filter(pk=self.tea.pk).update(is_available=False)
+
+        response = self.client.post(f"/api/v1/order/orders/{order.pk}/reorder/")
+        self.assertEqual(response.status_code, 200)
+        # only one mug is left
+        self.assertEqual(response.json()["added"], [{"product": self.mug.pk, "quantity": 1}])
+        self.assertEqual([item["product"] for item in response.json()["skipped"]], [self.tea.pk])
+        self.assertEqual(list(Cart.objects.filter(user=self.user).values_list("product", "quantity")), [(self.mug.pk, 1)])
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.post(f"/api/v1/order/orders/{order.pk}/reorder/").status_code, 404)
+
+    def test_checkout_and_reorder_drop_the_cart_summary(self):
+        def item_count():
+            return self.client.get("/api/v1/cart/summary/").json()["item_count"]
+
+        Cart.objects.create(user=self.user, product=self.mug, quantity=2)
+        self.assertEqual(item_count(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/v1/order/checkout/", {"address_id": self.address.pk}, format="json")
+        self.assertEqual(item_count(), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/v1/order/orders/{response.json()['order_id']}/reorder/")
+        self.assertEqual(item_count(), 2)
+
+    def test_reorder_reports_each_deleted_product(self):
+        order = Order.objects.create(user=self.user, total=Decimal("10.00"))
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=None, product_title="Teapot", quantity=1, price=Decimal("6.00")),
+            OrderItem(order=order, product=self.mug, product_title="Mug", quantity=1, price=Decimal("4.50")),
+            OrderItem(order=order, product=None, product_title="Saucer", quantity=2, price=Decimal("0.50")),
+        ])
+
+        response = self.client.post(f"/api/v1/order/orders/{order.pk}/reorder/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["added"], [{"product": self.mug.pk, "quantity": 1}])
+        self.assertEqual(
+            sorted((item["product"], item["product_title"], item["reason"]) for item in response.json()["skipped"]),
+            [(None, "Saucer", "This product is no longer sold."), (None, "Teapot", "This product is no longer sold.")],
+        )
+
+    def test_order_detail_answers_304_until_an_item_changes(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=1)
+        order = create_order_from_cart(self.user, self.address)
+        path = f"/api/v1/order/orders/{order.pk}/"
+        etag = self.client.get(path)["ETag"]
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        item = OrderItem.objects.get(order=order)
+        item.status = "approved"
+        item.save()
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ReservationTests(CheckoutTestCase):
+    def test_holds_set_stock_aside_for_other_users(self):
+        reserve(self.other, [(self.mug.pk, 4)])
+        self.assertEqual(available_stock([self.mug.pk], exclude_user=self.user), {self.mug.pk: 1})
+        self.assertEqual(available_stock([self.mug.pk], exclude_user=self.other), {self.mug.pk: 5})
+
+        with self.assertRaisesMessage(ReservationError, "Mug has only 1 items in stock."):
+            reserve(self.user, [(self.mug.pk, 2)])
+
+        Cart.objects.create(user=self.user, product=self.mug, quantity=2)
+        with self.assertRaisesMessage(CheckoutError, "Mug has only 1 items in stock."):
+            create_order_from_cart(self.user, self.address)
+        response = self.client.post("/api/v1/order/checkout/reserve/")
+        self.assertEqual(response.status_code, 409)
+
+    def test_reserving_replaces_holds_and_checkout_releases_them(self):
+        Cart.objects.create(user=self.user, product=self.mug, quantity=2)
+        reserve(self.user, [(self.tea.pk, 1)])
+        response = self.client.post("/api/v1/order/checkout/reserve/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            list(StockReservation.objects.filter(user=self.user).values_list("product", "quantity")),
+            [(self.mug.pk, 2)],
+        )
+
+        create_order_from_cart(self.user, self.address)
+        self.assertFalse(StockReservation.objects.filter(user=self.user).exists())
+        self.assertEqual(self.stock(self.mug), 3)
+
+    def test_expired_holds_no_longer_count(self):
+        reserve(self.other, [(self.mug.pk, 5)], ttl=timedelta(minutes=-1))
+        self.assertEqual(available_stock([self.mug.pk], exclude_user=self.user), {self.mug.pk: 5})
+        self.assertEqual(expire(timezone.now()), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class ExportTests(CheckoutTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = make_user("exporter")
+        cls.admin.is_staff = True
+        cls.admin.save()
+
+        cls.january = Order.objects.create(user=cls.user, total=Decimal("9.00"), city="Town")
+        OrderItem.objects.bulk_create([
+            OrderItem(order=cls.january, product=cls.mug, product_title="Mug", quantity=2, price=Decimal("4.50")),
+            OrderItem(order=cls.january, product=cls.tea, product_title="Tea", quantity=1, price=None),
+        ])
+        cls.february = Order.objects.create(user=cls.other, total=Decimal("0.00"), status="completed")
+        Order.objects.filter(pk=cls.january.pk).update(created_at=datetime(2026, 1, 10, 12, 30, 5, 250, dt_timezone.utc))
+        Order.objects.filter(pk=cls.february.pk).update(created_at=datetime(2026, 2, 1, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get("/api/v1/order/orders/export/", params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content).decode()
+
+    def exported_orders(self, **params):
+        _, body = self.export(output="ndjson", **params)
+        return [json.loads(line)["order_id"] for line in body.splitlines()]
+
+    def test_csv_and_ndjson_list_every_item(self):
+        created_at = {
+            order.pk: self.client.get(f"/api/v1/order/orders/{order.pk}/").json()["created_at"]
+            for order in (self.january, self.february)
+        }
+
+        response, body = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertTrue(response["Content-Disposition"].endswith('.csv"'))
+        csv_rows = list(csv.DictReader(io.StringIO(body)))
+        response, body = self.export(output="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        ndjson_rows = [json.loads(line) for line in body.splitlines()]
+
+        self.assertEqual([row["product_title"] for row in csv_rows], ["Mug", "Tea", ""])
+        self.assertEqual([row["product_title"] for row in ndjson_rows], ["Mug", "Tea", None])
+        self.assertEqual([row["price"] for row in csv_rows], ["4.50", "", ""])
+        self.assertEqual([row["price"] for row in ndjson_rows], ["4.50", None, None])
+        self.assertEqual(ndjson_rows[0]["city"], "Town")
+        self.assertEqual(ndjson_rows[2]["order_status"], "completed")
+        # both formats write the creation time as the orders API does
+        for rows in (csv_rows, ndjson_rows):
+            self.assertEqual(
+                [row["created_at"] for row in rows],
+                [created_at[self.january.pk]] * 2 + [created_at[self.february.pk]],
+            )
+        self.assertEqual(
+            [{key: str(value) for key, value in row.items() if value is not None} for row in ndjson_rows],
+            [{key: value for key, value in row.items() if value} for row in csv_rows],
+        )
+
+    def test_filters(self):
+        self.assertEqual(self.exported_orders(created_after="2026-01-15"), [self.february.pk])
+        self.assertEqual(self.exported_orders(created_before="2026-01-15"), [self.january.pk] * 2)
+        self.assertEqual(
+            self.exported_orders(created_after="2026-01-10T12:30:05.000250Z"), [self.january.pk] * 2 + [self.february.pk]
+        )
+        self.assertEqual(self.exported_orders(created_before="2026-02-01T00:00:00Z"), [self.january.pk] * 2)
+        self.assertEqual(self.exported_orders(status=["completed", "cancelled"]), [self.february.pk])
+        self.assertEqual(self.exported_orders(status="refunded"), [])
+
+    def test_bad_filters_and_output_are_rejected(self):
+        for params in ({"output": "xml"}, {"created_after": "yesterday"}, {"status": "lost"}):
+            with self.subTest(params=params):
+                response = self.client.get("/api/v1/order/orders/export/", params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(list(response.json()), ["error"] if "output" in params else list(params))
 
-# Create your tests here.
+    def test_only_admins_can_export(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/v1/order/orders/export/").status_code, 403)
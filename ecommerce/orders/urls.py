@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import CreateOrderView, OrderViewSet, OrderItemListView, OrderItemUpdateView
+from .views import CreateOrderView, ReserveStockView, OrderViewSet, OrderItemListView, OrderItemUpdateView
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
@@ -7,6 +7,7 @@ router.register("orders", OrderViewSet, basename='orders')
 
 urlpatterns = router.urls + [
     path('checkout/', CreateOrderView.as_view(), name='checkout'),
+    path('checkout/reserve/', ReserveStockView.as_view(), name='checkout-reserve'),
     path("order-items/", OrderItemListView.as_view(), name="orderitem-list"),
     path("order-items/<int:pk>/", OrderItemUpdateView.as_view(), name="orderitem-update"),
 ]
@@ -1,12 +1,24 @@
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView, UpdateAPIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from cart.models import Addresses, Cart
+from products.reservations import ReservationError, reserve
 from rest_framework.response import Response
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from ecommerce.conditional import ConditionalGetMixin
+from ecommerce.fastserializers import FastListMixin
+from ecommerce.fieldsets import SparseFieldsetViewMixin
+from ecommerce.pagination import KeysetPageNumberPagination
+from . import export
+from .filters import OrderExportFilter
 from .models import Order, OrderItem
 from .serializers import OrderSerializer, OrderItemUpdateSerializer, OrderItemSerializer
 from .permissions import IsAdminOrReadOnlyForOwner
+from .services import CheckoutError, add_order_to_cart, create_order_from_cart
 
 # Create your views here.
 class CreateOrderView(APIView):
@@ -23,62 +35,26 @@ class CreateOrderView(APIView):
 
         # validate address_id
         try:
-            address = Addresses.objects.get(id=address_id, user=user)
+            address = Addresses.objects.get(id=address_id, user_id=user.pk)
         except Addresses.DoesNotExist:
             return Response(
                 {"error": "Invalid address ID."},
                 status = status.HTTP_400_BAD_REQUEST
             )
         
-        cart_items = Cart.objects.select_related("product").filter(user=user)
-        if not cart_items.exists():
+        try:
+            order = create_order_from_cart(user, address)
+        except CheckoutError as exc:
             return Response(
-                {"error": "Your cart is empty."},
+                {"error": str(exc)},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        for item in cart_items:
-            if item.quantity > item.product.stock:
-                return Response(
-                    {"error": f"{item.product.product_title} has only {item.product.stock} items in stock."},
-                    status = status.HTTP_400_BAD_REQUEST
-                )
-            
-        # calculate total price
-        total_price = sum(item.product.price * item.quantity for item in cart_items)
-
-        # create order
-        order = Order.objects.create(
-            user=user, 
-            total=total_price, 
-            address=address.full_address, 
-            phone_number=address.phone_number,
-            city=address.city,
-            state=address.state,
-            postal_code=address.postal_code
-        )
-
-        # create order items
-        for item in cart_items:
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                product_title=item.product.product_title,
-                product_subtitle=item.product.product_subtitle,
-                quantity=item.quantity,
-                price=item.product.price
-            )
-            item.product.stock -= item.quantity
-            item.product.save()
-
-        # clear cart 
-        cart_items.delete()
 
         return Response(
             {
                 "message": "Order created successfully.",
                 "order_id": order.id,
-                "total_price": total_price,
+                "total_price": order.total,
                 "order_number": order.order_number
             },
             status=status.HTTP_201_CREATED
@@ -86,15 +62,58 @@ class CreateOrderView(APIView):
 
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class ReserveStockView(APIView):
+    """
+    Hold stock for the items in the user's cart while they complete checkout.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        lines = list(Cart.objects.filter(user_id=request.user.pk).values_list("product_id", "quantity"))
+        if not lines:
+            return Response(
+                {"error": "Your cart is empty."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            expires_at = reserve(request.user, lines)
+        except ReservationError as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return Response(
+            {
+                "message": "Stock reserved.",
+                "expires_at": expires_at,
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+
+class OrderViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnlyForOwner]
+    pagination_class = KeysetPageNumberPagination
+    sparse_required_fields = ["created_at"]
+    # order detail answers If-None-Match / If-Modified-Since; the order and its items count
+    conditional_actions = ["retrieve"]
+    conditional_related = ["items"]
 
     def get_queryset(self):
+        queryset = Order.objects.all()
+        if self.includes_field("items"):
+            # one extra query for the items of the whole page, loading only the serialized columns
+            queryset = queryset.prefetch_related(Prefetch(
+                "items", queryset=OrderItem.objects.only("order", *OrderItemSerializer.Meta.fields)
+            ))
         user = self.request.user
         if user.is_staff:
-            return Order.objects.all()
-        return Order.objects.filter(user=user)
+            return queryset
+        return queryset.filter(user_id=user.pk)
     
     def perform_create(self, serializer):
         """
@@ -112,13 +131,63 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         return Response({"error": "Deleting orders is not allowed."}, status=403)
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser], pagination_class=None)
+    def export(self, request):
+        """
+        Stream every order with its items as CSV or NDJSON (`output=csv|ndjson`).
+
+        Filterable by `created_after`, `created_before` and `status`. Rows are read and
+        written in chunks, so memory use stays flat however many orders are exported.
+        """
+        output = request.query_params.get("output", "csv")
+        if output not in export.FORMATS:
+            return Response(
+                {"error": f"output must be one of: {', '.join(export.FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filterset = OrderExportFilter(request.query_params, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export.stream(export.rows(filterset.qs), output),
+            content_type=export.FORMATS[output],
+        )
+        filename = f"orders-{timezone.now():%Y%m%d%H%M%S}.{output}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
+    def reorder(self, request, pk=None):
+        """
+        Add the products of one of the user's previous orders back to their cart.
+        """
+        try:
+            added, skipped = add_order_to_cart(request.user, pk)
+        except (Order.DoesNotExist, ValueError):
+            return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(
+            {
+                "message": f"{len(added)} products added to your cart.",
+                "added": added,
+                "skipped": skipped,
+            },
+            status=status.HTTP_200_OK,
+        )
     
 
 
-class OrderItemListView(ListAPIView):
+class OrderItemListView(SparseFieldsetViewMixin, FastListMixin, ListAPIView):
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = KeysetPageNumberPagination
+    sparse_required_fields = ["created_at"]
+    # read by the keyset pagination
+    fast_list_columns = ["pk", "created_at"]
 
 class OrderItemUpdateView(UpdateAPIView):
     queryset = OrderItem.objects.all()
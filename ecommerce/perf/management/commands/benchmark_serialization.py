@@ -0,0 +1,120 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from cart.views import CartViewSet
+from ecommerce.fastserializers import FastJSONRenderer, orjson
+from orders.views import OrderItemListView
+from perf.seed import seed
+from products import sharding
+from products.cache import catalog_cache
+from products.views import ProductViewSet
+
+# (name, view, list path, who asks)
+ENDPOINTS = [
+    ("products", ProductViewSet, "/api/v1/products/", "user"),
+    ("order items", OrderItemListView, "/api/v1/order/order-items/", "admin"),
+    ("cart", CartViewSet, "/api/v1/cart/", "user"),
+]
+
+
+class Command(BaseCommand):
+    """
+    Compare rows/sec of the DRF serializers and the fast serializer path on the product,
+    order item and cart lists.
+
+    Seeds `--rows` products, cart lines and orders (three items each) inside a
+    transaction that is rolled back at the end. "serialize" loads up to `--rows` rows of
+    each list and renders them to JSON: model instances through the serializer and
+    `JSONRenderer`, against `values_list()` rows through `FastSerializer` and
+    `FastJSONRenderer`. "request" times whole list requests (one page) through the test
+    client with `FAST_SERIALIZATION` off and on, clearing the catalog cache first. Both
+    check that the two paths return the same bytes.
+    """
+
+    help = "Benchmark DRF vs fast serialization of the product, order item and cart lists."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--requests", type=int, default=50, help="List requests per run.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            data = seed("serialization_benchmark", options["rows"], sharded=10)
+            self.stdout.write(f"orjson {'installed' if orjson else 'not installed (json module)'}")
+            self.stdout.write(
+                f"{'endpoint':<12} {'stage':<10} {'rows':>6} {'drf rows/s':>11} {'fast rows/s':>12} "
+                f"{'speedup':>8} {'same bytes':>11}"
+            )
+            for name, view_class, path, who in ENDPOINTS:
+                self.report(name, "serialize", *self.serialize(view_class, data[who], options))
+                self.report(name, "request", *self.request(path, data[who], options))
+            transaction.set_rollback(True)
+
+    def view(self, view_class, user):
+        request = Request(APIRequestFactory().get("/"))
+        request.user = user
+        view = view_class(request=request, args=(), kwargs={}, action="list", format_kwarg=None)
+        view.shard_totals = sharding.shard_totals(
+            view.get_queryset().filter(stock_shard_count__gt=0).values_list("pk", flat=True)
+        ) if view_class is ProductViewSet else None
+        return view
+
+    def serialize(self, view_class, user, options):
+        view = self.view(view_class, user)
+        queryset = view.filter_queryset(view.get_queryset())
+        context = view.get_serializer_context()
+        compiled = view.fast_serializer()
+        rows = options["rows"]
+
+        def drf():
+            instances = list(queryset[:rows])
+            return JSONRenderer().render(view.get_serializer(instances, many=True).data), len(instances)
+
+        def fast():
+            page = list(compiled.rows(queryset)[:rows])
+            return FastJSONRenderer().render(compiled.data(page, context)), len(page)
+
+        (slow_body, count), slow_seconds = self.time(drf, options["repeat"])
+        (fast_body, _), fast_seconds = self.time(fast, options["repeat"])
+        return count, count / slow_seconds, count / fast_seconds, slow_body == fast_body
+
+    def request(self, path, user, options):
+        client = APIClient()
+        client.force_authenticate(user)
+        results = {}
+        for fast in (False, True):
+            with override_settings(ALLOWED_HOSTS=["testserver"], FAST_SERIALIZATION=fast):
+                def get():
+                    catalog_cache.invalidate()
+                    response = client.get(path)
+                    return response.content, len(response.json()["results"])
+
+                self.time(get, 2)
+                timings = [self.time(get, 1)[1] for _ in range(options["requests"])]
+                results[fast] = (get(), statistics.median(timings))
+
+        (slow_body, count), slow_seconds = results[False]
+        (fast_body, _), fast_seconds = results[True]
+        return count, count / slow_seconds, count / fast_seconds, slow_body == fast_body
+
+    def time(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - start)
+        return result, statistics.median(timings)
+
+    def report(self, name, stage, rows, slow, fast, same):
+        self.stdout.write(
+            f"{name:<12} {stage:<10} {rows:>6} {slow:>11.0f} {fast:>12.0f} "
+            f"{fast / slow:>7.2f}x {'yes' if same else 'NO':>11}"
+        )
@@ -0,0 +1,102 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from perf.seed import seed
+from products.cache import catalog_cache
+
+
+class Command(BaseCommand):
+    """
+    Check that the list and detail endpoints are served by index scans.
+
+    Each endpoint is called through the DRF test client against a small seeded dataset
+    (inside a transaction that is rolled back), and every SELECT it issues is run
+    through EXPLAIN. On PostgreSQL sequential scans are disabled for the check, so the
+    planner only falls back to one when no index can serve the query; on SQLite any
+    full-table `SCAN` is reported. The command fails if any query scans a whole table.
+    """
+
+    help = "EXPLAIN every endpoint query and fail on sequential scans."
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ("postgresql", "sqlite"):
+            raise CommandError(f"EXPLAIN checks are not implemented for {vendor}.")
+
+        failures = []
+        with override_settings(ALLOWED_HOSTS=["testserver"]), transaction.atomic():
+            if vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            data = seed("explain", rows=20)
+            for name, path, params, user in self.endpoints(data):
+                failures += self.check_endpoint(name, path, params, user, vendor, options["verbosity"])
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(
+                "Sequential scans found:\n" + "\n".join(f"  {name}: {line}" for name, line in failures)
+            )
+        self.stdout.write(self.style.SUCCESS("All endpoint queries use indexes."))
+
+    def endpoints(self, data):
+        user, admin = data["user"], data["admin"]
+        return [
+            ("products-list", "/api/v1/products/", {}, None),
+            ("products-list by price", "/api/v1/products/", {"ordering": "price"}, None),
+            ("products-list in stock by price", "/api/v1/products/",
+             {"is_available": "true", "in_stock": "true", "ordering": "price"}, None),
+            ("products-list keyset", "/api/v1/products/", {"pagination": "keyset"}, None),
+            ("products-detail", f"/api/v1/products/{data['products'][0].pk}/", {}, None),
+            ("products-async-list", "/api/v1/async/products/", {}, None),
+            ("products-async-list keyset", "/api/v1/async/products/", {"pagination": "keyset"}, None),
+            ("products-async-detail", f"/api/v1/async/products/{data['products'][0].pk}/", {}, None),
+            ("cart-list", "/api/v1/cart/", {}, user),
+            ("address-list", "/api/v1/address/", {}, user),
+            ("orders-list", "/api/v1/order/orders/", {}, user),
+            ("orders-list keyset", "/api/v1/order/orders/", {"pagination": "keyset"}, user),
+            ("orders-detail", f"/api/v1/order/orders/{data['orders'][0].pk}/", {}, user),
+            ("orderitem-list", "/api/v1/order/order-items/", {}, admin),
+            ("orderitem-list keyset", "/api/v1/order/order-items/", {"pagination": "keyset"}, admin),
+        ]
+
+    def check_endpoint(self, name, path, params, user, vendor, verbosity):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        catalog_cache.invalidate()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(path, params)
+        if response.status_code != 200:
+            raise CommandError(f"{name}: GET {path} returned {response.status_code}")
+
+        failures = []
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plan = self.explain(sql, vendor)
+            scans = self.sequential_scans(plan, vendor)
+            failures += [(name, scan) for scan in scans]
+            if verbosity > 1 or scans:
+                self.stdout.write(f"{name}: {sql}\n    " + plan.replace("\n", "\n    "))
+        status = self.style.ERROR("SEQ SCAN") if failures else self.style.SUCCESS("ok")
+        self.stdout.write(f"{name:<35} {len(ctx.captured_queries):>3} queries  {status}")
+        return failures
+
+    def explain(self, sql, vendor):
+        prefix = "EXPLAIN" if vendor == "postgresql" else "EXPLAIN QUERY PLAN"
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}")
+            rows = cursor.fetchall()
+        return "\n".join(str(row[-1]) for row in rows)
+
+    def sequential_scans(self, plan, vendor):
+        if vendor == "postgresql":
+            return re.findall(r"Seq Scan on \w+", plan)
+        return [line.strip() for line in plan.splitlines() if re.fullmatch(r"\s*SCAN \w+", line)]
@@ -0,0 +1,306 @@
+import statistics
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, get_resolver, resolve
+from rest_framework.test import APIClient
+
+from accounts.activity import activity
+from accounts.serializers import CustomTokenObtainPairSerializer
+from cart.models import Cart
+from orders.models import OrderItem
+from perf.seed import PASSWORD, seed_volume
+from products.cache import catalog_cache
+from products.models import Products
+
+Scenario = namedtuple("Scenario", "name method path who data queries p99_ms")
+
+# Every route in ecommerce/urls.py needs at least one scenario (the command checks).
+# `path` and string values in `data` are formatted with the refs from `references()`.
+# Budgets: queries on a cold cache, and p99 latency in milliseconds. Product writes allow
+# one more query for the search_vector UPDATE PostgreSQL does. Product and order
+# details include the conditional GET aggregate.
+SCENARIOS = [
+    # accounts
+    Scenario("login", "post", "/api/v1/accounts/login/", None,
+             {"email": "{email}", "password": PASSWORD}, 2, 2500),
+    Scenario("token refresh", "post", "/api/v1/accounts/token/refresh/", None,
+             {"refresh": "{refresh}"}, 1, 50),
+    Scenario("logout", "post", "/api/v1/accounts/logout/", "user", {"refresh": "{refresh}"}, 3, 100),
+    Scenario("register", "post", "/api/v1/accounts/register/", None, {
+        "username": "perf_new", "email": "perf_new@example.com", "first_name": "Perf",
+        "last_name": "New", "password": PASSWORD, "confirm_password": PASSWORD,
+    }, 3, 2500),
+    Scenario("profile", "get", "/api/v1/accounts/profile/", "user", None, 2, 50),
+    Scenario("profile update", "patch", "/api/v1/accounts/profile/", "user",
+             {"first_name": "Perf"}, 3, 100),
+    # products
+    Scenario("api root", "get", "/api/v1/", "user", None, 1, 50),
+    Scenario("products list", "get", "/api/v1/products/", None, None, 3, 400),
+    Scenario("products list in stock by price", "get",
+             "/api/v1/products/?is_available=true&in_stock=true&ordering=price", None, None, 3, 400),
+    Scenario("products list keyset", "get", "/api/v1/products/?pagination=keyset", None, None, 2, 400),
+    # the SQLite fallback ranks every match in SQL; PostgreSQL uses the GIN index
+    Scenario("products search", "get", "/api/v1/products/?search=wireless%20head", None, None, 3, 1000),
+    Scenario("products detail", "get", "/api/v1/products/{product}/", None, None, 2, 50),
+    Scenario("products create", "post", "/api/v1/products/", "admin", {
+        "product_title": "Perf new product", "description": "Perf", "price": "9.99", "stock": 5,
+    }, 3, 100),
+    Scenario("products update", "patch", "/api/v1/products/{product}/", "admin", {"price": "19.99"}, 4, 100),
+    Scenario("products delete", "delete", "/api/v1/products/{product}/", "admin", None, 7, 200),
+    Scenario("products async list", "get", "/api/v1/async/products/", None, None, 3, 400),
+    Scenario("products async list keyset", "get", "/api/v1/async/products/?pagination=keyset",
+             None, None, 2, 400),
+    Scenario("products async detail", "get", "/api/v1/async/products/{product}/", None, None, 2, 50),
+    Scenario("products import", "post", "/api/v1/products/import/", "admin", {"file": (
+        "feed.csv",
+        "sku,product_title,description,price,stock\nPERF-1,Perf feed 1,Perf,9.99,5\nPERF-2,Perf feed 2,Perf,1.50,0\n",
+    )}, 6, 150),
+    Scenario("products inventory", "post", "/api/v1/products/inventory/", "admin",
+             {"items": [{"id": "{product}", "stock_delta": 2, "price": "12.50"}, {"id": "{cart_product}", "stock": 3}]},
+             5, 100),
+    Scenario("products suggest", "get", "/api/v1/products/suggest/?q=wire", None, None, 0, 50),
+    Scenario("products cache stats", "get", "/api/v1/products/cache-stats/", "admin", None, 1, 50),
+    # cart and addresses
+    Scenario("cart list", "get", "/api/v1/cart/", "user", None, 3, 150),
+    Scenario("cart add", "post", "/api/v1/cart/", "user", {"product": "{new_product}"}, 5, 100),
+    Scenario("cart detail", "get", "/api/v1/cart/{cart}/", "user", None, 2, 50),
+    Scenario("cart update", "patch", "/api/v1/cart/{cart}/", "user", {"quantity": 1}, 3, 100),
+    Scenario("cart remove", "delete", "/api/v1/cart/{cart}/", "user", None, 3, 100),
+    Scenario("cart clear", "delete", "/api/v1/cart/clear/", "user", None, 3, 100),
+    Scenario("cart summary", "get", "/api/v1/cart/summary/", "user", None, 2, 50),
+    Scenario("cart bulk", "post", "/api/v1/cart/bulk/", "user",
+             {"items": [{"product": "{new_product}", "quantity": 1}], "remove": ["{cart_product}"]}, 7, 150),
+    Scenario("address list", "get", "/api/v1/address/", "user", None, 3, 50),
+    Scenario("address create", "post", "/api/v1/address/", "user", {
+        "address_line_1": "2 Perf Street", "phone_number": "9999999999", "city": "City",
+        "state": "State", "postal_code": "000000", "country": "Country",
+    }, 2, 100),
+    Scenario("address detail", "get", "/api/v1/address/{address}/", "user", None, 2, 50),
+    Scenario("address update", "patch", "/api/v1/address/{address}/", "user", {"city": "Town"}, 3, 100),
+    Scenario("address delete", "delete", "/api/v1/address/{address}/", "user", None, 3, 100),
+    # orders
+    Scenario("checkout reserve", "post", "/api/v1/order/checkout/reserve/", "user", None, 8, 200),
+    Scenario("checkout", "post", "/api/v1/order/checkout/", "user", {"address_id": "{address}"}, 12, 300),
+    Scenario("orders list", "get", "/api/v1/order/orders/", "user", None, 4, 400),
+    Scenario("orders list admin", "get", "/api/v1/order/orders/", "admin", None, 4, 400),
+    Scenario("orders detail", "get", "/api/v1/order/orders/{order}/", "user", None, 4, 50),
+    Scenario("orders update", "patch", "/api/v1/order/orders/{order}/", "admin",
+             {"status": "completed"}, 5, 100),
+    Scenario("orders export csv", "get", "/api/v1/order/orders/export/", "admin", None, 2, 1500),
+    Scenario("orders export ndjson", "get", "/api/v1/order/orders/export/?output=ndjson&status=pending",
+             "admin", None, 2, 1500),
+    Scenario("orders reorder", "post", "/api/v1/order/orders/{order}/reorder/", "user", None, 6, 150),
+    Scenario("order items list", "get", "/api/v1/order/order-items/", "admin", None, 3, 400),
+    Scenario("order item update", "patch", "/api/v1/order/order-items/{item}/", "admin",
+             {"status": "approved"}, 3, 100),
+    # perf
+    Scenario("perf metrics", "get", "/api/v1/perf/metrics/", "admin", None, 1, 50),
+]
+
+
+def route_names(patterns=None):
+    """
+    Names of every URL pattern in the project, except the admin site.
+    """
+    names = set()
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name != "admin":
+                names |= route_names(pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def fill(value, refs):
+    if isinstance(value, str):
+        formatted = value.format(**refs)
+        return refs[value[1:-1]] if value.startswith("{") and value.endswith("}") else formatted
+    if isinstance(value, dict):
+        return {key: fill(item, refs) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, refs) for item in value]
+    return value
+
+
+class Command(BaseCommand):
+    """
+    Query-count and latency budgets for every route.
+
+    Seeds a realistically sized dataset (inside a transaction that is rolled back), then
+    runs each scenario in `SCENARIOS` through the DRF test client `--iterations` times,
+    every call in its own savepoint so writes don't leak into the next one. After one
+    warm-up call (which loads the in-process indexes), the first measured call runs
+    with cold shared caches and its query count is checked against the
+    budget. The p99 latency over all calls is compared with the latency budget (scaled
+    by `--latency-scale` for slower machines) and reported, but only fails the run with
+    `--fail-on-latency`: with the default iterations p99 is close to the slowest call.
+    Fails on any query budget overrun, unexpected status code, or route without a
+    scenario. Works on SQLite. The query budgets are also pinned in `perf/tests.py`.
+    """
+
+    help = "Run every route against seeded data and fail on query-count budget overruns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--orders", type=int, default=1000)
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument(
+            "--latency-scale", type=float, default=1.0,
+            help="Multiply every latency budget, e.g. 2 on a slow machine.",
+        )
+        parser.add_argument(
+            "--fail-on-latency", action="store_true",
+            help="Also fail on p99 latency overruns; use enough --iterations (100+) for a real p99.",
+        )
+        parser.add_argument("--only", help="Run only scenarios whose name contains this text.")
+
+    def handle(self, *args, **options):
+        scenarios = [s for s in SCENARIOS if not options["only"] or options["only"] in s.name]
+        missing = route_names() - {resolve(s.path.split("?")[0].format(**self.sample_refs())).url_name
+                                   for s in SCENARIOS}
+        if missing:
+            raise CommandError("Routes without a perf scenario: " + ", ".join(sorted(missing)))
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=["testserver"], ACTIVITY_FLUSH_SECONDS=3600), \
+                transaction.atomic():
+            started = time.perf_counter()
+            data = seed_volume(
+                "budget", users=options["users"], products=options["products"], orders=options["orders"]
+            )
+            self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+            refs = self.references(data)
+            clients = self.clients(data)
+            for scenario in scenarios:
+                results.append(self.run(
+                    scenario, clients[scenario.who], refs, options["iterations"], options["verbosity"]
+                ))
+            activity.flush()
+            transaction.set_rollback(True)
+
+        failures, slow = [], []
+        scale = options["latency_scale"]
+        self.stdout.write(f"{'scenario':<34} {'queries':>9} {'p50 ms':>8} {'p99 ms':>14}")
+        for scenario, queries, p50, p99 in results:
+            over = []
+            if queries > scenario.queries:
+                over.append("queries")
+            if p99 > scenario.p99_ms * scale:
+                slow.append(scenario.name)
+                if options["fail_on_latency"]:
+                    over.append("latency")
+            if over:
+                failures.append(f"{scenario.name} ({', '.join(over)})")
+                status = self.style.ERROR("OVER")
+            elif scenario.name in slow:
+                status = self.style.WARNING("slow")
+            else:
+                status = self.style.SUCCESS("ok")
+            self.stdout.write(
+                f"{scenario.name:<34} {queries:>4}/{scenario.queries:<4} {p50:>8.1f} "
+                f"{p99:>7.1f}/{scenario.p99_ms * scale:<6.0f} {status}"
+            )
+
+        if slow and not options["fail_on_latency"]:
+            self.stdout.write(self.style.WARNING(
+                f"Over the latency budget (advisory, {options['iterations']} iterations): " + ", ".join(slow)
+            ))
+        if failures:
+            raise CommandError("Budgets exceeded: " + ", ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All routes are within their query budgets."))
+
+    @staticmethod
+    def sample_refs():
+        return {key: 1 for key in ("product", "new_product", "cart", "cart_product", "address", "order", "item")}
+
+    def references(self, data):
+        user = data["user"]
+        lines = list(Cart.objects.filter(user=user).values_list("id", "product_id"))
+        in_cart = {product_id for _, product_id in lines}
+        new_product = (
+            Products.objects.filter(is_available=True, stock__gt=0, stock_shard_count=0)
+            .exclude(pk__in=in_cart)
+            .values_list("pk", flat=True)
+            .first()
+        )
+        order = next(order for order in data["orders"] if order.user_id == user.pk)
+        refresh = CustomTokenObtainPairSerializer.get_token(user)
+        return {
+            "email": user.email,
+            "refresh": str(refresh),
+            "product": new_product,
+            "new_product": new_product,
+            "cart": lines[0][0],
+            "cart_product": lines[0][1],
+            "address": data["address"].pk,
+            "order": order.pk,
+            "item": OrderItem.objects.filter(order=order).values_list("id", flat=True).first(),
+        }
+
+    def clients(self, data):
+        clients = {None: APIClient()}
+        for who in ("user", "admin"):
+            token = CustomTokenObtainPairSerializer.get_token(data[who]).access_token
+            clients[who] = APIClient()
+            clients[who].credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return clients
+
+    def call(self, client, method, path, payload):
+        if payload and any(isinstance(value, tuple) for value in payload.values()):
+            # (file name, content) values are uploaded as files
+            payload = {
+                key: SimpleUploadedFile(value[0], value[1].encode()) if isinstance(value, tuple) else value
+                for key, value in payload.items()
+            }
+            response = getattr(client, method)(path, payload, format="multipart")
+        else:
+            response = getattr(client, method)(path, payload, format="json")
+        if response.streaming:
+            # streamed bodies are produced (and queried for) while being read
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    def run(self, scenario, client, refs, iterations, verbosity):
+        path = scenario.path.format(**refs)
+        payload = fill(scenario.data, refs) if scenario.data is not None else None
+        # warm the per-process indexes, then start from cold shared caches
+        with transaction.atomic():
+            self.call(client, scenario.method, path, payload)
+            transaction.set_rollback(True)
+        cache.clear()
+        caches[settings.CART_CACHE_ALIAS].clear()
+        catalog_cache.invalidate()
+
+        timings, queries = [], None
+        for _ in range(iterations):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = self.call(client, scenario.method, path, payload)
+                    timings.append((time.perf_counter() - started) * 1000)
+                transaction.set_rollback(True)
+            if response.status_code >= 300:
+                raise CommandError(
+                    f"{scenario.name}: {scenario.method.upper()} {path} returned "
+                    f"{response.status_code}: {response.content[:200]!r}"
+                )
+            if queries is None:
+                queries = len(ctx.captured_queries)
+                if verbosity > 1:
+                    self.stdout.write(f"{scenario.name}:")
+                    for query in ctx.captured_queries:
+                        self.stdout.write(f"    {query['sql'][:200]}")
+
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(round(0.99 * (len(timings) - 1))))]
+        return scenario, queries, statistics.median(timings), p99
@@ -0,0 +1,71 @@
+import glob
+import json
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Roll up the per-request query reports written by `QueryReportMiddleware`.
+
+    Repeated SQL shapes are aggregated across every report in the directory: how many
+    requests (and which routes) ran each shape repeatedly, how many times in total, and
+    the code each run came from. Slow queries are listed with their origin. With
+    `--fail-on-repeated` the command exits non-zero when any repeated shape is found, so
+    it can gate a test or staging run.
+    """
+
+    help = "Summarize N+1 and slow-query findings from the per-request query reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directory", nargs="?", default=None,
+            help="Report directory (defaults to settings.PERF_QUERY_REPORT_DIR).",
+        )
+        parser.add_argument("--top", type=int, default=20, help="How many shapes to list.")
+        parser.add_argument(
+            "--fail-on-repeated", action="store_true",
+            help="Exit with an error if any request repeated a query shape.",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or settings.PERF_QUERY_REPORT_DIR
+        if not directory or not os.path.isdir(directory):
+            raise CommandError("No report directory; pass one or set PERF_QUERY_REPORT_DIR.")
+
+        paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+        shapes = defaultdict(lambda: {"requests": 0, "count": 0, "routes": set(), "origins": defaultdict(int)})
+        slow = []
+        for path in paths:
+            with open(path) as handle:
+                report = json.load(handle)
+            for item in report["repeated"]:
+                entry = shapes[item["shape"]]
+                entry["requests"] += 1
+                entry["count"] += item["count"]
+                entry["routes"].add(report["route"])
+                for origin, count in item["origins"].items():
+                    entry["origins"][origin] += count
+            slow += [dict(query, route=report["route"]) for query in report["slow"]]
+
+        self.stdout.write(f"{len(paths)} reports, {len(shapes)} repeated query shapes, {len(slow)} slow queries.")
+        ranked = sorted(shapes.items(), key=lambda item: -item[1]["count"])[:options["top"]]
+        for shape, entry in ranked:
+            self.stdout.write("")
+            self.stdout.write(self.style.WARNING(
+                f"{entry['count']} runs in {entry['requests']} requests ({', '.join(sorted(entry['routes']))})"
+            ))
+            self.stdout.write(f"  {shape}")
+            for origin, count in sorted(entry["origins"].items(), key=lambda item: -item[1]):
+                self.stdout.write(f"  {count:>6}x {origin}")
+
+        for query in sorted(slow, key=lambda query: -query["ms"])[:options["top"]]:
+            self.stdout.write("")
+            self.stdout.write(self.style.WARNING(f"slow: {query['ms']} ms on {query['route']} from {query['origin']}"))
+            self.stdout.write(f"  {query['sql']}")
+
+        if shapes and options["fail_on_repeated"]:
+            raise CommandError(f"{len(shapes)} query shapes were repeated within a request.")
@@ -0,0 +1,171 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import Counter
+
+from rest_framework import serializers
+
+# upper bounds, in milliseconds, of the histogram buckets (the last one is open-ended)
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+current = contextvars.ContextVar("perf_request", default=None)
+
+
+class RequestTimings:
+    """
+    What one sampled request spent its time on.
+    """
+
+    def __init__(self):
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.queries = Counter()
+        self._serializer_depth = 0
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_queries(self):
+        """
+        Queries that repeated an earlier one with the same SQL and parameters.
+        """
+        return sum(count - 1 for count in self.queries.values())
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            try:
+                self.queries[(sql, repr(params))] += 1
+            except TypeError:
+                self.queries[(sql, None)] += 1
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Upper bound of the bucket holding the q-th quantile (None if open-ended or empty).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else None
+        return None
+
+    def as_dict(self):
+        labels = [f"le_{bound}" for bound in BUCKETS] + ["inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.total_ms = Histogram()
+        self.db_ms = Histogram()
+        self.serializer_ms = Histogram()
+        self.queries = Histogram()
+        self.duplicate_queries = 0
+        self.requests_with_duplicates = 0
+
+    def observe(self, total_ms, timings):
+        self.total_ms.observe(total_ms)
+        self.db_ms.observe(timings.db_ms)
+        self.serializer_ms.observe(timings.serializer_ms)
+        self.queries.observe(timings.query_count)
+        duplicates = timings.duplicate_queries
+        self.duplicate_queries += duplicates
+        self.requests_with_duplicates += bool(duplicates)
+
+    def as_dict(self):
+        return {
+            "requests": self.total_ms.count,
+            "total_ms": self.total_ms.as_dict(),
+            "db_ms": self.db_ms.as_dict(),
+            "serializer_ms": self.serializer_ms.as_dict(),
+            "queries": self.queries.as_dict(),
+            "duplicate_queries": self.duplicate_queries,
+            "requests_with_duplicates": self.requests_with_duplicates,
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process aggregate of sampled requests, keyed by route name.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, total_ms, timings):
+        with self._lock:
+            metrics = self.routes.get(route)
+            if metrics is None:
+                metrics = self.routes[route] = RouteMetrics()
+            metrics.observe(total_ms, timings)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: metrics.as_dict() for route, metrics in sorted(self.routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+
+
+registry = MetricsRegistry()
+
+
+def _timed(to_representation):
+    def wrapper(self, instance):
+        timings = current.get()
+        if timings is None:
+            return to_representation(self, instance)
+        # only the outermost serializer is timed; nested ones are part of it
+        timings._serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return to_representation(self, instance)
+        finally:
+            timings._serializer_depth -= 1
+            if not timings._serializer_depth:
+                timings.serializer_ms += (time.perf_counter() - started) * 1000
+
+    wrapper.perf_timed = True
+    return wrapper
+
+
+def instrument_serializers():
+    """
+    Time `to_representation` of DRF serializers during sampled requests.
+
+    Patches `Serializer` and `ListSerializer` once; outside a sampled request the
+    wrapper only reads a context variable.
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.to_representation, "perf_timed", False):
+            cls.to_representation = _timed(cls.to_representation)
@@ -0,0 +1,135 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from .metrics import RequestTimings, current, instrument_serializers, registry
+from .querylog import QueryRecorder, write_report
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    return match.url_name or match.view_name if match else "unresolved"
+
+
+def _recording(wrapper):
+    """
+    Context manager running `wrapper` around every query on this thread's connections.
+    """
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+    return stack
+
+
+def _streams(response):
+    """
+    Whether the response body is produced (and queried for) while it is sent.
+
+    Bodies of async streaming responses are generated on other threads; those are only
+    measured up to the point the response is returned.
+    """
+    return response.streaming and not response.is_async
+
+
+def _recorded_stream(content, wrapper, finish):
+    """
+    `content` with its queries recorded by `wrapper`; `finish` runs once the body is
+    consumed or the response is closed.
+    """
+    try:
+        with _recording(wrapper):
+            yield from content
+    finally:
+        finish()
+
+
+class PerfMiddleware:
+    """
+    Record where sampled requests spend their time.
+
+    A `settings.PERF_SAMPLE_RATE` share of requests is instrumented: wall time, time
+    spent in the database, query count, duplicated queries (same SQL and parameters)
+    and time spent serializing. The numbers are sent back in a `Server-Timing` header
+    and added to per-route histograms served by the perf metrics endpoint. With a
+    sample rate of 0 the middleware removes itself at startup.
+
+    Streaming responses (the order export) query while their body is sent, after the
+    headers: their `Server-Timing` covers the time until the response starts, while the
+    histograms include the whole body.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.PERF_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = current.set(timings)
+        started = time.perf_counter()
+        try:
+            with _recording(timings.execute_wrapper):
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        response["Server-Timing"] = ", ".join([
+            f"total;dur={total_ms:.1f}",
+            f'db;dur={timings.db_ms:.1f};desc="{timings.query_count} queries"',
+            f"serialize;dur={timings.serializer_ms:.1f}",
+            f'dup;desc="{timings.duplicate_queries} duplicate queries"',
+        ])
+
+        route = _route(request)
+        if _streams(response):
+            response.streaming_content = _recorded_stream(
+                response.streaming_content, timings.execute_wrapper,
+                lambda: registry.observe(route, (time.perf_counter() - started) * 1000, timings),
+            )
+        else:
+            registry.observe(route, total_ms, timings)
+        return response
+
+
+class QueryReportMiddleware:
+    """
+    Development/staging aid: write a JSON query report for every request.
+
+    Enabled by pointing `settings.PERF_QUERY_REPORT_DIR` at a directory. Each report
+    groups the request's queries by SQL shape, lists shapes repeated at least
+    `settings.PERF_REPEATED_QUERY_THRESHOLD` times (likely N+1s) and queries slower than
+    `settings.PERF_SLOW_QUERY_MS`, each with the project code that ran it. The report of
+    a streaming response is written once its body has been sent. Walking the stack for
+    every query is slow, so keep this off in production.
+    """
+
+    def __init__(self, get_response):
+        self.directory = settings.PERF_QUERY_REPORT_DIR
+        if not self.directory:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with _recording(recorder):
+            response = self.get_response(request)
+
+        def report():
+            total_ms = (time.perf_counter() - started) * 1000
+            write_report(recorder.report(request, response, _route(request), total_ms), self.directory)
+
+        if _streams(response):
+            response.streaming_content = _recorded_stream(response.streaming_content, recorder, report)
+        else:
+            report()
+        return response
@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import sys
+import time
+import uuid
+from collections import defaultdict
+
+import django
+from django.conf import settings
+from django.utils import timezone
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)*\s*(?:%s|\?)\s*\)")
+_SAVEPOINT = re.compile(r'^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\s+"?\w+"?', re.I)
+
+
+def sql_shape(sql):
+    """
+    Normalize a statement so queries that differ only in their values compare equal.
+
+    Literals become `?`, and IN-lists of any length collapse to `(...)`.
+    """
+    sql = _SAVEPOINT.sub(lambda match: match.group(1).upper(), sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return " ".join(sql.split())
+
+
+def _origin():
+    """
+    Where the current query comes from, as "innermost <- outermost" project frame.
+
+    Project frames are those under BASE_DIR, outside this package and the script that
+    started the process (manage.py). When none is on the stack (e.g. a nested
+    serializer fetching a relation inside DRF), the innermost library frame outside
+    the ORM is used instead.
+    """
+    base = str(settings.BASE_DIR) + os.sep
+    own = os.path.dirname(os.path.abspath(__file__)) + os.sep
+    orm = os.path.join(os.path.dirname(django.__file__), "db") + os.sep
+    frame = sys._getframe(1)
+    frames = []
+    library = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(own) or frame.f_globals.get("__name__") == "__main__":
+            pass
+        elif filename.startswith(base) and "site-packages" not in filename:
+            frames.append(
+                f"{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            )
+        elif library is None and not filename.startswith(orm) and "site-packages" in filename:
+            library = f"{filename.split('site-packages' + os.sep)[-1]}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    if frames:
+        return " <- ".join(dict.fromkeys([frames[0], frames[-1]]))
+    return library or "(unknown)"
+
+
+class QueryRecorder:
+    """
+    Collects every query of one request, grouped by SQL shape, with the code that ran it.
+
+    Each query is attributed to the innermost project frame (view, serializer, service
+    or model method); the outermost project frame is kept too, so a repeated query can
+    be traced from where it runs back to the view that caused it.
+    """
+
+    def __init__(self):
+        self.shapes = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "origins": defaultdict(int)})
+        self.slow = []
+        self.count = 0
+        self.db_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            origin = _origin()
+            shape = sql_shape(sql)
+
+            entry = self.shapes[shape]
+            entry["count"] += 1
+            entry["total_ms"] += elapsed
+            entry["origins"][origin] += 1
+            self.count += 1
+            self.db_ms += elapsed
+            if elapsed >= settings.PERF_SLOW_QUERY_MS:
+                self.slow.append({"sql": sql, "ms": round(elapsed, 3), "origin": origin})
+
+    def repeated(self):
+        """
+        Shapes run at least `settings.PERF_REPEATED_QUERY_THRESHOLD` times: likely N+1s.
+        """
+        threshold = settings.PERF_REPEATED_QUERY_THRESHOLD
+        return sorted(
+            (
+                {
+                    "shape": shape,
+                    "count": entry["count"],
+                    "total_ms": round(entry["total_ms"], 3),
+                    "origins": dict(entry["origins"]),
+                }
+                for shape, entry in self.shapes.items()
+                if entry["count"] >= threshold and not shape.startswith(("SAVEPOINT", "RELEASE"))
+            ),
+            key=lambda item: -item["count"],
+        )
+
+    def report(self, request, response, route, total_ms):
+        return {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "route": route,
+            "status": response.status_code,
+            "started_at": timezone.now().isoformat(),
+            "total_ms": round(total_ms, 3),
+            "db_ms": round(self.db_ms, 3),
+            "query_count": self.count,
+            "repeated": self.repeated(),
+            "slow": self.slow,
+            "queries": [
+                {"shape": shape, "count": entry["count"], "total_ms": round(entry["total_ms"], 3)}
+                for shape, entry in self.shapes.items()
+            ],
+        }
+
+
+def write_report(report, directory):
+    """
+    Write one request's report as `<timestamp>-<route>-<id>.json` in `directory`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{report['route']}-{uuid.uuid4().hex[:8]}.json"
+    path = os.path.join(directory, re.sub(r"[^\w.-]", "_", name))
+    with open(path, "w") as handle:
+        json.dump(report, handle, indent=2)
+    return path
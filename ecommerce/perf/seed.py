@@ -0,0 +1,150 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from accounts.models import User
+from cart.models import Addresses, Cart
+from orders.models import Order, OrderItem
+from products import search, sharding
+from products.models import Products
+from products.suggest import title_index
+
+PASSWORD = "Perf@12345"
+
+
+def seed(prefix, rows, sharded=0, items_per_order=3):
+    """
+    Create a small, self-contained dataset for exercising the API.
+
+    Meant to run inside a transaction that the caller rolls back.
+
+    Args:
+        prefix (str): Makes usernames, emails and titles unique to this dataset.
+        rows (int): Number of products, cart lines and orders to create.
+        sharded (int): How many of the products get sharded stock (two shards each).
+        items_per_order (int): Lines per order.
+
+    Returns:
+        dict: "user", "admin", "address", "products" and "orders".
+    """
+    user = User.objects.create_user(
+        first_name="Perf", last_name="User", username=f"{prefix}_user",
+        email=f"{prefix}_user@example.com", password=PASSWORD,
+    )
+    admin = User.objects.create_user(
+        first_name="Perf", last_name="Admin", username=f"{prefix}_admin",
+        email=f"{prefix}_admin@example.com", password=PASSWORD, is_staff=True,
+    )
+    address = Addresses.objects.create(
+        user=user, address_line_1="1 Perf Street", phone_number="9999999999",
+        city="City", state="State", postal_code="000000", country="Country",
+    )
+    products = Products.objects.bulk_create(
+        Products(
+            product_title=f"{prefix} product {i}", description=f"{prefix} description",
+            price=Decimal(i + 1), stock=5 + i % 3,
+        )
+        for i in range(rows)
+    )
+    for product in products[:sharded]:
+        sharding.shard_product(product, 2)
+
+    Cart.objects.bulk_create(Cart(user=user, product=product) for product in products)
+    orders = [
+        Order.objects.create(user=user, total=Decimal("10.00"))
+        for _ in range(rows)
+    ]
+    OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order, product=product, product_title=product.product_title,
+            price=product.price,
+        )
+        for order in orders
+        for product in products[:items_per_order]
+    )
+    return {"user": user, "admin": admin, "address": address, "products": products, "orders": orders}
+
+
+def seed_volume(prefix, users=200, products=2000, orders=1000, cart_lines=10, sharded=10, seed_value=0):
+    """
+    Create a realistically sized dataset, mostly with bulk inserts.
+
+    The first user is the one to act as ("user"): they get an address, `cart_lines`
+    cart lines and a share of the orders like everyone else. Meant to run inside a
+    transaction that the caller rolls back.
+
+    Args:
+        prefix (str): Makes usernames, emails and titles unique to this dataset.
+        users (int): Number of customers.
+        products (int): Number of products; `sharded` of them get sharded stock.
+        orders (int): Number of orders, spread over the customers, 1-5 lines each.
+        cart_lines (int): Cart lines per customer.
+        sharded (int): How many products get sharded stock (two shards each).
+        seed_value (int): Seed for the random choices, so runs are comparable.
+
+    Returns:
+        dict: "user", "admin", "address", "products" and "orders".
+    """
+    rng = random.Random(seed_value)
+    password = make_password(PASSWORD)
+    customers = User.objects.bulk_create(
+        User(
+            first_name="Perf", last_name="User", username=f"{prefix}_user{i}",
+            email=f"{prefix}_user{i}@example.com", password=password,
+        )
+        for i in range(users)
+    )
+    admin = User.objects.create_user(
+        first_name="Perf", last_name="Admin", username=f"{prefix}_admin",
+        email=f"{prefix}_admin@example.com", password=PASSWORD, is_staff=True,
+    )
+    address = Addresses.objects.create(
+        user=customers[0], address_line_1="1 Perf Street", phone_number="9999999999",
+        city="City", state="State", postal_code="000000", country="Country",
+    )
+
+    words = ["wireless", "cotton", "steel", "organic", "smart", "classic", "travel", "mini"]
+    nouns = ["headphones", "shirt", "bottle", "tea", "watch", "lamp", "backpack", "speaker"]
+    catalog = Products.objects.bulk_create(
+        Products(
+            product_title=f"{rng.choice(words).title()} {rng.choice(nouns)} {prefix} {i}",
+            product_subtitle=f"{rng.choice(words)} {rng.choice(nouns)}",
+            description=" ".join(rng.choice(words + nouns) for _ in range(30)),
+            price=Decimal(rng.randint(100, 50000)) / 100,
+            stock=rng.randint(0, 200),
+            is_available=rng.random() > 0.05,
+        )
+        for i in range(products)
+    )
+    for product in catalog[:sharded]:
+        sharding.shard_product(product, 2)
+    # bulk inserts skip the product signals that keep these indexes current
+    search.refresh(catalog)
+    title_index.update_many(catalog)
+
+    # carts only hold products that can be checked out
+    buyable = [product for product in catalog if product.is_available and product.stock > 0]
+    Cart.objects.bulk_create(
+        Cart(user=customer, product=product)
+        for customer in customers
+        for product in rng.sample(buyable, min(cart_lines, len(buyable)))
+    )
+
+    placed = Order.objects.bulk_create(
+        Order(
+            user=customers[0] if i % 10 == 0 else rng.choice(customers),
+            order_number=Order().generate_transaction_no(),
+            total=Decimal(rng.randint(100, 100000)) / 100,
+        )
+        for i in range(orders)
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order, product=product, product_title=product.product_title,
+            product_subtitle=product.product_subtitle, quantity=rng.randint(1, 3),
+            price=product.price,
+        )
+        for order in placed
+        for product in rng.sample(catalog, rng.randint(1, 5))
+    )
+    return {"user": customers[0], "admin": admin, "address": address, "products": catalog, "orders": placed}
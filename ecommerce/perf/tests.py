@@ -0,0 +1,356 @@
+import json
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+from rest_framework.test import APIClient
+
+from accounts.serializers import CustomTokenObtainPairSerializer
+from products import search, sharding
+from products.cache import catalog_cache
+from products.suggest import title_index
+from .metrics import BUCKETS, Histogram, RequestTimings, registry
+from .querylog import sql_shape
+from .management.commands.perf_budget import SCENARIOS, Command as BudgetCommand, fill, route_names
+from .seed import seed, seed_volume
+
+# (name, path, query params, who is calling, queries allowed). The counts are for a cold
+# cache: no cached catalog page, cart summary, user state or shard total. Product and order
+# details include the conditional GET aggregate.
+ENDPOINTS = [
+    ("products-list", "/api/v1/products/", {}, None, 3),
+    ("products-list keyset", "/api/v1/products/", {"pagination": "keyset"}, None, 2),
+    ("products-list sparse", "/api/v1/products/", {"fields": "id,product_title,price"}, None, 2),
+    ("products-list search", "/api/v1/products/", {"search": "product"}, None, 3),
+    ("products-detail", "/api/v1/products/{product}/", {}, None, 3),
+    ("products-async-list", "/api/v1/async/products/", {}, None, 3),
+    ("products-async-list keyset", "/api/v1/async/products/", {"pagination": "keyset"}, None, 2),
+    ("products-async-detail", "/api/v1/async/products/{product}/", {}, None, 3),
+    ("products-suggest", "/api/v1/products/suggest/", {"q": "product"}, None, 0),
+    ("cart-list", "/api/v1/cart/", {}, "user", 3),
+    ("cart-summary", "/api/v1/cart/summary/", {}, "user", 2),
+    ("address-list", "/api/v1/address/", {}, "user", 3),
+    ("orders-list", "/api/v1/order/orders/", {}, "user", 4),
+    ("orders-list admin", "/api/v1/order/orders/", {}, "admin", 4),
+    ("orders-list keyset", "/api/v1/order/orders/", {"pagination": "keyset"}, "user", 3),
+    ("orders-list sparse", "/api/v1/order/orders/", {"omit": "items"}, "user", 3),
+    ("orders-detail", "/api/v1/order/orders/{order}/", {}, "user", 4),
+    ("orderitem-list", "/api/v1/order/order-items/", {}, "admin", 3),
+    ("orderitem-list keyset", "/api/v1/order/order-items/", {"pagination": "keyset"}, "admin", 2),
+    ("user-profile", "/api/v1/accounts/profile/", {}, "user", 2),
+]
+
+
+def shard_stock(request):
+    """
+    Look up each sharded product's stock `repeat` times, one query per lookup.
+    """
+    pks = [int(pk) for pk in request.GET.getlist("product")] * int(request.GET.get("repeat", 1))
+    return HttpResponse(str([sharding.total_stock(pk, cached=False) for pk in pks]))
+
+
+def streamed_shard_stock(request):
+    pks = [int(pk) for pk in request.GET.getlist("product")]
+    return StreamingHttpResponse(str(sharding.total_stock(pk, cached=False)) for pk in pks)
+
+
+# the API plus views with known query patterns, for the middleware tests
+urlpatterns = [
+    path("", include("ecommerce.urls")),
+    path("shard-stock/", shard_stock, name="shard-stock"),
+    path("shard-stock/streamed/", streamed_shard_stock, name="shard-stock-streamed"),
+]
+
+
+def token_clients(data):
+    """
+    An anonymous client plus clients for the seeded "user" and "admin", each sending a
+    real access token.
+    """
+    clients = {None: APIClient()}
+    for who in ("user", "admin"):
+        token = CustomTokenObtainPairSerializer.get_token(data[who]).access_token
+        clients[who] = APIClient()
+        clients[who].credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+    return clients
+
+
+class QueryCountTests(TestCase):
+    """
+    Pin the number of queries every list (and detail) endpoint issues.
+
+    The count must equal the budget in `ENDPOINTS` at every seeded size, so an N+1 (a
+    count that grows with the page) or any new query fails. In-process indexes (search
+    fallback, typeahead, revocation list) are warmed by a first call; shared caches are
+    cleared before the measured one.
+    """
+
+    rows = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed(f"qc{cls.rows}", rows=cls.rows, sharded=cls.rows // 2)
+        # keep the in-process indexes in step with rows created in bulk
+        search.refresh(cls.data["products"])
+        title_index.update_many(cls.data["products"])
+
+    @classmethod
+    def tearDownClass(cls):
+        # drop the seeded rows from the in-process indexes; search reloads on next use
+        search.fallback_index.loaded = False
+        for product in cls.data["products"]:
+            title_index.remove(product.pk)
+        super().tearDownClass()
+
+    def test_endpoint_query_counts(self):
+        clients = token_clients(self.data)
+        for name, path, params, who, budget in ENDPOINTS:
+            path = path.format(product=self.data["products"][0].pk, order=self.data["orders"][0].pk)
+            with self.subTest(name):
+                clients[who].get(path, params)
+                cache.clear()
+                caches[settings.CART_CACHE_ALIAS].clear()
+                catalog_cache.invalidate()
+
+                with self.assertNumQueries(budget):
+                    response = clients[who].get(path, params)
+                self.assertEqual(response.status_code, 200)
+
+
+class FullPageQueryCountTests(QueryCountTests):
+    rows = 25
+
+
+class RouteBudgetTests(TestCase):
+    """
+    The query budgets of every `perf_budget` scenario, on a small dataset.
+
+    Each call runs in a savepoint that is rolled back, after a warm-up call and with
+    cold shared caches, as in the command. Latency is only checked by the command.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_volume("budget", users=5, products=40, orders=10, cart_lines=3, sharded=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        # drop the seeded rows from the in-process indexes; search reloads on next use
+        search.fallback_index.loaded = False
+        for product in cls.data["products"]:
+            title_index.remove(product.pk)
+        super().tearDownClass()
+
+    def test_every_route_has_a_scenario(self):
+        covered = {
+            resolve(s.path.split("?")[0].format(**BudgetCommand.sample_refs())).url_name for s in SCENARIOS
+        }
+        self.assertEqual(route_names() - covered, set())
+
+    def test_scenario_query_budgets(self):
+        command = BudgetCommand()
+        refs = command.references(self.data)
+        clients = command.clients(self.data)
+        for scenario in SCENARIOS:
+            path = scenario.path.format(**refs)
+            payload = fill(scenario.data, refs) if scenario.data is not None else None
+            with self.subTest(scenario.name):
+                with transaction.atomic():
+                    command.call(clients[scenario.who], scenario.method, path, payload)
+                    transaction.set_rollback(True)
+                cache.clear()
+                caches[settings.CART_CACHE_ALIAS].clear()
+                catalog_cache.invalidate()
+
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as ctx:
+                        response = command.call(clients[scenario.who], scenario.method, path, payload)
+                    transaction.set_rollback(True)
+                self.assertLess(response.status_code, 300)
+                self.assertLessEqual(len(ctx.captured_queries), scenario.queries)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_values_fall_in_the_first_bucket_they_fit(self):
+        histogram = Histogram()
+        for value in (0, 1, 1.01, 2.5, 5000, 5000.1):
+            histogram.observe(value)
+        buckets = histogram.as_dict()["buckets"]
+        self.assertEqual(
+            {label: count for label, count in buckets.items() if count},
+            {"le_1": 2, "le_2.5": 2, "le_5000": 1, "inf": 1},
+        )
+        self.assertEqual(histogram.count, 6)
+        self.assertAlmostEqual(histogram.total, 10004.61)
+
+    def test_quantiles_are_bucket_upper_bounds(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in [0.5] * 50 + [7] * 49 + [6000]:
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 1)
+        self.assertEqual(histogram.quantile(0.51), 10)
+        self.assertEqual(histogram.quantile(0.99), 10)
+        # the slowest value is past the last bound
+        self.assertIsNone(histogram.quantile(1))
+        self.assertEqual(len(histogram.counts), len(BUCKETS) + 1)
+
+    def test_duplicate_queries_repeat_sql_and_parameters(self):
+        timings = RequestTimings()
+
+        def execute(sql, params, many, context):
+            return sql
+
+        for sql, params in [
+            ("SELECT 1 WHERE id = %s", (1,)),
+            ("SELECT 1 WHERE id = %s", (1,)),
+            ("SELECT 1 WHERE id = %s", (2,)),
+            ("SELECT 1 WHERE id = %s", (1,)),
+            ("SELECT 2 WHERE id = %s", (1,)),
+        ]:
+            self.assertEqual(timings.execute_wrapper(execute, sql, params, False, {}), sql)
+        self.assertEqual(timings.query_count, 5)
+        self.assertEqual(timings.duplicate_queries, 2)
+        self.assertGreaterEqual(timings.db_ms, 0)
+
+
+class SqlShapeTests(SimpleTestCase):
+    def test_literals_become_placeholders(self):
+        self.assertEqual(
+            sql_shape('''SELECT "t2"."id" FROM "t2" WHERE "t2"."name" = 'O''Brien' AND "t2"."price" > 4.50 LIMIT 21'''),
+            '''SELECT "t2"."id" FROM "t2" WHERE "t2"."name" = ? AND "t2"."price" > ? LIMIT ?''',
+        )
+        self.assertEqual(sql_shape('''SAVEPOINT "s140_x12"'''), "SAVEPOINT")
+
+    def test_in_lists_of_any_length_collapse(self):
+        shapes = {
+            sql_shape(sql)
+            for sql in (
+                'SELECT * FROM "a" WHERE "a"."id" IN (%s)',
+                'SELECT * FROM "a" WHERE "a"."id" IN (%s, %s, %s)',
+                'SELECT * FROM "a"\n WHERE "a"."id" IN (1,2)',
+            )
+        }
+        self.assertEqual(shapes, {'SELECT * FROM "a" WHERE "a"."id" IN (...)'})
+
+
+@override_settings(ROOT_URLCONF="perf.tests")
+class MiddlewareTests(TestCase):
+    """
+    PerfMiddleware and QueryReportMiddleware, switched on by their settings. The
+    middleware chain is built on a client's first request, so each test makes its
+    clients after overriding the settings.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed("mw", rows=2, sharded=2)
+        cls.sharded = [product.pk for product in cls.data["products"]]
+
+    @classmethod
+    def tearDownClass(cls):
+        # drop the seeded rows from the in-process indexes; search reloads on next use
+        search.fallback_index.loaded = False
+        for product in cls.data["products"]:
+            title_index.remove(product.pk)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        catalog_cache.invalidate()
+        registry.reset()
+        self.addCleanup(registry.reset)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.report_dir = directory.name
+
+    def server_timing(self, response):
+        match = re.fullmatch(
+            r'total;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", '
+            r'serialize;dur=[\d.]+, dup;desc="(\d+) duplicate queries"',
+            response["Server-Timing"],
+        )
+        self.assertIsNotNone(match, response["Server-Timing"])
+        return int(match[1]), int(match[2])
+
+    def reports(self):
+        reports = []
+        for name in sorted(os.listdir(self.report_dir)):
+            with open(os.path.join(self.report_dir, name)) as handle:
+                reports.append(json.load(handle))
+        return reports
+
+    def test_unsampled_responses_carry_no_timing(self):
+        response = APIClient().get("/api/v1/products/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(registry.snapshot(), {})
+
+    @override_settings(PERF_SAMPLE_RATE=1)
+    def test_sampled_responses_report_their_timing(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/api/v1/products/")
+        self.assertEqual(response.status_code, 200)
+        queries = len(ctx.captured_queries)
+        self.assertEqual(self.server_timing(response), (queries, 0))
+
+        # two lookups of each of the two products: two duplicates
+        response = client.get("/shard-stock/", {"product": self.sharded, "repeat": 2})
+        self.assertEqual(self.server_timing(response), (4, 2))
+
+        routes = registry.snapshot()
+        self.assertEqual(list(routes), ["products-list", "shard-stock"])
+        self.assertEqual(routes["products-list"]["queries"]["sum"], queries)
+        self.assertEqual(routes["shard-stock"]["duplicate_queries"], 2)
+        self.assertEqual(routes["shard-stock"]["requests_with_duplicates"], 1)
+
+    def test_query_report_flags_repeated_shapes_with_their_origin(self):
+        with self.settings(PERF_QUERY_REPORT_DIR=self.report_dir, PERF_REPEATED_QUERY_THRESHOLD=3):
+            response = APIClient().get("/shard-stock/", {"product": self.sharded, "repeat": 2})
+        self.assertEqual(response.status_code, 200)
+
+        [report] = self.reports()
+        self.assertEqual((report["route"], report["status"], report["query_count"]), ("shard-stock", 200, 4))
+        [repeated] = report["repeated"]
+        self.assertEqual(repeated["count"], 4)
+        self.assertIn("IN (...)", repeated["shape"])
+        [origin] = repeated["origins"]
+        self.assertRegex(
+            origin, r"^products/sharding\.py:\d+ in shard_totals <- products/sharding\.py:\d+ in total_stock$"
+        )
+        self.assertEqual(repeated["origins"][origin], 4)
+
+    def test_streamed_bodies_are_measured_until_they_are_sent(self):
+        settings = {"PERF_SAMPLE_RATE": 1, "PERF_QUERY_REPORT_DIR": self.report_dir}
+        with self.settings(**settings):
+            response = APIClient().get("/shard-stock/streamed/", {"product": self.sharded})
+        # nothing is queried before the body is read
+        self.assertEqual(self.server_timing(response), (0, 0))
+        self.assertEqual(registry.snapshot(), {})
+        self.assertEqual(self.reports(), [])
+
+        self.assertEqual(b"".join(response.streaming_content).decode(), "".join(
+            str(sharding.total_stock(pk, cached=False)) for pk in self.sharded
+        ))
+        self.assertEqual(registry.snapshot()["shard-stock-streamed"]["queries"]["sum"], 2)
+        [report] = self.reports()
+        self.assertEqual(report["query_count"], 2)
+
+    def test_order_export_queries_are_counted(self):
+        with self.settings(PERF_SAMPLE_RATE=1, PERF_QUERY_REPORT_DIR=self.report_dir):
+            client = token_clients(self.data)["admin"]
+            response = client.get("/api/v1/order/orders/export/", {"output": "ndjson"})
+        queries_before_body, _ = self.server_timing(response)
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), sum(len(order.items.all()) for order in self.data["orders"]))
+
+        self.assertGreater(registry.snapshot()["orders-export"]["queries"]["sum"], queries_before_body)
+        [report] = self.reports()
+        self.assertTrue(any('"orders_order"' in query["shape"] for query in report["queries"]))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .metrics import registry
+
+
+class MetricsView(APIView):
+    """
+    Per-route timings of the requests sampled by `PerfMiddleware` in this worker process.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"sample_rate": settings.PERF_SAMPLE_RATE, "routes": registry.snapshot()})
+
+    def delete(self, request):
+        registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,5 +1,25 @@
 from django.contrib import admin
-from .models import Products
+from .models import Products, StockReservation, StockShard
+from . import sharding
+
+
+class ProductsAdmin(admin.ModelAdmin):
+    """
+    Product admin that writes the stock of sharded products to their shards.
+
+    The shard count is changed with `rebalance_stock_shards`, not here, since changing
+    it means moving stock between rows.
+    """
+
+    readonly_fields = ["stock_shard_count"]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and obj.stock_shard_count and "stock" in form.changed_data:
+            sharding.set_stock(obj, obj.stock)
+
 
 # Register your models here.
-admin.site.register(Products)
+admin.site.register(Products, ProductsAdmin)
+admin.site.register(StockReservation)
+admin.site.register(StockShard)
@@ -0,0 +1,211 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.response import Response
+
+
+class CatalogCache:
+    """
+    Versioned read-through cache for serialized product responses.
+
+    Every key embeds the current catalog version; invalidating bumps the version so all
+    previously cached pages become unreachable at once and age out of the backend.
+    The backend is the `settings.CATALOG_CACHE_ALIAS` cache (local-memory LRU by default,
+    Redis when `CATALOG_CACHE_URL` is set). Hit/miss counters are kept per process.
+    """
+
+    VERSION_KEY = "catalog:version"
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def version(self):
+        version = self.backend.get(self.VERSION_KEY)
+        if version is None:
+            self.backend.add(self.VERSION_KEY, 1, timeout=None)
+            version = self.backend.get(self.VERSION_KEY, 1)
+        return version
+
+    def invalidate(self):
+        """
+        Drop every cached catalog response.
+        """
+        try:
+            self.backend.incr(self.VERSION_KEY)
+        except ValueError:
+            self.backend.add(self.VERSION_KEY, 1, timeout=None)
+
+    def invalidate_on_commit(self):
+        """
+        Invalidate once the current transaction commits, so readers can't re-cache old rows.
+        """
+        transaction.on_commit(self.invalidate)
+
+    @property
+    def in_process(self):
+        """
+        Whether the backend is in-process memory, which async code can call directly.
+
+        Django's async cache methods run the blocking ones in a worker thread; for the
+        local-memory backend that hop costs far more than the lookup itself.
+        """
+        return isinstance(self.backend, LocMemCache)
+
+    async def aversion(self):
+        if self.in_process:
+            return self.version()
+        version = await self.backend.aget(self.VERSION_KEY)
+        if version is None:
+            await self.backend.aadd(self.VERSION_KEY, 1, timeout=None)
+            version = await self.backend.aget(self.VERSION_KEY, 1)
+        return version
+
+    def _digest(self, request):
+        query = sorted(
+            (name, value)
+            for name in request.query_params
+            for value in request.query_params.getlist(name)
+        )
+        return hashlib.md5(repr((request.get_host(), query)).encode()).hexdigest()
+
+    def make_key(self, request, *parts):
+        """
+        Build a key from the view parts, host and the normalized query string.
+        """
+        return ":".join(["catalog", str(self.version()), *map(str, parts), self._digest(request)])
+
+    async def amake_key(self, request, *parts):
+        return ":".join(["catalog", str(await self.aversion()), *map(str, parts), self._digest(request)])
+
+    def _count(self, data):
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def get(self, key):
+        return self._count(self.backend.get(key))
+
+    async def aget(self, key):
+        if self.in_process:
+            return self.get(key)
+        return self._count(await self.backend.aget(key))
+
+    def set(self, key, data):
+        self.backend.set(key, data, settings.CATALOG_CACHE_TIMEOUT)
+
+    async def aset(self, key, data):
+        if self.in_process:
+            return self.set(key, data)
+        await self.backend.aset(key, data, settings.CATALOG_CACHE_TIMEOUT)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "version": self.version(),
+            "backend": self.backend.__class__.__name__,
+        }
+
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_ALIAS)
+
+
+class CatalogIndexMixin:
+    """
+    For in-process indexes of the catalog (search fallback, typeahead): reload when the
+    catalog version moves.
+
+    Every product write bumps the catalog version (see `CatalogCache.invalidate`), so an
+    index loaded at an older version may be missing writes made by other worker
+    processes. `sync()` compares the versions at most every
+    `settings.CATALOG_INDEX_SYNC_SECONDS` and reloads the index if they differ. With the
+    default per-process catalog cache only this worker's writes move the version; point
+    `CATALOG_CACHE_URL` at Redis to pick up the others'.
+
+    Subclasses implement `build()`, returning the new contents, and `install(contents)`,
+    which swaps them in (called with `self._lock` held).
+    """
+
+    loaded = False
+    version = None
+    _checked_at = 0.0
+
+    def load(self, force=False):
+        if self.loaded and not force:
+            return
+        # read the version first: a write that lands while building bumps it again
+        version = catalog_cache.version()
+        contents = self.build()
+        with self._lock:
+            self.install(contents)
+            self.version = version
+            self._checked_at = time.monotonic()
+            self.loaded = True
+
+    def due(self):
+        """
+        Whether the next `sync()` may read the database (to load or check for a reload).
+        """
+        return not self.loaded or time.monotonic() - self._checked_at >= settings.CATALOG_INDEX_SYNC_SECONDS
+
+    def sync(self):
+        """
+        Load the index, or reload it if the catalog changed since it was loaded.
+        """
+        if not self.loaded:
+            self.load()
+            return
+        if not self.due():
+            return
+        now = time.monotonic()
+        self._checked_at = now
+        if catalog_cache.version() != self.version:
+            self.load(force=True)
+
+
+class CatalogCacheMixin:
+    """
+    Serve `list` and `retrieve` from the catalog cache.
+
+    Only successful responses are cached. Responses carry an `X-Cache` header.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response("list", super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            f"detail:{kwargs.get(self.lookup_field)}", super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, name, handler, request, *args, **kwargs):
+        # views with validators (ConditionalGetMixin) also key on their ETag, so a cached
+        # body is never served with the validators of newer rows
+        etag = getattr(self, "conditional_etag", None) or ""
+        key = catalog_cache.make_key(request, self.basename, name, etag)
+        data = catalog_cache.get(key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            catalog_cache.set(key, response.data)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,21 @@
+import django_filters
+from .models import Products
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    Storefront filters for the product list.
+
+    `in_stock` uses the stock stored on the product row (a snapshot for sharded products).
+    """
+
+    in_stock = django_filters.BooleanFilter(method="filter_in_stock")
+
+    class Meta:
+        model = Products
+        fields = ["is_available"]
+
+    def filter_in_stock(self, queryset, name, value):
+        if value:
+            return queryset.filter(stock__gt=0)
+        return queryset.filter(stock=0)
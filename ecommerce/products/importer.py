@@ -0,0 +1,236 @@
+import csv
+import json
+import os
+import time
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from . import search, sharding
+from .cache import catalog_cache
+from .models import Products
+from .suggest import title_index
+
+# feed columns, in the order they are checked; anything else in a feed is ignored
+FIELDS = (
+    "sku", "product_title", "product_subtitle", "description", "price", "image", "stock", "is_available",
+)
+
+# needed to create a product; rows for existing SKUs may carry any subset of FIELDS
+REQUIRED = ("product_title", "description", "price")
+
+FORMATS = ("csv", "ndjson")
+
+# rejected rows kept in the report; the rest are only counted
+MAX_REPORTED_REJECTS = 100
+
+TRUE_VALUES = {"1", "t", "true", "y", "yes"}
+FALSE_VALUES = {"0", "f", "false", "n", "no"}
+
+
+class FeedError(Exception):
+    """
+    Raised when a feed cannot be read at all (unknown format, missing SKU column).
+    The message is safe to return to the client.
+    """
+
+
+def feed_format(name, requested=None):
+    """
+    The feed format: `requested` if given, else guessed from the file extension.
+    """
+    fmt = requested or os.path.splitext(name or "")[1].lstrip(".").lower()
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in FORMATS:
+        raise FeedError(f"Feed format must be one of: {', '.join(FORMATS)}.")
+    return fmt
+
+
+def read_feed(stream, fmt):
+    """
+    Iterate over the rows of a CSV (with a header line) or NDJSON feed.
+
+    Reads line by line, so the feed is never held in memory as a whole.
+
+    Args:
+        stream (file): Text stream of the feed.
+        fmt (str): One of `FORMATS`.
+
+    Yields:
+        tuple: (line number, dict of column -> raw value). Lines that aren't a JSON
+            object yield None in place of the dict.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        if "sku" not in (reader.fieldnames or ()):
+            raise FeedError("The feed has no sku column.")
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            # prices as Decimal: a float like 9.99 fails the 2-decimal-places validation
+            row = json.loads(line, parse_float=Decimal)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def clean_row(row):
+    """
+    Validate one feed row with the model fields' own validation (e.g. `price_validator`).
+
+    Empty values clear nullable columns and are ignored for the others.
+
+    Returns:
+        tuple: (dict of field -> value, dict of field -> error messages).
+    """
+    values, errors = {}, {}
+    for name in FIELDS:
+        if name not in row:
+            continue
+        field = Products._meta.get_field(name)
+        raw = row[name]
+        if isinstance(raw, str):
+            raw = raw.strip()
+            if name == "is_available" and raw.lower() in TRUE_VALUES | FALSE_VALUES:
+                raw = raw.lower() in TRUE_VALUES
+        if raw in ("", None):
+            if not field.null:
+                continue
+            raw = None
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    if not values.get("sku") and "sku" not in errors:
+        errors["sku"] = ["This field is required."]
+    return values, errors
+
+
+def _upsert(rows):
+    """
+    Insert or update one batch of cleaned rows, keyed on SKU. Must run in a transaction.
+
+    Rows for existing SKUs are completed with the stored values of the columns they
+    don't carry, so those columns keep their value. Stock of sharded products is spread
+    over their shards rather than written to the product row.
+
+    Returns:
+        tuple: (number created, number updated, rejected rows).
+    """
+    existing = {
+        row["sku"]: row
+        for row in Products.objects.select_for_update()
+        .filter(sku__in=[values["sku"] for _, values in rows])
+        .values(*FIELDS, "stock_shard_count")
+    }
+    rejected = []
+    products = []
+    sharded_stock = {}
+    for line, values in rows:
+        stored = existing.get(values["sku"])
+        if stored is None:
+            missing = [name for name in REQUIRED if name not in values]
+            if missing:
+                rejected.append({"line": line, "sku": values["sku"], "errors": {
+                    name: ["This field is required for a new product."] for name in missing
+                }})
+                continue
+        else:
+            if stored.pop("stock_shard_count") and "stock" in values:
+                sharded_stock[values["sku"]] = values.pop("stock")
+            values = {**stored, **values}
+        products.append(Products(**values))
+
+    Products.objects.bulk_create(
+        products,
+        update_conflicts=True,
+        unique_fields=["sku"],
+        update_fields=[name for name in FIELDS if name != "sku"] + ["updated_at"],
+    )
+    for product in Products.objects.filter(sku__in=sharded_stock).only("sku", "stock_shard_count"):
+        sharding.set_stock(product, sharded_stock[product.sku])
+
+    # bulk inserts skip the product signals that keep these indexes current
+    if any(product.pk is None for product in products):
+        products = list(Products.objects.filter(sku__in=[product.sku for product in products]))
+    # the in-process indexes must not pick up rows of a batch that rolls back
+    # (search.refresh defers its in-process part to the commit itself)
+    search.refresh(products)
+    transaction.on_commit(lambda: title_index.update_many(products))
+    catalog_cache.invalidate_on_commit()
+
+    updated = sum(1 for product in products if product.sku in existing)
+    return len(products) - updated, updated, rejected
+
+
+def import_products(rows, batch_size=None, on_batch=None):
+    """
+    Upsert products from feed rows, a batch at a time.
+
+    Each batch is validated, then written with `bulk_create(update_conflicts=True)` on
+    `sku` in its own transaction, so a failure loses at most one batch. A SKU that
+    appears more than once in a batch keeps its last row.
+
+    Args:
+        rows (iterable): (line number, raw row) pairs, e.g. from `read_feed()`.
+        batch_size (int): Rows per batch (default `settings.PRODUCT_IMPORT_BATCH_SIZE`).
+        on_batch (callable): Called with each batch's stats as it completes.
+
+    Returns:
+        dict: Totals ("rows", "created", "updated", "rejected", "seconds"), the per-batch
+            stats ("batches") and up to `MAX_REPORTED_REJECTS` rejected rows ("errors").
+    """
+    batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+    report = {"rows": 0, "created": 0, "updated": 0, "rejected": 0, "seconds": 0.0, "batches": [], "errors": []}
+    rows = iter(rows)
+    started = time.perf_counter()
+
+    while batch := list(islice(rows, batch_size)):
+        batch_started = time.perf_counter()
+        valid, rejected = {}, []
+        for line, row in batch:
+            if row is None:
+                rejected.append({"line": line, "sku": None, "errors": {"row": ["Not a JSON object."]}})
+                continue
+            values, errors = clean_row(row)
+            if errors:
+                rejected.append({"line": line, "sku": row.get("sku"), "errors": errors})
+            else:
+                valid[values["sku"]] = (line, values)
+
+        created = updated = 0
+        if valid:
+            with transaction.atomic():
+                created, updated, missing = _upsert(list(valid.values()))
+            rejected += missing
+
+        seconds = time.perf_counter() - batch_started
+        stats = {
+            "batch": len(report["batches"]) + 1,
+            "rows": len(batch),
+            "created": created,
+            "updated": updated,
+            "rejected": len(rejected),
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(len(batch) / seconds, 1) if seconds else None,
+        }
+        report["batches"].append(stats)
+        report["rows"] += len(batch)
+        report["created"] += created
+        report["updated"] += updated
+        report["rejected"] += len(rejected)
+        room = MAX_REPORTED_REJECTS - len(report["errors"])
+        report["errors"] += sorted(rejected, key=lambda item: item["line"])[:room]
+        if on_batch is not None:
+            on_batch(stats)
+
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
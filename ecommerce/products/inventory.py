@@ -0,0 +1,129 @@
+import sqlite3
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from . import sharding
+from .cache import catalog_cache
+from .models import Products, StockShard
+
+
+def apply_updates(items, chunk_size=None):
+    """
+    Apply stock and price updates to many products, a chunk at a time.
+
+    Each chunk runs in its own transaction: its products are locked in id order,
+    written with a single UPDATE, and the catalog cache is invalidated once.
+    Sharded products get their new total spread over their shards; deltas apply to the
+    live (summed) stock.
+
+    Args:
+        items (list): Dicts with "id" and any of "stock", "stock_delta" and "price".
+        chunk_size (int): Products per transaction (default `settings.INVENTORY_CHUNK_SIZE`).
+
+    Returns:
+        dict: "updated" and "unchanged" counts, "missing" product ids, "rejected" items
+            ({"id", "error"}) and "changes": per updated product its id and the
+            [old, new] value of each field that changed.
+    """
+    chunk_size = chunk_size or settings.INVENTORY_CHUNK_SIZE
+    items = sorted(items, key=lambda item: item["id"])
+    result = {"updated": 0, "unchanged": 0, "missing": [], "rejected": [], "changes": []}
+    for start in range(0, len(items), chunk_size):
+        with transaction.atomic():
+            _apply_chunk(items[start:start + chunk_size], result)
+    return result
+
+
+def _apply_chunk(items, result):
+    products = {
+        product.pk: product
+        for product in Products.objects.select_for_update()
+        .filter(pk__in=[item["id"] for item in items])
+        .order_by("pk")
+        .only("stock", "price", "stock_shard_count")
+    }
+    sharded = [pk for pk, product in products.items() if product.stock_shard_count]
+    if sharded:
+        list(StockShard.objects.select_for_update().filter(product_id__in=sharded).order_by("product_id", "index"))
+    live = sharding.shard_totals(sharded, cached=False) if sharded else {}
+
+    now = timezone.now()
+    changed, resharded = [], []
+    for item in items:
+        product = products.get(item["id"])
+        if product is None:
+            result["missing"].append(item["id"])
+            continue
+
+        old_stock = live.get(product.pk, product.stock)
+        stock = item["stock"] if "stock" in item else old_stock + item.get("stock_delta", 0)
+        if stock < 0:
+            result["rejected"].append({
+                "id": product.pk,
+                "error": f"Stock cannot go below 0 (have {old_stock}, delta {item['stock_delta']}).",
+            })
+            continue
+
+        diff = {}
+        if stock != old_stock:
+            diff["stock"] = [old_stock, stock]
+            if product.stock_shard_count:
+                resharded.append((product, stock))
+            else:
+                product.stock = stock
+        if "price" in item and item["price"] != product.price:
+            # rendered like the API renders prices
+            diff["price"] = [f"{product.price:.2f}", f"{item['price']:.2f}"]
+            product.price = item["price"]
+        if not diff:
+            result["unchanged"] += 1
+            continue
+        product.updated_at = now
+        changed.append(product)
+        result["changes"].append({"id": product.pk, **diff})
+
+    if not changed:
+        return
+    _write(changed, ["stock", "price", "updated_at"])
+    for product, stock in resharded:
+        sharding.set_stock(product, stock)
+    catalog_cache.invalidate_on_commit()
+    result["updated"] += len(changed)
+
+
+def _supports_update_from():
+    return connection.vendor == "postgresql" or (
+        connection.vendor == "sqlite" and sqlite3.sqlite_version_info >= (3, 33)
+    )
+
+
+def _write(products, fields):
+    """
+    Write `fields` of many products with one `UPDATE ... FROM (VALUES ...)` statement.
+
+    `bulk_update()` builds a CASE expression per field and row, which for a chunk of a
+    few hundred products costs far more CPU than running the statement. Falls back to
+    it on databases without UPDATE ... FROM.
+    """
+    if not _supports_update_from():
+        Products.objects.bulk_update(products, fields)
+        return
+
+    quote = connection.ops.quote_name
+    model_fields = [Products._meta.pk] + [Products._meta.get_field(name) for name in fields]
+    columns = [quote(field.column) for field in model_fields]
+    table = quote(Products._meta.db_table)
+    row = f"({', '.join(['%s'] * len(columns))})"
+    sql = (
+        f"WITH changes ({', '.join(columns)}) AS (VALUES {', '.join([row] * len(products))}) "
+        f"UPDATE {table} SET {', '.join(f'{column} = changes.{column}' for column in columns[1:])} "
+        f"FROM changes WHERE {table}.{columns[0]} = changes.{columns[0]}"
+    )
+    params = [
+        field.get_db_prep_save(getattr(product, field.attname), connection)
+        for product in products
+        for field in model_fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
@@ -0,0 +1,156 @@
+import asyncio
+import itertools
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.base.creation import TEST_DATABASE_PREFIX
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from products import search, sharding
+from products.models import Products
+from products.suggest import title_index
+
+PREFIX = "Async catalog benchmark"
+
+
+class Command(BaseCommand):
+    """
+    Compare catalog read throughput of the sync (WSGI) and async (ASGI) product views.
+
+    The sync run sends requests to `/api/v1/products/` through Django's WSGI handler
+    from `--threads` threads, like a threaded WSGI worker. The async run sends the same
+    requests to `/api/v1/async/products/` through the ASGI handler from `--concurrency`
+    tasks on one event loop, like a single ASGI worker. Requests alternate between the
+    list and a product detail. "warm" runs are mostly catalog cache hits; "cold" runs
+    add a unique query parameter so every request misses the cache and queries the
+    database. Both run in-process through the test clients, so the numbers leave out
+    the server and network. For a load test over HTTP, point a load generator at
+    gunicorn (WSGI) and uvicorn (ASGI) workers instead.
+
+    The benchmark products are committed (the threads need to see them) and deleted by
+    id at the end. Because it writes to the database, it only runs against a test
+    database unless `--yes` is passed.
+    """
+
+    help = "Benchmark sync WSGI vs async ASGI throughput of the product read endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per run.")
+        parser.add_argument("--threads", type=int, default=8, help="Threads for the sync run.")
+        parser.add_argument("--concurrency", type=int, default=200, help="Tasks for the async run.")
+        parser.add_argument(
+            "--yes", action="store_true",
+            help="Run against a database that is not a test database (products are committed, then deleted).",
+        )
+
+    def handle(self, *args, **options):
+        if not options["yes"] and not self.is_test_database():
+            raise CommandError(
+                f"{connection.settings_dict['NAME']} is not a test database: the benchmark commits "
+                "products to it. Pass --yes to run it anyway."
+            )
+
+        self.created = []
+        try:
+            ids = self.seed(options["products"])
+            self.stdout.write(
+                f"{'cache':>5} {'server':>6} {'requests':>9} {'seconds':>8} {'req/s':>8} {'p50 ms':>7} {'p99 ms':>7}"
+            )
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for cache in ("warm", "cold"):
+                    paths = list(itertools.islice(self.paths(ids, cache == "cold"), options["requests"]))
+                    self.report(cache, "wsgi", *self.run_sync(paths, options["threads"]))
+                    self.report(cache, "asgi", *async_to_sync(self.run_async)(paths, options["concurrency"]))
+        finally:
+            # only the rows created here, never products that merely share the prefix
+            Products.objects.filter(pk__in=self.created).delete()
+
+    def is_test_database(self):
+        """
+        Whether the default database is one the test runner creates.
+        """
+        name = str(connection.settings_dict["NAME"])
+        return (
+            name == connection.settings_dict["TEST"]["NAME"]
+            or name.startswith(TEST_DATABASE_PREFIX)
+            or "mode=memory" in name
+        )
+
+    def seed(self, count):
+        products = Products.objects.bulk_create(
+            Products(
+                product_title=f"{PREFIX} {i}", description="Benchmark product",
+                price=Decimal(i % 100 + 1), stock=10,
+            )
+            for i in range(count)
+        )
+        self.created = [product.pk for product in products]
+        for product in products[:count // 20]:
+            sharding.shard_product(product, 2)
+        # bulk inserts skip the product signals that keep these indexes current
+        search.refresh(products)
+        title_index.update_many(products)
+        return self.created
+
+    def paths(self, ids, cold):
+        for n in itertools.count():
+            path = "products/" if n % 2 else f"products/{ids[n % len(ids)]}/"
+            yield path + (f"?n={n}" if cold else "")
+
+    def run_sync(self, paths, threads):
+        jobs = iter(paths)
+        lock = threading.Lock()
+        latencies = []
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    with lock:
+                        path = next(jobs, None)
+                    if path is None:
+                        return
+                    start = time.perf_counter()
+                    client.get(f"/api/v1/{path}")
+                    latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - start, latencies
+
+    async def run_async(self, paths, concurrency):
+        jobs = iter(paths)
+        latencies = []
+        client = AsyncClient()
+
+        async def worker():
+            for path in jobs:
+                start = time.perf_counter()
+                await client.get(f"/api/v1/async/{path}")
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies
+
+    def report(self, cache, server, elapsed, latencies):
+        latencies = sorted(latencies)
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        self.stdout.write(
+            f"{cache:>5} {server:>6} {len(latencies):>9} {elapsed:>8.2f} "
+            f"{len(latencies) / elapsed:>8.1f} {p50:>7.2f} {p99:>7.2f}"
+        )
@@ -0,0 +1,79 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from ecommerce.pagination import KeysetPageNumberPagination
+from products.models import Products
+
+
+class Command(BaseCommand):
+    """
+    Compare the latency of a deep page with offset paging and keyset paging.
+
+    Seeds `--rows` products inside a transaction that is rolled back at the end, then
+    fetches page `--page` both ways through `KeysetPageNumberPagination`.
+    """
+
+    help = "Benchmark deep-page latency of offset vs keyset pagination on Products."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--page", type=int, default=500)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["rows"], options["batch_size"])
+            self.compare(options["page"], options["page_size"], options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, rows, batch_size):
+        self.stdout.write(f"Seeding {rows} products...")
+        for start in range(0, rows, batch_size):
+            Products.objects.bulk_create(
+                (
+                    Products(
+                        product_title=f"Pagination benchmark {i}",
+                        description="Benchmark product",
+                        price=Decimal("1.00"),
+                        stock=1,
+                    )
+                    for i in range(start, min(start + batch_size, rows))
+                ),
+                batch_size=batch_size,
+            )
+
+    def compare(self, page, page_size, repeat):
+        factory = APIRequestFactory()
+        queryset = Products.objects.order_by("created_at", "id")
+
+        # position the keyset cursor on the last row of the previous page (not timed)
+        previous = queryset.values_list("created_at", "id")[
+            (page - 1) * page_size - 1
+        ]
+        paginator = KeysetPageNumberPagination()
+        cursor = paginator.encode_cursor(previous)
+
+        offset_request = Request(factory.get("/", {"page": page, "page_size": page_size}))
+        keyset_request = Request(factory.get("/", {"cursor": cursor, "page_size": page_size}))
+
+        results = {}
+        for name, request in (("offset", offset_request), ("keyset", keyset_request)):
+            timings = []
+            for _ in range(repeat):
+                paginator = KeysetPageNumberPagination()
+                paginator.page_size_query_param = "page_size"
+                start = time.perf_counter()
+                rows = paginator.paginate_queryset(queryset, request)
+                timings.append(time.perf_counter() - start)
+            results[name] = (statistics.median(timings), rows[0].pk)
+
+        for name, (median, first_id) in results.items():
+            self.stdout.write(f"{name:>7}: page {page} median {median * 1000:.2f} ms (first id {first_id})")
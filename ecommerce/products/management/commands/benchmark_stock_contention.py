@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from products import sharding
+from products.models import Products
+
+
+class Command(BaseCommand):
+    """
+    Compare concurrent stock decrements on one product row against sharded counters.
+
+    Each worker thread runs decrements in their own transactions, optionally holding the
+    transaction open for `--hold-ms` to simulate the rest of a checkout. Against
+    PostgreSQL the single-row run serializes on the row lock while the sharded run
+    spreads the locks; SQLite locks the whole database, so it only checks correctness.
+
+    The benchmark product is committed (threads need to see it) and deleted at the end.
+    """
+
+    help = "Benchmark concurrent stock decrements with and without sharded counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--decrements", type=int, default=400, help="Total decrements per run.")
+        parser.add_argument("--shards", type=int, default=8)
+        parser.add_argument("--hold-ms", type=int, default=5, help="Time to keep each transaction open.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'mode':>10} {'ok':>6} {'failed':>7} {'seconds':>9} {'per sec':>9}  stock left")
+        for shards in (0, options["shards"]):
+            self.run(shards, options)
+
+    def run(self, shards, options):
+        total = options["decrements"]
+        product = Products.objects.create(
+            product_title="Stock contention benchmark",
+            description="Benchmark product",
+            price=Decimal("1.00"),
+            stock=total,
+        )
+        if shards:
+            sharding.shard_product(product, shards)
+
+        hold = options["hold_ms"] / 1000
+        failures = []
+        lock = threading.Lock()
+
+        def decrement(_):
+            try:
+                with transaction.atomic():
+                    if shards:
+                        ok = sharding.decrement(product.pk, 1, shards)
+                    else:
+                        ok = Products.objects.filter(pk=product.pk, stock__gte=1).update(
+                            stock=F("stock") - 1
+                        )
+                    time.sleep(hold)
+                return bool(ok)
+            except OperationalError:
+                with lock:
+                    failures.append(1)
+                return False
+            finally:
+                connection.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            ok = sum(pool.map(decrement, range(total)))
+        elapsed = time.perf_counter() - start
+
+        left = sharding.total_stock(product.pk, cached=False) if shards else (
+            Products.objects.get(pk=product.pk).stock
+        )
+        mode = f"{shards} shards" if shards else "single row"
+        self.stdout.write(
+            f"{mode:>10} {ok:>6} {len(failures):>7} {elapsed:>9.2f} {ok / elapsed:>9.1f}  {left}"
+        )
+        product.delete()
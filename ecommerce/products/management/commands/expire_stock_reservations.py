@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.reservations import expire
+
+
+class Command(BaseCommand):
+    """
+    Sweep expired stock reservations.
+
+    Expired holds are already ignored when computing available stock, so this only
+    keeps the table small. Run it from cron, or with `--interval` as a long-lived worker.
+    """
+
+    help = "Delete expired stock reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=int, default=0,
+            help="Keep running and sweep every N seconds.",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            deleted = expire()
+            self.stdout.write(f"Expired {deleted} stock reservations.")
+            if not interval:
+                return
+            time.sleep(interval)
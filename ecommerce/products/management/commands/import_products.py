@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importer import FeedError, feed_format, import_products, read_feed
+
+
+class Command(BaseCommand):
+    """
+    Upsert products from a CSV or NDJSON supplier feed, keyed on SKU.
+
+    The feed is read line by line and written in batches, each in its own transaction;
+    one line of stats is printed per batch, then the rejected rows.
+    """
+
+    help = "Import a CSV/NDJSON product feed (use - for stdin), creating or updating products by SKU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Feed file, or - to read standard input.")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, help="Defaults to settings.PRODUCT_IMPORT_BATCH_SIZE.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            fmt = feed_format(path, options["format"])
+            if path == "-":
+                report = self.run(sys.stdin, fmt, options["batch_size"])
+            else:
+                with open(path, encoding="utf-8-sig", newline="") as stream:
+                    report = self.run(stream, fmt, options["batch_size"])
+        except FeedError as exc:
+            raise CommandError(str(exc))
+
+        for reject in report["errors"]:
+            errors = "; ".join(f"{name}: {' '.join(messages)}" for name, messages in reject["errors"].items())
+            self.stdout.write(self.style.WARNING(f"line {reject['line']} (sku {reject['sku']}): {errors}"))
+        if report["rejected"] > len(report["errors"]):
+            self.stdout.write(f"... and {report['rejected'] - len(report['errors'])} more rejected rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} rows in {report['seconds']:.1f}s: {report['created']} created, "
+            f"{report['updated']} updated, {report['rejected']} rejected."
+        ))
+
+    def run(self, stream, fmt, batch_size):
+        self.stdout.write(f"{'batch':>6} {'rows':>6} {'created':>8} {'updated':>8} {'rejected':>9} {'rows/s':>9}")
+        return import_products(read_feed(stream, fmt), batch_size=batch_size, on_batch=self.print_batch)
+
+    def print_batch(self, stats):
+        self.stdout.write(
+            f"{stats['batch']:>6} {stats['rows']:>6} {stats['created']:>8} {stats['updated']:>8} "
+            f"{stats['rejected']:>9} {stats['rows_per_second'] or 0:>9.0f}"
+        )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products import sharding
+from products.models import Products
+
+
+class Command(BaseCommand):
+    """
+    Even out sharded stock counters, or change how a product is sharded.
+
+    Examples:
+        manage.py rebalance_stock_shards                      # rebalance every sharded product
+        manage.py rebalance_stock_shards --product 12         # rebalance one product
+        manage.py rebalance_stock_shards --product 12 --shards 8
+        manage.py rebalance_stock_shards --product 12 --shards 0   # back to a single row
+    """
+
+    help = "Rebalance sharded product stock counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--product", type=int, help="Only this product id.")
+        parser.add_argument(
+            "--shards", type=int,
+            help="Re-shard the product into this many counters (0 to unshard). Requires --product.",
+        )
+
+    def handle(self, *args, **options):
+        product_id = options["product"]
+        shards = options["shards"]
+
+        if shards is not None:
+            if product_id is None:
+                raise CommandError("--shards requires --product.")
+            if shards < 0:
+                raise CommandError("--shards cannot be negative.")
+            product = self.get_product(product_id)
+            total = sharding.shard_product(product, shards)
+            self.stdout.write(f"Product {product.pk}: {total} in stock across {shards or 1} row(s).")
+            return
+
+        products = Products.objects.filter(stock_shard_count__gt=0)
+        if product_id is not None:
+            products = products.filter(pk=product_id)
+            if not products.exists():
+                raise CommandError(f"Product {product_id} does not exist or is not sharded.")
+
+        for product in products.iterator():
+            total = sharding.rebalance(product)
+            self.stdout.write(
+                f"Product {product.pk}: {total} in stock across {product.stock_shard_count} shards."
+            )
+
+    def get_product(self, product_id):
+        try:
+            return Products.objects.get(pk=product_id)
+        except Products.DoesNotExist:
+            raise CommandError(f"Product {product_id} does not exist.")
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='stock_shard_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('stock', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='products.products')),
+            ],
+            options={
+                'verbose_name_plural': 'Stock Shards',
+                'constraints': [models.UniqueConstraint(fields=('product', 'index'), name='unique_product_stock_shard')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_stock_shards'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['created_at', 'id'], name='products_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['search_vector'], name='products_search_vector_idx'
+)
+
+
+def create_search_index(apps, schema_editor):
+    """
+    The GIN index and the stored vectors only exist on PostgreSQL; other databases
+    use the in-process fallback index in products.search.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.search import SearchVector
+
+    Products = apps.get_model('products', 'Products')
+    schema_editor.add_index(Products, SEARCH_INDEX)
+    Products.objects.update(
+        search_vector=(
+            SearchVector('product_title', weight='A', config='english')
+            + SearchVector('product_subtitle', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        )
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(apps.get_model('products', 'Products'), SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # not in the model state: it would make SQLite table rebuilds create a plain
+        # copy of the index on search_vector
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['price', 'id'], name='products_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['created_at', 'id'], name='products_available_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(condition=models.Q(('is_available', True), ('stock__gt', 0)), fields=['price', 'id'], name='products_instock_price_idx'),
+        ),
+    ]
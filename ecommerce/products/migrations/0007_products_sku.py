@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
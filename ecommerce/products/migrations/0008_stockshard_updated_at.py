@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-17 07:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_products_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockshard',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from .validators import price_validator
 
@@ -7,26 +8,34 @@ class Products(models.Model):
     Represents a product in the e-commerce application.
 
     Attributes:
+        sku (CharField): The supplier's stock keeping unit, unique; bulk imports upsert on it.
         product_title (CharField): The title of the product (max length: 255).
         product_subtitle (CharField): An optional subtitle for the product (max length: 255).
         description (TextField): A detailed description of the product.
         price (DecimalField): The price of the product with up to 10 digits and 2 decimal places.
         image (URLField): An optional URL to the product's image.
         stock (PositiveIntegerField): The number of items available in stock (default: 0).
+            For sharded products this is only a snapshot; the live count is the sum of its `StockShard` rows.
+        stock_shard_count (PositiveSmallIntegerField): Number of stock counter shards, 0 when stock is kept on this row.
         is_available (BooleanField): Indicates whether the product is available for purchase (default: True).
         created_at (DateTimeField): The timestamp when the product was created (auto-generated).
         updated_at (DateTimeField): The timestamp when the product was last updated (auto-updated).
+        search_vector (SearchVectorField): Weighted full-text document of title, subtitle and description
+            (PostgreSQL only, maintained on save).
     """
 
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     product_title = models.CharField(max_length=255)
     product_subtitle = models.CharField(max_length=255, blank=True, null=True)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[price_validator])
     image = models.URLField(blank=True, null=True)
     stock = models.PositiveIntegerField(default=0)
+    stock_shard_count = models.PositiveSmallIntegerField(default=0)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         """
@@ -35,4 +44,94 @@ class Products(models.Model):
         Returns:
             str: The title of the product.
         """
-        return self.product_title
\ No newline at end of file
+        return self.product_title
+
+    class Meta:
+        indexes = [
+            # keyset pagination
+            models.Index(fields=["created_at", "id"], name="products_created_id_idx"),
+            models.Index(fields=["price", "id"], name="products_price_id_idx"),
+            # storefront listings of available products, newest/oldest first
+            models.Index(
+                fields=["created_at", "id"],
+                condition=models.Q(is_available=True),
+                name="products_available_created_idx",
+            ),
+            # available, in-stock products by price
+            models.Index(
+                fields=["price", "id"],
+                condition=models.Q(is_available=True, stock__gt=0),
+                name="products_instock_price_idx",
+            ),
+            # the full-text GIN index on search_vector exists only on PostgreSQL and is
+            # created by migration 0005, outside the model state
+        ]
+
+class StockShard(models.Model):
+    """
+    One of N counter rows holding part of a hot product's stock.
+
+    Checkout decrements a random shard, so concurrent buyers of the same product lock
+    different rows instead of queueing on the product row.
+
+    Attributes:
+        product (ForeignKey): The product the shard belongs to.
+        index (PositiveSmallIntegerField): Position of the shard, 0 to N-1.
+        stock (PositiveIntegerField): Stock held by this shard.
+        updated_at (DateTimeField): When the shard's stock last changed; decrements
+            set it explicitly, since they don't go through save().
+    """
+
+    product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name='stock_shards')
+    index = models.PositiveSmallIntegerField()
+    stock = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.product_id}[{self.index}] = {self.stock}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "index"], name="unique_product_stock_shard"
+            )
+        ]
+        verbose_name_plural = "Stock Shards"
+
+
+class StockReservation(models.Model):
+    """
+    A short-lived hold on product stock, taken when a user's cart enters checkout.
+
+    Holds never touch `Products.stock`; available stock is derived as committed stock
+    minus the live (unexpired) holds of other users. Expired rows are ignored by every
+    query and removed by the `expire_stock_reservations` sweep.
+
+    Attributes:
+        product (ForeignKey): The product being held.
+        user (ForeignKey): The user the stock is held for.
+        quantity (PositiveIntegerField): Number of items held.
+        expires_at (DateTimeField): When the hold stops counting against available stock.
+        created_at (DateTimeField): The timestamp when the hold was created (auto-generated).
+    """
+
+    product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for user {self.user_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "product"], name="unique_user_product_reservation"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["product", "expires_at"], name="reservation_product_expiry_idx"),
+            models.Index(fields=["expires_at"], name="reservation_expiry_idx"),
+        ]
+        verbose_name_plural = "Stock Reservations"
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Products, StockReservation
+from .sharding import committed_stock, lock_shards
+
+
+class ReservationError(Exception):
+    """
+    Raised when stock cannot be held for a cart.
+    The message is safe to return to the client.
+    """
+
+
+def live_reservations(now=None):
+    """
+    Return a queryset of holds that have not expired yet.
+    """
+    return StockReservation.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def held_quantities(product_ids, exclude_user=None):
+    """
+    Sum the live holds per product with one aggregate query.
+
+    Args:
+        product_ids (iterable): Products to look up.
+        exclude_user (User, optional): Ignore this user's own holds.
+
+    Returns:
+        dict: product_id -> quantity held.
+    """
+    holds = live_reservations().filter(product_id__in=product_ids)
+    if exclude_user is not None:
+        holds = holds.exclude(user_id=exclude_user.pk)
+    return dict(
+        holds.values("product_id").annotate(held=Sum("quantity")).values_list("product_id", "held")
+    )
+
+
+def held_by_others(user):
+    """
+    Correlated subquery for the quantity of a product held by users other than `user`.
+
+    Meant to be used against `Products` querysets (it references the outer `pk`), e.g.
+    inside the WHERE clause of the checkout stock UPDATE.
+    """
+    holds = (
+        live_reservations()
+        .filter(product=OuterRef("pk"))
+        .exclude(user_id=user.pk)
+        .values("product")
+        .annotate(held=Sum("quantity"))
+        .values("held")
+    )
+    return Coalesce(Subquery(holds, output_field=IntegerField()), 0)
+
+
+def available_stock(product_ids, exclude_user=None):
+    """
+    Committed stock minus live holds, per product.
+
+    Args:
+        product_ids (iterable): Products to look up.
+        exclude_user (User, optional): Don't count this user's own holds against them.
+
+    Returns:
+        dict: product_id -> available quantity (never negative).
+    """
+    held = held_quantities(product_ids, exclude_user=exclude_user)
+    stock = committed_stock(
+        Products.objects.filter(id__in=product_ids).values_list("id", "stock", "stock_shard_count")
+    )
+    return {product_id: max(units - held.get(product_id, 0), 0) for product_id, units in stock.items()}
+
+
+def reserve(user, lines, ttl=None):
+    """
+    Hold stock for a user's checkout.
+
+    The product rows (and the shards of sharded products) are locked only for the
+    duration of this short transaction while the holds are checked and written; the
+    holds themselves keep the stock set aside until they expire or the order is placed.
+    Any previous holds of the user are replaced.
+
+    Args:
+        user (User): The user entering checkout.
+        lines (list): (product_id, quantity) pairs.
+        ttl (timedelta, optional): Hold lifetime. Defaults to `settings.STOCK_RESERVATION_TTL`.
+
+    Raises:
+        ReservationError: If a product does not have enough unheld stock.
+
+    Returns:
+        datetime: When the holds expire.
+    """
+    wanted = dict(lines)
+    expires_at = timezone.now() + (ttl or settings.STOCK_RESERVATION_TTL)
+
+    with transaction.atomic():
+        products = list(
+            Products.objects.select_for_update()
+            .filter(id__in=wanted)
+            .order_by("id")
+            .only("id", "product_title", "stock", "stock_shard_count")
+        )
+        # a checkout decrementing a shard finishes before its stock is counted, and one
+        # starting now sees these holds (see orders.services.reserve_sharded_stock)
+        for product in products:
+            if product.stock_shard_count:
+                lock_shards(product.id)
+        held = held_quantities(wanted, exclude_user=user)
+        stock = committed_stock((p.id, p.stock, p.stock_shard_count) for p in products)
+
+        for product in products:
+            available = max(stock[product.id] - held.get(product.id, 0), 0)
+            if wanted[product.id] > available:
+                raise ReservationError(
+                    f"{product.product_title} has only {available} items in stock."
+                )
+        if len(products) != len(wanted):
+            raise ReservationError("Some products in your cart are no longer available.")
+
+        StockReservation.objects.filter(user_id=user.pk).delete()
+        StockReservation.objects.bulk_create(
+            StockReservation(user_id=user.pk, product_id=product_id, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in wanted.items()
+        )
+
+    return expires_at
+
+
+def release(user, product_ids=None):
+    """
+    Drop a user's holds, optionally only for the given products.
+    """
+    holds = StockReservation.objects.filter(user_id=user.pk)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=product_ids)
+    holds.delete()
+
+
+def expire(now=None):
+    """
+    Delete holds that have expired.
+
+    Returns:
+        int: Number of holds removed.
+    """
+    deleted, _ = StockReservation.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,232 @@
+import bisect
+import heapq
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, transaction
+from django.db.models import Case, F, FloatField, Value, When
+from rest_framework import filters
+from rest_framework.settings import api_settings
+from .cache import CatalogIndexMixin
+from .models import Products
+
+SEARCH_CONFIG = "english"
+
+# (field, PostgreSQL weight, fallback score) in decreasing importance
+SEARCH_FIELDS = (
+    ("product_title", "A", 3.0),
+    ("product_subtitle", "B", 2.0),
+    ("description", "C", 1.0),
+)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# best-scoring fallback matches a search returns; each costs a CASE branch and
+# query parameters, so a broad term can't blow past SQLite's variable limit
+MAX_FALLBACK_MATCHES = 1000
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def uses_postgres(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+def search_vector():
+    """
+    The weighted tsvector stored in `Products.search_vector`.
+    """
+    vector = None
+    for field, weight, _ in SEARCH_FIELDS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+class InvertedIndex(CatalogIndexMixin):
+    """
+    In-process prefix-searchable inverted index, used when the database is not PostgreSQL.
+
+    Maps each token to the products containing it with a field-weighted score. Tokens are
+    also kept sorted so a query term matches every token it is a prefix of. The index is
+    built from the database on first use, kept current by this worker's committed
+    product writes and reloaded when the catalog version shows writes from elsewhere.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.tokens = []
+        self._lock = threading.Lock()
+
+    def build(self):
+        postings, documents = defaultdict(dict), {}
+        rows = Products.objects.values_list("id", *(field for field, _, _ in SEARCH_FIELDS)).iterator()
+        for pk, *texts in rows:
+            self._add(pk, texts, postings, documents)
+        return postings, documents, sorted(postings)
+
+    def install(self, contents):
+        self.postings, self.documents, self.tokens = contents
+
+    @staticmethod
+    def _add(pk, texts, postings, documents):
+        scores = defaultdict(float)
+        for text, (_, _, weight) in zip(texts, SEARCH_FIELDS):
+            for token in tokenize(text):
+                scores[token] += weight
+        documents[pk] = list(scores)
+        for token, score in scores.items():
+            postings[token][pk] = score
+
+    def _remove(self, pk):
+        for token in self.documents.pop(pk, ()):
+            postings = self.postings[token]
+            postings.pop(pk, None)
+            if not postings:
+                del self.postings[token]
+                index = bisect.bisect_left(self.tokens, token)
+                if index < len(self.tokens) and self.tokens[index] == token:
+                    del self.tokens[index]
+
+    def update(self, product):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._remove(product.pk)
+            self._add(
+                product.pk, [getattr(product, field) for field, _, _ in SEARCH_FIELDS],
+                self.postings, self.documents,
+            )
+            for token in self.documents[product.pk]:
+                index = bisect.bisect_left(self.tokens, token)
+                if index == len(self.tokens) or self.tokens[index] != token:
+                    self.tokens.insert(index, token)
+
+    def remove(self, pk):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._remove(pk)
+
+    def search(self, terms):
+        """
+        Products matching every term as a token prefix.
+
+        Returns:
+            dict: product_id -> score.
+        """
+        self.sync()
+        results = None
+        for term in terms:
+            scores = defaultdict(float)
+            start = bisect.bisect_left(self.tokens, term)
+            for token in self.tokens[start:]:
+                if not token.startswith(term):
+                    break
+                for pk, score in self.postings[token].items():
+                    scores[pk] += score
+            if results is None:
+                results = scores
+            else:
+                results = {pk: results[pk] + score for pk, score in scores.items() if pk in results}
+            if not results:
+                return {}
+        return results or {}
+
+
+fallback_index = InvertedIndex()
+
+
+def refresh(products):
+    """
+    Bring the search index up to date for the given saved products.
+
+    On PostgreSQL this recomputes the stored `search_vector` with one UPDATE, as part of
+    the caller's transaction; otherwise it updates the in-process fallback index once
+    that transaction commits, so rows that are rolled back never show up in it.
+    """
+    products = list(products)
+    if not products:
+        return
+    if uses_postgres():
+        Products.objects.filter(pk__in=[product.pk for product in products]).update(
+            search_vector=search_vector()
+        )
+    else:
+        transaction.on_commit(lambda: [fallback_index.update(product) for product in products])
+
+
+def remove(pk):
+    if not uses_postgres():
+        transaction.on_commit(lambda: fallback_index.remove(pk))
+
+
+def search(queryset, terms, ranked=True):
+    """
+    Filter a `Products` queryset to rows matching all `terms` (each as a prefix).
+
+    Args:
+        queryset (QuerySet): Products to search in.
+        terms (list): Lower-cased search terms.
+        ranked (bool): Order by relevance, keeping the existing ordering as tie-breaker.
+
+    Returns:
+        QuerySet: The filtered queryset, annotated with `rank`.
+    """
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+
+    if uses_postgres(queryset.db):
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG
+        )
+        queryset = queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+    else:
+        scores = fallback_index.search(terms)
+        if len(scores) > MAX_FALLBACK_MATCHES:
+            scores = dict(heapq.nlargest(
+                MAX_FALLBACK_MATCHES, scores.items(), key=lambda item: (item[1], -item[0])
+            ))
+        queryset = queryset.filter(pk__in=scores).annotate(
+            rank=Case(
+                *(When(pk=pk, then=Value(score)) for pk, score in scores.items()),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+    if ranked:
+        queryset = queryset.order_by("-rank", *ordering)
+    return queryset
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """
+    Full-text product search on `?search=`, ranked by relevance.
+
+    Matches title, subtitle and description; every word must match, as a word prefix.
+    Results are ordered by rank unless the client asked for an explicit ordering or a
+    keyset page (which is always ordered by creation time).
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def get_search_terms(self, request):
+        return tokenize(request.query_params.get(self.search_param, ""))
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        ranked = api_settings.ORDERING_PARAM not in request.query_params
+        paginator = getattr(view, "paginator", None)
+        if paginator is not None and getattr(paginator, "wants_keyset", None):
+            ranked = ranked and not paginator.wants_keyset(request)
+        return search(queryset, terms, ranked=ranked)
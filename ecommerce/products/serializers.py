@@ -1,12 +1,98 @@
+from django.conf import settings
 from rest_framework import serializers
+from ecommerce.fieldsets import SparseFieldsetSerializerMixin
 from .models import Products
+from .validators import price_validator
+from . import sharding
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Products
         fields = [
-            'id', 'product_title', 'product_subtitle', 'description', 'price', 
+            'id', 'sku', 'product_title', 'product_subtitle', 'description', 'price',
             'stock', 'image', 'is_available', 'created_at', 'updated_at'
             ]
         read_only_fields = ['id']
 
+    # columns fast_complete reads from FastSerializer rows
+    fast_columns = ['pk', 'stock_shard_count']
+
+    def validate_sku(self, value):
+        """
+        Store a blank SKU as NULL, so products without one don't collide on uniqueness.
+        """
+        return value or None
+
+    def to_representation(self, instance):
+        """
+        Report the summed shard stock for products with sharded stock.
+
+        Views can pass precomputed totals as `shard_totals` in the serializer context;
+        otherwise the (cached) total is looked up per sharded product.
+        """
+        data = super().to_representation(instance)
+        if instance.stock_shard_count and 'stock' in data:
+            totals = self.context.get('shard_totals') or {}
+            if instance.pk in totals:
+                data['stock'] = totals[instance.pk]
+            else:
+                data['stock'] = sharding.total_stock(instance.pk)
+        return data
+
+    def fast_complete(self, rows, data, context):
+        """
+        The shard stock override of `to_representation`, for lists rendered by a
+        `FastSerializer`.
+        """
+        if 'stock' not in self.fields:
+            return
+        totals = context.get('shard_totals') or {}
+        for row, item in zip(rows, data):
+            if row.stock_shard_count:
+                item['stock'] = totals[row.pk] if row.pk in totals else sharding.total_stock(row.pk)
+
+    def update(self, instance, validated_data):
+        """
+        Spread stock written to a sharded product across its shards.
+        """
+        stock = validated_data.pop('stock', None) if instance.stock_shard_count else None
+        instance = super().update(instance, validated_data)
+        if stock is not None:
+            sharding.set_stock(instance, stock)
+        return instance
+
+
+class InventoryItemSerializer(serializers.Serializer):
+    """
+    Serializer for one product of an inventory update.
+
+    Stock is set with `stock` or adjusted with `stock_delta`; `price` is always absolute.
+    """
+
+    id = serializers.IntegerField(min_value=1)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    stock_delta = serializers.IntegerField(required=False)
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, validators=[price_validator], required=False
+    )
+
+    def validate(self, attrs):
+        if "stock" in attrs and "stock_delta" in attrs:
+            raise serializers.ValidationError("Give either stock or stock_delta, not both.")
+        if len(attrs) == 1:
+            raise serializers.ValidationError("Give stock, stock_delta or price.")
+        return attrs
+
+
+class InventoryUpdateSerializer(serializers.Serializer):
+    """
+    Serializer for bulk inventory updates: up to `settings.INVENTORY_MAX_ITEMS` products.
+    """
+
+    items = InventoryItemSerializer(many=True, allow_empty=False, max_length=settings.INVENTORY_MAX_ITEMS)
+
+    def validate_items(self, items):
+        ids = [item["id"] for item in items]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError("Each product can only be listed once.")
+        return items
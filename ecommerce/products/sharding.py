@@ -0,0 +1,221 @@
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Now
+from django.utils import timezone
+from .models import Products, StockShard
+
+
+def _cache_key(product_id):
+    return f"products:shard-stock:{product_id}"
+
+
+def _split(total, shards):
+    """
+    Spread `total` over `shards` counters as evenly as possible.
+    """
+    base, extra = divmod(total, shards)
+    return [base + (1 if index < extra else 0) for index in range(shards)]
+
+
+def invalidate(product_ids):
+    """
+    Forget the cached totals of the given products once the current transaction commits.
+    """
+    keys = [_cache_key(product_id) for product_id in product_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def shard_totals(product_ids, cached=True):
+    """
+    Sum the shards of each product.
+
+    Args:
+        product_ids (iterable): Sharded products to look up.
+        cached (bool): Serve totals from the cache when possible. Use False when the
+            value is used to make a stock decision.
+
+    Returns:
+        dict: product_id -> total stock across shards.
+    """
+    product_ids = list(product_ids)
+    totals = {}
+    if cached:
+        hits = cache.get_many([_cache_key(product_id) for product_id in product_ids])
+        for product_id in product_ids:
+            if _cache_key(product_id) in hits:
+                totals[product_id] = hits[_cache_key(product_id)]
+
+    missing = [product_id for product_id in product_ids if product_id not in totals]
+    if missing:
+        fetched = dict(
+            StockShard.objects.filter(product_id__in=missing)
+            .values("product_id")
+            .annotate(total=Sum("stock"))
+            .values_list("product_id", "total")
+        )
+        fetched = {product_id: fetched.get(product_id, 0) for product_id in missing}
+        cache.set_many(
+            {_cache_key(product_id): total for product_id, total in fetched.items()},
+            settings.STOCK_SHARD_CACHE_SECONDS,
+        )
+        totals.update(fetched)
+    return totals
+
+
+def total_stock(product_id, cached=True):
+    """
+    Total stock of a single sharded product.
+    """
+    return shard_totals([product_id], cached=cached)[product_id]
+
+
+def committed_stock(rows):
+    """
+    Resolve the live stock for (product_id, stock, stock_shard_count) rows.
+
+    Unsharded products use their own `stock`; sharded ones are summed from their shards.
+
+    Returns:
+        dict: product_id -> stock.
+    """
+    rows = list(rows)
+    sharded = shard_totals(
+        [product_id for product_id, _, shards in rows if shards], cached=False
+    )
+    return {
+        product_id: sharded[product_id] if shards else stock
+        for product_id, stock, shards in rows
+    }
+
+
+def _write_shards(product, total, shards):
+    StockShard.objects.filter(product=product).delete()
+    StockShard.objects.bulk_create(
+        StockShard(product=product, index=index, stock=stock)
+        for index, stock in enumerate(_split(total, shards))
+    )
+    Products.objects.filter(pk=product.pk).update(stock=total, stock_shard_count=shards)
+    product.stock = total
+    product.stock_shard_count = shards
+    invalidate([product.pk])
+
+
+def shard_product(product, shards):
+    """
+    Split a product's stock across `shards` counter rows, or merge it back when `shards` is 0.
+
+    Args:
+        product (Products): The product to (re)shard.
+        shards (int): Number of shards; 0 keeps stock on the product row again.
+
+    Returns:
+        int: The product's total stock.
+    """
+    with transaction.atomic():
+        product = Products.objects.select_for_update().get(pk=product.pk)
+        if product.stock_shard_count:
+            list(StockShard.objects.select_for_update().filter(product=product))
+            total = total_stock(product.pk, cached=False)
+        else:
+            total = product.stock
+
+        if shards:
+            _write_shards(product, total, shards)
+        else:
+            StockShard.objects.filter(product=product).delete()
+            Products.objects.filter(pk=product.pk).update(stock=total, stock_shard_count=0)
+            invalidate([product.pk])
+    return total
+
+
+def set_stock(product, total):
+    """
+    Overwrite the stock of a sharded product, spreading it evenly over its shards.
+    """
+    with transaction.atomic():
+        list(StockShard.objects.select_for_update().filter(product=product))
+        _write_shards(product, total, product.stock_shard_count)
+
+
+def rebalance(product):
+    """
+    Even out the shards of a product after decrements drained some of them.
+
+    Also refreshes the `Products.stock` snapshot.
+
+    Returns:
+        int: The product's total stock.
+    """
+    with transaction.atomic():
+        rows = lock_shards(product.pk)
+        total = sum(row.stock for row in rows)
+        for row, stock in zip(rows, _split(total, len(rows))):
+            row.stock = stock
+        StockShard.objects.bulk_update(rows, ["stock"])
+        Products.objects.filter(pk=product.pk).update(stock=total)
+        invalidate([product.pk])
+    return total
+
+
+def lock_shards(product_id):
+    """
+    Lock every shard of a product, in index order so concurrent lockers queue instead of
+    deadlocking. Must be called inside a transaction.
+
+    Returns:
+        list: The product's `StockShard` rows.
+    """
+    return list(
+        StockShard.objects.select_for_update().filter(product_id=product_id).order_by("index")
+    )
+
+
+def drain(product_id, rows, quantity):
+    """
+    Take `quantity` items from shard rows locked with `lock_shards()`, emptying them in order.
+
+    Returns:
+        bool: False if the shards don't hold `quantity` items in total.
+    """
+    if sum(row.stock for row in rows) < quantity:
+        return False
+
+    remaining = quantity
+    now = timezone.now()
+    for row in rows:
+        taken = min(row.stock, remaining)
+        row.stock -= taken
+        row.updated_at = now
+        remaining -= taken
+    StockShard.objects.bulk_update(rows, ["stock", "updated_at"])
+    invalidate([product_id])
+    return True
+
+
+def decrement(product_id, quantity, shards):
+    """
+    Take `quantity` items from a sharded product.
+
+    Shards are tried one at a time starting from a random one, each with a conditional
+    UPDATE, so concurrent checkouts usually lock different rows. If no single shard can
+    cover the quantity, all shards of the product are locked and drained in order.
+    Must be called inside a transaction.
+
+    Returns:
+        bool: False if the product does not have enough stock in total.
+    """
+    start = random.randrange(shards)
+    for offset in range(shards):
+        index = (start + offset) % shards
+        updated = StockShard.objects.filter(
+            product_id=product_id, index=index, stock__gte=quantity
+        ).update(stock=F("stock") - quantity, updated_at=Now())
+        if updated:
+            invalidate([product_id])
+            return True
+
+    return drain(product_id, lock_shards(product_id), quantity)
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import search
+from .cache import catalog_cache
+from .models import Products
+from .suggest import title_index
+
+SEARCH_FIELDS = {field for field, _, _ in search.SEARCH_FIELDS}
+
+
+@receiver(post_save, sender=Products)
+@receiver(post_delete, sender=Products)
+def invalidate_catalog(sender, instance, **kwargs):
+    """
+    Drop cached catalog responses whenever a product changes.
+    """
+    catalog_cache.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Products)
+def refresh_search_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the full-text index in step with the product's text fields.
+    """
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    search.refresh([instance])
+
+
+@receiver(post_delete, sender=Products)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove(instance.pk)
+
+
+@receiver(post_save, sender=Products)
+def refresh_suggestions(sender, instance, **kwargs):
+    """
+    Update the typeahead index once the write commits; it must never see rolled-back rows.
+    """
+    transaction.on_commit(lambda: title_index.update(instance))
+
+
+@receiver(post_delete, sender=Products)
+def remove_from_suggestions(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: title_index.remove(pk))
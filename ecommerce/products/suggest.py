@@ -0,0 +1,133 @@
+import bisect
+import threading
+
+from .cache import CatalogIndexMixin
+from .models import Products
+
+
+def normalize(text):
+    return " ".join((text or "").lower().split())
+
+
+class TitleIndex(CatalogIndexMixin):
+    """
+    Sorted-array prefix index over the titles of available products.
+
+    Every word suffix of a title is stored as a key ("wireless noise headphones",
+    "noise headphones", "headphones"), so a prefix matches the start of any word. Keys
+    are flagged so whole titles sort ahead of inner-word suffixes; title-start matches
+    come first and each lookup is two binary searches plus a scan of about `limit` keys.
+    Between reloads it never touches the database. This worker's committed product writes
+    insert and remove the keys of the changed titles in place, so lookups hold the lock
+    for their few binary searches; writes from other workers show up when the catalog
+    version moves and the index reloads (see `CatalogIndexMixin`).
+    """
+
+    # larger update_many() batches rebuild the array instead of inserting key by key
+    REBUILD_BATCH = 64
+
+    def __init__(self):
+        self.entries = []
+        self.titles = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(pk, title):
+        words = normalize(title).split()
+        return [(start > 0, " ".join(words[start:]), pk) for start in range(len(words))]
+
+    def build(self):
+        titles = dict(Products.objects.filter(is_available=True).values_list("id", "product_title"))
+        return sorted(key for pk, title in titles.items() for key in self._keys(pk, title)), titles
+
+    def install(self, contents):
+        self.entries, self.titles = contents
+
+    def _remove_keys(self, entries, pk, title):
+        for key in self._keys(pk, title):
+            index = bisect.bisect_left(entries, key)
+            if index < len(entries) and entries[index] == key:
+                del entries[index]
+
+    def update_many(self, products):
+        """
+        Re-index the given products; unavailable ones are dropped from the index.
+
+        Only the keys of the changed titles are removed and inserted, by binary search.
+        Batches of more than `REBUILD_BATCH` products (bulk imports) instead filter the
+        array once and merge the sorted new keys in.
+        """
+        if not self.loaded:
+            return
+        # the last copy of a product given twice wins
+        products = list({product.pk: product for product in products}.values())
+        with self._lock:
+            entries, titles = self.entries, self.titles
+            if len(products) > self.REBUILD_BATCH:
+                changed = {product.pk for product in products}
+                entries = [entry for entry in entries if entry[2] not in changed]
+                added = []
+                for product in products:
+                    titles.pop(product.pk, None)
+                    if product.is_available:
+                        titles[product.pk] = product.product_title
+                        added.extend(self._keys(product.pk, product.product_title))
+                # two sorted runs: timsort merges them in linear time
+                entries.extend(sorted(added))
+                entries.sort()
+                self.entries = entries
+                return
+
+            for product in products:
+                old = titles.pop(product.pk, None)
+                if old is not None:
+                    self._remove_keys(entries, product.pk, old)
+                if product.is_available:
+                    titles[product.pk] = product.product_title
+                    for key in self._keys(product.pk, product.product_title):
+                        bisect.insort(entries, key)
+
+    def update(self, product):
+        self.update_many([product])
+
+    def remove(self, pk):
+        if not self.loaded:
+            return
+        with self._lock:
+            old = self.titles.pop(pk, None)
+            if old is not None:
+                self._remove_keys(self.entries, pk, old)
+
+    def suggest(self, prefix, limit=10):
+        """
+        Up to `limit` products whose title has a word starting with `prefix`.
+
+        Titles that start with the prefix come first (alphabetically), then titles
+        with a later word starting with it.
+
+        Returns:
+            list: {"id", "product_title"} dicts.
+        """
+        self.sync()
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        matches, seen = [], set()
+        with self._lock:
+            entries, titles = self.entries, self.titles
+            # title-start keys sort before inner-word keys (False < True)
+            for inner in (False, True):
+                index = bisect.bisect_left(entries, (inner, prefix))
+                while index < len(entries) and len(matches) < limit:
+                    is_inner, key, pk = entries[index]
+                    if is_inner != inner or not key.startswith(prefix):
+                        break
+                    if pk not in seen and pk in titles:
+                        seen.add(pk)
+                        matches.append({"id": pk, "product_title": titles[pk]})
+                    index += 1
+        return matches
+
+
+title_index = TitleIndex()
@@ -1,3 +1,390 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User
+from cart.models import Addresses, Cart
+from orders.services import CheckoutError, create_order_from_cart
+from . import importer, search, sharding
+from .cache import catalog_cache
+from .inventory import apply_updates
+from .models import Products
+from .reservations import reserve
+from .suggest import TitleIndex, title_index
+
+
+def make_user(username, **extra):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password="Test@12345",
+        first_name="Test", last_name="User", **extra,
+    )
+
+
+class ShardedStockTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("buyer")
+        cls.other = make_user("holder")
+        cls.admin = make_user("admin", is_staff=True, is_superuser=True)
+        cls.address = Addresses.objects.create(
+            user=cls.user, address_line_1="1 Test Street", phone_number="9999999999",
+            city="City", state="State", postal_code="000000", country="Country",
+        )
+        cls.product = Products.objects.create(
+            product_title="Hot product", description="Sharded", price=Decimal("5.00"), stock=10,
+        )
+        sharding.shard_product(cls.product, 2)
+
+    def setUp(self):
+        cache.clear()
+
+    def stock(self):
+        return sharding.total_stock(self.product.pk, cached=False)
+
+    def checkout(self, quantity):
+        Cart.objects.update_or_create(user=self.user, product=self.product, defaults={"quantity": quantity})
+        return create_order_from_cart(self.user, self.address)
+
+    def test_decrement_drains_shards_and_never_goes_negative(self):
+        self.assertTrue(sharding.decrement(self.product.pk, 7, 2))
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(sharding.decrement(self.product.pk, 4, 2))
+        self.assertEqual(self.stock(), 3)
+
+    def test_checkout_without_holds(self):
+        self.checkout(4)
+        self.assertEqual(self.stock(), 6)
+
+    def test_checkout_leaves_other_users_holds(self):
+        reserve(self.other, [(self.product.pk, 8)])
+        with self.assertRaisesMessage(CheckoutError, "has only 2 items in stock"):
+            self.checkout(3)
+        self.assertEqual(self.stock(), 10)
+
+        self.checkout(2)
+        self.assertEqual(self.stock(), 8)
+
+    def test_checkout_counts_own_holds_as_available(self):
+        reserve(self.user, [(self.product.pk, 5)])
+        self.checkout(5)
+        self.assertEqual(self.stock(), 5)
+
+    def test_api_stock_edit_is_spread_over_shards(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(f"/api/v1/products/{self.product.pk}/", {"stock": 7}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["stock"], 7)
+        self.assertEqual(self.stock(), 7)
+        self.assertEqual(sorted(self.product.stock_shards.values_list("stock", flat=True)), [3, 4])
+
+    def test_admin_stock_edit_is_spread_over_shards(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("admin:products_products_change", args=[self.product.pk]),
+            {
+                "sku": "", "product_title": "Hot product", "product_subtitle": "",
+                "description": "Sharded", "price": "5.00", "image": "", "stock": 12,
+                "is_available": "on",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.stock(), 12)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.stock_shard_count), (12, 2))
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("admin", is_staff=True)
+        cls.existing = Products.objects.create(
+            sku="MUG-1", product_title="Mug", description="Stoneware", price=Decimal("4.50"), stock=5,
+        )
+        cls.sharded = Products.objects.create(
+            sku="TEA-1", product_title="Tea", description="Loose leaf", price=Decimal("2.00"), stock=6,
+        )
+        sharding.shard_product(cls.sharded, 2)
+
+    def upload(self, name, content):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        return client.post(
+            "/api/v1/products/import/", {"file": SimpleUploadedFile(name, content.encode())}, format="multipart"
+        )
+
+    def test_csv_feed_creates_updates_and_reports_rejected_rows(self):
+        response = self.upload("feed.csv", (
+            "sku,product_title,description,price,stock\n"
+            "MUG-1,,,5.00,\n"
+            "TEA-1,,,,9\n"
+            "LID-1,Lid,Bamboo,1.25,4\n"
+            "BAD-1,Bad,Broken,not a price,1\n"
+            "NEW-1,,,,3\n"
+        ))
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report["rows"], report["created"], report["updated"], report["rejected"]), (5, 1, 2, 2))
+        self.assertEqual([(error["line"], error["sku"]) for error in report["errors"]], [(5, "BAD-1"), (6, "NEW-1")])
+
+        # columns a row leaves empty keep their stored value
+        self.existing.refresh_from_db()
+        self.assertEqual(
+            (self.existing.product_title, self.existing.price, self.existing.stock), ("Mug", Decimal("5.00"), 5)
+        )
+        self.assertEqual(sharding.total_stock(self.sharded.pk, cached=False), 9)
+        self.assertEqual(Products.objects.get(sku="LID-1").stock, 4)
+
+    def test_ndjson_feed_and_bad_uploads(self):
+        report = importer.import_products(importer.read_feed(
+            ['{"sku": "LID-1", "product_title": "Lid", "description": "Bamboo", "price": "1.25"}', "[1]"],
+            "ndjson",
+        ), batch_size=1)
+        self.assertEqual((report["created"], report["rejected"], len(report["batches"])), (1, 1, 2))
+
+        self.assertEqual(self.upload("feed.xlsx", "sku\n").status_code, 400)
+        self.assertEqual(self.upload("feed.csv", "title\nMug\n").status_code, 400)
+
+    def test_ndjson_numbers_keep_their_decimal_places(self):
+        title_index.load(force=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.upload("feed.ndjson", (
+                '{"sku": "LID-1", "product_title": "Zzlid", "description": "Bamboo", "price": 9.99, "stock": 4}\n'
+                '{"sku": "MUG-1", "price": 5.1}\n'
+            ))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["created"], response.json()["rejected"]), (1, 0))
+        self.assertEqual(Products.objects.get(sku="LID-1").price, Decimal("9.99"))
+        self.assertEqual(Products.objects.get(sku="MUG-1").price, Decimal("5.10"))
+        self.assertEqual([match["product_title"] for match in title_index.suggest("zzlid")], ["Zzlid"])
+
+    def test_rolled_back_batch_stays_out_of_the_indexes(self):
+        title_index.load(force=True)
+        search.fallback_index.load(force=True)
+        feed = [(1, {"sku": "GHOST-1", "product_title": "Zzghost", "description": "-", "price": "1.00"})]
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                importer.import_products(feed)
+                transaction.set_rollback(True)
+        self.assertEqual(title_index.suggest("zzghost"), [])
+        if not search.uses_postgres():
+            self.assertEqual(search.fallback_index.search(["zzghost"]), {})
+
+    def tearDown(self):
+        # the shared indexes may have seen rows that are rolled back now
+        title_index.loaded = search.fallback_index.loaded = False
+
+
+class InventoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("admin", is_staff=True)
+        cls.mug = Products.objects.create(product_title="Mug", description="-", price=Decimal("4.50"), stock=5)
+        cls.tea = Products.objects.create(product_title="Tea", description="-", price=Decimal("2.00"), stock=6)
+        sharding.shard_product(cls.tea, 2)
+
+    def test_updates_return_a_diff(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post("/api/v1/products/inventory/", {"items": [
+            {"id": self.mug.pk, "stock_delta": -2, "price": "5.00"},
+            {"id": self.tea.pk, "stock": 10},
+            {"id": 999999, "stock": 1},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result["updated"], result["missing"]), (2, [999999]))
+        self.assertEqual(result["changes"], [
+            {"id": self.mug.pk, "stock": [5, 3], "price": ["4.50", "5.00"]},
+            {"id": self.tea.pk, "stock": [6, 10]},
+        ])
+        self.assertEqual(Products.objects.get(pk=self.mug.pk).stock, 3)
+        self.assertEqual(sharding.total_stock(self.tea.pk, cached=False), 10)
+
+    def test_stock_never_goes_negative_and_chunks_commit_separately(self):
+        result = apply_updates([
+            {"id": self.mug.pk, "stock_delta": -6},
+            {"id": self.tea.pk, "stock_delta": -1},
+        ], chunk_size=1)
+        self.assertEqual(result["rejected"][0]["id"], self.mug.pk)
+        self.assertEqual((result["updated"], result["unchanged"]), (1, 0))
+        self.assertEqual(Products.objects.get(pk=self.mug.pk).stock, 5)
+        self.assertEqual(sharding.total_stock(self.tea.pk, cached=False), 5)
+
+        self.assertEqual(apply_updates([{"id": self.mug.pk, "stock": 5}])["unchanged"], 1)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Products.objects.create(
+            product_title="Mug", description="-", price=Decimal("4.50"), stock=5,
+        )
+        sharding.shard_product(cls.product, 2)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_detail_answers_304_from_one_query_until_the_product_changes(self):
+        for path in (f"/api/v1/products/{self.product.pk}/", f"/api/v1/async/products/{self.product.pk}/"):
+            with self.subTest(path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                etag = response["ETag"]
+                self.assertIn("Last-Modified", response)
+
+                with self.assertNumQueries(1):
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+                # a checkout draining a shard changes the detail
+                sharding.decrement(self.product.pk, 1, 2)
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_skips_the_aggregate(self):
+        for path in ("/api/v1/products/", "/api/v1/async/products/"):
+            with self.subTest(path):
+                self.client.get(path)
+                with self.assertNumQueries(0):
+                    response = self.client.get(path)
+                self.assertEqual((response.status_code, response["X-Cache"]), (200, "HIT"))
+                self.assertNotIn("ETag", response)
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = search.InvertedIndex()
+        self.index.load()
+
+    def tearDown(self):
+        # the shared index saw rows that are rolled back now
+        search.fallback_index.loaded = False
+
+    def test_gin_index_only_exists_on_postgresql(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Products._meta.db_table)
+        self.assertEqual(
+            "products_search_vector_idx" in constraints, connection.vendor == "postgresql"
+        )
+
+    @skipIf(search.uses_postgres(), "the fallback index is only used without PostgreSQL")
+    def test_fallback_index_only_sees_committed_rows(self):
+        search.fallback_index.load(force=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Products.objects.create(product_title="Zzphantom lamp", description="-", price=Decimal("1.00"))
+                transaction.set_rollback(True)
+        self.assertEqual(search.fallback_index.search(["zzphantom"]), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp = Products.objects.create(product_title="Zzreal lamp", description="-", price=Decimal("1.00"))
+        self.assertEqual(list(search.fallback_index.search(["zzreal"])), [lamp.pk])
+
+    @override_settings(CATALOG_INDEX_SYNC_SECONDS=0)
+    def test_writes_from_other_workers_reload_the_index(self):
+        lamp = Products.objects.create(product_title="Desk lamp", description="-", price=Decimal("1.00"))
+        self.index.load(force=True)
+        # another worker renames the product: this index only sees the version move
+        Products.objects.filter(pk=lamp.pk).update(product_title="Floor light")
+        self.assertEqual(list(self.index.search(["desk"])), [lamp.pk])
+        catalog_cache.invalidate()
+        self.assertEqual(self.index.search(["desk"]), {})
+        self.assertEqual(list(self.index.search(["floor"])), [lamp.pk])
+
+    @skipIf(search.uses_postgres(), "the fallback index is only used without PostgreSQL")
+    def test_broad_fallback_search_ranks_only_the_best_matches(self):
+        Products.objects.bulk_create(
+            Products(product_title=f"Lamp {i}", description="lamp" if i % 2 else "-", price=Decimal("1.00"))
+            for i in range(30)
+        )
+        search.fallback_index.load(force=True)
+        with mock.patch.object(search, "MAX_FALLBACK_MATCHES", 10):
+            matches = list(search.search(Products.objects.all(), ["lamp"]))
+        self.assertEqual(len(matches), 10)
+        # the ones matching in the description as well score highest
+        self.assertTrue(all(product.description == "lamp" for product in matches))
+
+
+class TitleIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Products.objects.create(product_title=title, description="-", price=Decimal("1.00"))
+            for title in ("Wireless Headphones", "Wired Mouse", "Steel Bottle", "Travel Mug")
+        ]
+
+    def setUp(self):
+        self.index = TitleIndex()
+        self.index.load()
+
+    def tearDown(self):
+        # the shared index may have seen rows that are rolled back now
+        title_index.loaded = False
+
+    def titles(self, prefix):
+        return [match["product_title"] for match in self.index.suggest(prefix)]
+
+    def assertMatchesFreshLoad(self):
+        fresh = TitleIndex()
+        fresh.load()
+        self.assertEqual(self.index.entries, fresh.entries)
+        self.assertEqual(self.index.titles, fresh.titles)
+
+    def test_suggest_title_starts_before_inner_words(self):
+        Products.objects.create(product_title="Mouse Pad", description="-", price=Decimal("1.00"))
+        self.index.update(Products.objects.get(product_title="Mouse Pad"))
+        self.assertEqual(self.titles("mou"), ["Mouse Pad", "Wired Mouse"])
+
+    def test_update_and_remove_touch_only_changed_products(self):
+        headphones, mouse, bottle, _ = self.products
+        Products.objects.filter(pk=headphones.pk).update(product_title="Noise Cancelling Headphones")
+        Products.objects.filter(pk=mouse.pk).update(is_available=False)
+        self.index.update_many(Products.objects.filter(pk__in=[headphones.pk, mouse.pk]))
+        pk = bottle.pk
+        bottle.delete()
+        self.index.remove(pk)
+
+        self.assertEqual(self.titles("wire"), [])
+        self.assertEqual(self.titles("cancel"), ["Noise Cancelling Headphones"])
+        self.assertEqual(self.titles("bott"), [])
+        self.assertMatchesFreshLoad()
+
+    def test_only_committed_writes_reach_the_shared_index(self):
+        title_index.load(force=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Products.objects.create(product_title="Zzphantom lamp", description="-", price=Decimal("1.00"))
+                transaction.set_rollback(True)
+        self.assertEqual(title_index.suggest("zzphantom"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp = Products.objects.create(product_title="Zzreal lamp", description="-", price=Decimal("1.00"))
+        self.assertEqual(title_index.suggest("zzreal"), [{"id": lamp.pk, "product_title": "Zzreal lamp"}])
+        with self.captureOnCommitCallbacks(execute=True):
+            lamp.delete()
+        self.assertEqual(title_index.suggest("zzreal"), [])
+
+    @override_settings(CATALOG_INDEX_SYNC_SECONDS=0)
+    def test_writes_from_other_workers_reload_the_index(self):
+        headphones = self.products[0]
+        Products.objects.filter(pk=headphones.pk).update(product_title="Studio Monitors")
+        self.assertEqual(self.titles("studio"), [])
+        catalog_cache.invalidate()
+        self.assertEqual(self.titles("studio"), ["Studio Monitors"])
+
+    def test_large_batches_rebuild(self):
+        self.index.REBUILD_BATCH = 1
+        Products.objects.update(product_title="Renamed product")
+        self.index.update_many(Products.objects.all())
+        self.assertEqual(len(self.titles("renamed")), 4)
+        self.assertMatchesFreshLoad()
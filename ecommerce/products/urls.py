@@ -1,7 +1,12 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet
+from .views import ProductAsyncDetailView, ProductAsyncListView, ProductViewSet
 
 router = DefaultRouter()
 router.register("products", ProductViewSet, basename="products")
 
-urlpatterns = router.urls
+urlpatterns = [
+    # async (ASGI-native) read-only versions of products-list and products-detail
+    path("async/products/", ProductAsyncListView.as_view(), name="products-async-list"),
+    path("async/products/<int:pk>/", ProductAsyncDetailView.as_view(), name="products-async-detail"),
+] + router.urls
@@ -1,24 +1,60 @@
-from rest_framework import viewsets, filters
+import io
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.request import Request
+from rest_framework.response import Response
 from .models import Products
-from .serializers import ProductSerializer
+from . import importer, inventory, search, sharding
+from .serializers import InventoryUpdateSerializer, ProductSerializer
 from .permissions import IsAdminUserOrReadOnly
+from .cache import CatalogCacheMixin, catalog_cache
+from .filters import ProductFilter
+from .search import ProductSearchFilter
+from .suggest import title_index
 from django_filters.rest_framework import DjangoFilterBackend
+from ecommerce.conditional import ConditionalGetMixin, precondition_response, set_validators
+from ecommerce.fastserializers import FastJSONRenderer, FastListMixin
+from ecommerce.fieldsets import SparseFieldsetViewMixin
+from ecommerce.pagination import KeysetPageNumberPagination
 
 # Create your views here.
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(
+    ConditionalGetMixin, CatalogCacheMixin, SparseFieldsetViewMixin, FastListMixin, viewsets.ModelViewSet
+):
     """
     A viewset for viewing and editing product instances.
     
     This viewset provides CRUD operations for the Products model.
+    List and detail responses are served from the catalog cache, which is
+    invalidated whenever a product is saved or deleted or stock changes at checkout.
+    Reads accept `fields=`/`omit=` to return (and load) only some fields. Cache misses
+    of the list are rendered by the fast serializer path. The detail carries an ETag and
+    a Last-Modified and answers conditional requests with 304.
     """
     
-    queryset = Products.objects.all()
+    queryset = Products.objects.defer('search_vector')
     serializer_class = ProductSerializer
     permission_classes = [IsAdminUserOrReadOnly]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend, filters.OrderingFilter]
-    search_fields = ['product_title', 'product_subtitle']
+    pagination_class = KeysetPageNumberPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
+    filterset_class = ProductFilter
     ordering_fields = ['created_at', 'price']
     ordering = ['created_at']
+    sparse_required_fields = ['created_at']
+    # read by the keyset pagination
+    fast_list_columns = ['pk', 'created_at']
+    # the list's aggregate would run over every matching row, even when the page is
+    # served from the catalog cache
+    conditional_actions = ['retrieve']
+    # sharded stock changes on the shard rows
+    conditional_related = ['stock_shards']
     
     def perform_create(self, serializer):
         """
@@ -27,4 +63,210 @@ class ProductViewSet(viewsets.ModelViewSet):
         Args:
             serializer (Serializer): The serializer instance containing validated data.
         """
-        serializer.save()
\ No newline at end of file
+        serializer.save()
+
+    def paginate_queryset(self, queryset):
+        """
+        Look up the stock of every sharded product on the page in one go.
+        """
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.includes_field('stock'):
+            self.shard_totals = sharding.shard_totals(
+                product.pk for product in page if product.stock_shard_count
+            )
+        return page
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['shard_totals'] = getattr(self, 'shard_totals', None)
+        return context
+
+    @action(
+        detail=False,
+        methods=["get"],
+        authentication_classes=[],
+        permission_classes=[AllowAny],
+        pagination_class=None,
+    )
+    def suggest(self, request):
+        """
+        Typeahead: up to `limit` (default 10, max 50) product titles matching `q`.
+
+        Served from the in-process title index, without touching the database.
+        """
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        return Response({"results": title_index.suggest(request.query_params.get("q", ""), limit)})
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        permission_classes=[IsAdminUser],
+        parser_classes=[MultiPartParser],
+    )
+    def import_feed(self, request):
+        """
+        Create or update products by SKU from an uploaded CSV/NDJSON feed (`file`).
+
+        The format comes from `feed_format` or the file extension. Large uploads are
+        spooled to disk and read line by line; the response reports per-batch
+        throughput and the rejected rows.
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Upload the feed as `file`."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            fmt = importer.feed_format(upload.name, request.data.get("feed_format"))
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            report = importer.import_products(importer.read_feed(stream, fmt))
+        except importer.FeedError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response(
+                {"error": "The feed must be UTF-8 encoded; rows before the bad line were imported."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(report)
+
+    @action(detail=False, methods=["post"], permission_classes=[IsAdminUser], pagination_class=None)
+    def inventory(self, request):
+        """
+        Set or adjust the stock and price of many products at once (inventory sync).
+
+        Returns a compact diff: the old and new value of every field that changed,
+        plus the ids that don't exist and the items that were rejected.
+        """
+        serializer = InventoryUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(inventory.apply_updates(serializer.validated_data["items"]))
+
+    @action(detail=False, methods=["get"], url_path="cache-stats", permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Hit/miss counters of the catalog cache for this worker process.
+        """
+        return Response(catalog_cache.stats())
+
+
+class AsyncProductReadView(View):
+    """
+    Base for the async (ASGI-native) product list and detail endpoints.
+
+    Uses `ProductViewSet`'s queryset, filters, search, ordering, pagination, serializer
+    (the fast serializer path for the list) and the detail's conditional GET validators, but loads
+    rows with the async ORM and reads and fills the catalog cache through its async API,
+    so under ASGI a catalog read doesn't hold a worker thread while it waits. Shard
+    totals are looked up before serializing, which keeps the serializer free of database
+    access. The endpoints are public and read-only: they don't authenticate, always
+    render JSON, and return the same bodies as the synchronous endpoints.
+    """
+
+    action = None
+
+    async def get(self, request, **kwargs):
+        viewset = ProductViewSet(
+            request=Request(request), args=(), kwargs=kwargs, action=self.action, format_kwarg=None
+        )
+        conditional = self.action in viewset.conditional_actions
+        try:
+            queryset = await self.filter_queryset(viewset)
+            if conditional:
+                state = await queryset.filter(**kwargs).aaggregate(**viewset.conditional_aggregates())
+        except APIException as exc:
+            return self.render_exception(exc)
+
+        validators = (None, None)
+        if conditional and (state["count"] or not kwargs):
+            validators = viewset.get_validators(state, detail=bool(kwargs))
+            response = precondition_response(request, *validators)
+            if response is not None:
+                return response
+
+        key = await catalog_cache.amake_key(
+            viewset.request, "products-async", self.cache_name(**kwargs), validators[0] or ""
+        )
+        data = await catalog_cache.aget(key)
+        if data is not None:
+            return self.render(data, cache="HIT", validators=validators)
+
+        try:
+            data = await self.load(viewset, queryset, **kwargs)
+        except APIException as exc:
+            return self.render_exception(exc)
+        await catalog_cache.aset(key, data)
+        return self.render(data, cache="MISS", validators=validators)
+
+    def render(self, data, status=200, cache=None, validators=(None, None)):
+        response = HttpResponse(FastJSONRenderer().render(data), status=status, content_type="application/json")
+        if cache:
+            response["X-Cache"] = cache
+        if validators[0]:
+            set_validators(response, *validators)
+        return response
+
+    def render_exception(self, exc):
+        # the body DRF's exception handler would send
+        body = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        return self.render(body, status=exc.status_code)
+
+    async def filter_queryset(self, viewset):
+        queryset = viewset.get_queryset()
+        if not search.uses_postgres() and search.fallback_index.due():
+            # a search would first (re)load the in-process index from the database
+            return await sync_to_async(viewset.filter_queryset)(queryset)
+        return viewset.filter_queryset(queryset)
+
+    async def load_shard_totals(self, viewset, products):
+        if not viewset.includes_field("stock"):
+            return
+        sharded = [product.pk for product in products if product.stock_shard_count]
+        viewset.shard_totals = await sync_to_async(sharding.shard_totals)(sharded) if sharded else {}
+
+
+class ProductAsyncListView(AsyncProductReadView):
+    """
+    Async product list: same filters, search, ordering and pagination as `products-list`.
+    """
+
+    action = "list"
+
+    def cache_name(self):
+        return "list"
+
+    async def load(self, viewset, queryset):
+        compiled = viewset.fast_serializer()
+        if compiled is not None:
+            queryset = compiled.rows(queryset)
+        page = await viewset.paginator.apaginate_queryset(queryset, viewset.request, viewset)
+        products = page if page is not None else [product async for product in queryset]
+        await self.load_shard_totals(viewset, products)
+        if compiled is not None:
+            data = compiled.data(products, viewset.get_serializer_context())
+        else:
+            data = viewset.get_serializer(products, many=True).data
+        if page is None:
+            return data
+        return viewset.paginator.get_paginated_response(data).data
+
+
+class ProductAsyncDetailView(AsyncProductReadView):
+    """
+    Async product detail, matching `products-detail`.
+    """
+
+    action = "retrieve"
+
+    def cache_name(self, pk):
+        return f"detail:{pk}"
+
+    async def load(self, viewset, queryset, pk):
+        try:
+            product = await queryset.aget(pk=pk)
+        except Products.DoesNotExist:
+            raise NotFound(f"No {Products._meta.object_name} matches the given query.")
+        await self.load_shard_totals(viewset, [product])
+        return viewset.get_serializer(product).data